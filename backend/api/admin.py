@@ -9,16 +9,30 @@ from .models import (
     Age,
     ShirtNumber,
     Player,
+    PlayerAlias,
     UserGuessLog,
     UserPlayerAssignment,
     Transfer,
     TransferQuestionOfTheDay,
     UserGuessLogTransfer,
+    UserScore,
 )
+from .services.user_service import ApproximateCountPaginator
+
+
+@admin.register(UserAccount)
+class UserAccountAdmin(admin.ModelAdmin):
+    # lista na milionie kont: wyszukiwanie po początku loginu / e-maila (istartswith, indeksy z migracji 0013),
+    # szacowana liczba wyników i bez drugiego COUNT(*) całej tabeli
+    list_display = ('login', 'email', 'enabled', 'is_staff', 'created_at')
+    search_fields = ('^login', '^email')
+    ordering = ('login',)
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
 
 # Rejestrowanie modeli w panelu administracyjnym Django
 admin.site.register(Role)
-admin.site.register(UserAccount)
 admin.site.register(Country)
 admin.site.register(League)
 admin.site.register(Club)
@@ -26,8 +40,10 @@ admin.site.register(Position)
 admin.site.register(Age)
 admin.site.register(ShirtNumber)
 admin.site.register(Player)
+admin.site.register(PlayerAlias)
 admin.site.register(UserPlayerAssignment)
 admin.site.register(UserGuessLog)
 admin.site.register(Transfer)
 admin.site.register(TransferQuestionOfTheDay)
 admin.site.register(UserGuessLogTransfer)
+admin.site.register(UserScore)
@@ -0,0 +1,29 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .services.user_cache_service import get_cached_user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    # Jak JWTAuthentication, ale użytkownik pochodzi z pamięci procesu (user_cache_service),
+    # więc typowe żądanie nie wykonuje żadnego zapytania o UserAccount
+    def get_user(self, validated_token):
+        # sprawdzenie unieważnienia tokenu po zmianie hasła wymaga hasha hasła z bazy
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
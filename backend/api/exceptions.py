@@ -98,4 +98,39 @@ class NoMoreAttemptsException(APIException):
 class AlreadyGuessedException(APIException):
     status_code = 403
     default_detail = "Już zgadłeś dzisiaj piłkarza."
-    default_code = "already_guessed"
\ No newline at end of file
+    default_code = "already_guessed"
+
+class FileTooLargeException(APIException):
+    status_code = 413
+    default_detail = "Plik jest za duży!"
+    default_code = "file_too_large"
+
+class InvalidImageException(APIException):
+    status_code = 400
+    default_detail = "Nieprawidłowy plik obrazu!"
+    default_code = "invalid_image"
+
+class ProfilePictureQueueException(APIException):
+    status_code = 503
+    default_detail = "Nie udało się przyjąć zdjęcia do przetworzenia, spróbuj ponownie później!"
+    default_code = "profile_picture_queue_unavailable"
+
+class InvalidCursorException(APIException):
+    status_code = 400
+    default_detail = "Nieprawidłowy kursor stronicowania!"
+    default_code = "invalid_cursor"
+
+class BlobNotFoundException(APIException):
+    status_code = 404
+    default_detail = "Nie znaleziono pliku!"
+    default_code = "blob_not_found"
+
+class UnknownExportException(APIException):
+    status_code = 404
+    default_detail = "Nieznany eksport lub format!"
+    default_code = "unknown_export"
+
+class NoTransfersFoundException(APIException):
+    status_code = 404
+    default_detail = "Brak transferów do pytania dnia!"
+    default_code = "no_transfers_found"
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import UserAccount, UserPlayerAssignment
+from api.services.daily_target_service import pick_daily_player_id
+
+
+class Command(BaseCommand):
+    help = "Zapisuje w UserPlayerAssignment wylosowanych piłkarzy dnia (tryb audytu / backfill)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help="Pierwszy dzień (YYYY-MM-DD), domyślnie dzisiaj")
+        parser.add_argument('--days', type=int, default=1, help="Liczba kolejnych dni")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = options['date'] or date.today()
+        if options['days'] < 1:
+            raise CommandError("--days musi być dodatnie.")
+
+        for offset in range(options['days']):
+            day = start + timedelta(days=offset)
+            created = self.backfill_day(day, options['batch_size'])
+            self.stdout.write(f"{day.isoformat()}: zapisano {created} przydziałów")
+
+    def backfill_day(self, day, batch_size):
+        # pomijamy użytkowników, którzy mają już przydział na ten dzień
+        user_ids = (
+            UserAccount.objects
+            .exclude(userplayerassignment__assignment_date=day)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+        created = 0
+        batch = []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            player_id = pick_daily_player_id(user_id, day)
+            if player_id is None:
+                raise CommandError("Brak piłkarzy w bazie danych!")
+            batch.append(UserPlayerAssignment(user_id=user_id, player_id=player_id, assignment_date=day))
+            if len(batch) >= batch_size:
+                UserPlayerAssignment.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if batch:
+            UserPlayerAssignment.objects.bulk_create(batch)
+            created += len(batch)
+        return created
@@ -0,0 +1,184 @@
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import UserAccount
+from api.services.slow_query_service import percentile
+
+# endpoint -> (ścieżka, parametry zapytania); tylko GET - scenariusz to klienci odpytujący
+# stan gry, a zgadywanie po kilku żądaniach i tak kończy się limitem prób
+ENDPOINTS = {
+    'game-status': ('/api/game-status/', {}),
+    'player-names': ('/api/player-names/', {'query': 'an'}),
+    'transfer-start': ('/api/transfer/start', {}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje przepustowość endpointów gry obsługiwanych przez WSGI (pula wątków jak w gunicorn --threads) "
+        "i przez ASGI (pętla zdarzeń) w jednym procesie, czyli przy tej samej liczbie rdzeni. "
+        "Żądania trafiają bezpośrednio do handlerów Django (bez sieci), klienci to użytkownicy z "
+        "generate_dataset (--prefix) z tokenami JWT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='game-status')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--clients', type=int, default=200, help="Liczba równoległych klientów")
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help="Przerwa klienta między żądaniami w sekundach (0 - bez przerw)")
+        parser.add_argument('--duration', type=float, default=10.0, help="Czas pomiaru w sekundach")
+        parser.add_argument('--threads', type=int, default=8, help="Wątki workera WSGI")
+        parser.add_argument('--prefix', default='gen', help="Prefiks loginów użytkowników (generate_dataset)")
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['threads'] < 1 or options['duration'] <= 0:
+            raise CommandError("--clients, --threads i --duration muszą być dodatnie.")
+
+        users = list(UserAccount.objects.filter(login__startswith=options['prefix']).order_by('id')[:options['clients']])
+        if not users:
+            raise CommandError(f"Brak użytkowników z prefiksem {options['prefix']!r} - uruchom generate_dataset.")
+        tokens = []
+        for user in users:
+            token = AccessToken.for_user(user)
+            # domyślny czas życia tokenu (minuta) bywa krótszy niż pomiar
+            token.set_exp(lifetime=timedelta(hours=1))
+            tokens.append(str(token))
+        # każdy wątek / żądanie otwiera własne połączenie; połączenie komendy nie jest potrzebne
+        connections.close_all()
+
+        path, query = ENDPOINTS[options['endpoint']]
+        modes = ['wsgi', 'asgi'] if options['mode'] == 'both' else [options['mode']]
+        self.stdout.write(
+            f"{options['endpoint']}: {options['clients']} klientów, przerwa {options['interval']} s, "
+            f"{options['duration']} s na tryb, {len(users)} użytkowników"
+        )
+        self.stdout.write(f"{'tryb':<24} {'żądania':>8} {'żądań/s':>9} {'p50 [ms]':>9} {'p95 [ms]':>9} {'p99 [ms]':>9} {'błędy':>6}")
+        for mode in modes:
+            if mode == 'wsgi':
+                label = f"WSGI ({options['threads']} wątków)"
+                results = asyncio.run(self.run_wsgi(path, query, tokens, options))
+            else:
+                label = "ASGI (pętla zdarzeń)"
+                results = asyncio.run(self.run_asgi(path, query, tokens, options))
+            latencies = [latency for latency, _ in results]
+            errors = sum(1 for _, status in results if status is None or status >= 400)
+            self.stdout.write(
+                f"{label:<24} {len(results):>8} {len(results) / options['duration']:>9.0f} "
+                f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.95) * 1000:>9.1f} "
+                f"{percentile(latencies, 0.99) * 1000:>9.1f} {errors:>6}"
+            )
+
+    async def run_wsgi(self, path, query, tokens, options):
+        application = get_wsgi_application()
+        with ThreadPoolExecutor(options['threads']) as pool:
+            loop = asyncio.get_running_loop()
+
+            async def call(token):
+                return await loop.run_in_executor(pool, wsgi_request, application, path, query, token)
+
+            return await drive(call, tokens, options)
+
+    async def run_asgi(self, path, query, tokens, options):
+        application = get_asgi_application()
+
+        async def call(token):
+            return await asgi_request(application, path, query, token)
+
+        return await drive(call, tokens, options)
+
+
+async def drive(call, tokens, options):
+    # Klienci w pętli: żądanie, przerwa, żądanie... przez --duration sekund. Czas odpowiedzi
+    # obejmuje oczekiwanie na wolny wątek, więc kolejka w trybie WSGI jest widoczna w p95/p99.
+    await call(tokens[0])
+    results = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + options['duration']
+
+    async def client(index):
+        token = tokens[index % len(tokens)]
+        # rozłożenie startu klientów na pierwszą przerwę
+        if options['interval']:
+            await asyncio.sleep(options['interval'] * index / options['clients'])
+        while loop.time() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await call(token)
+            except Exception:
+                status = None
+            results.append((time.perf_counter() - started, status))
+            if options['interval']:
+                await asyncio.sleep(options['interval'])
+
+    await asyncio.gather(*(client(index) for index in range(options['clients'])))
+    return results
+
+
+def server_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def wsgi_request(application, path, query, token):
+    host = server_host()
+    environ = {
+        'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': urlencode(query),
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': host,
+        'HTTP_AUTHORIZATION': f'Bearer {token}', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    response = application(environ, lambda line, headers, exc_info=None: status.append(int(line.split()[0])))
+    try:
+        for _ in response:
+            pass
+    finally:
+        # close() wysyła request_finished, który zamyka połączenie z bazą jak na prawdziwym serwerze
+        response.close()
+    return status[0]
+
+
+async def asgi_request(application, path, query, token):
+    host = server_host()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': urlencode(query).encode(),
+        'headers': [(b'host', host.encode()), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 0), 'server': (host, 80),
+    }
+    body_sent = False
+    disconnected = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # klient nie rozłącza się przed odpowiedzią
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        disconnected.set()
+    return status[0]
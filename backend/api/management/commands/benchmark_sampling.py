@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Age, Club, Country, League, Player, Position, ShirtNumber
+from api.services.catalog_service import bump_catalog_version, get_ordered_ids
+from api.services.sampling_service import sample_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje losowanie k piłkarzy przez order_by('?') z sampling_service. "
+        "Dane testowe są dodawane w transakcji, która na końcu jest wycofywana."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            lookups = {
+                'country': Country.objects.create(name="Benchmark"),
+                'league': League.objects.create(name="Benchmark"),
+                'club': Club.objects.create(name="Benchmark"),
+                'position': Position.objects.create(name="Benchmark"),
+                'age': Age.objects.create(value=25),
+                'shirt_number': ShirtNumber.objects.create(number=10),
+            }
+
+            self.stdout.write(f"{'wiersze':>10} {'order_by(?) [ms]':>18} {'sampling [ms]':>15} {'budowa listy id [ms]':>22}")
+            for target in sorted(options['rows']):
+                self.fill_players(target, lookups, options['batch_size'])
+
+                order_by_ms = self.measure(
+                    lambda: list(Player.objects.order_by('?')[:options['k']]), options['repeat']
+                )
+                started = time.perf_counter()
+                get_ordered_ids(Player)
+                build_ms = (time.perf_counter() - started) * 1000
+                sampling_ms = self.measure(
+                    lambda: sample_rows(Player.objects.all(), options['k']), options['repeat']
+                )
+
+                self.stdout.write(f"{target:>10} {order_by_ms:>18.2f} {sampling_ms:>15.2f} {build_ms:>22.2f}")
+
+            transaction.set_rollback(True)
+
+    def fill_players(self, target, lookups, batch_size):
+        missing = target - Player.objects.count()
+        while missing > 0:
+            size = min(batch_size, missing)
+            Player.objects.bulk_create(
+                Player(name=f"Benchmark {missing - i}", normalized_name=f"benchmark {missing - i}", **lookups)
+                for i in range(size)
+            )
+            missing -= size
+        # bulk_create nie wysyła sygnałów, więc listę id trzeba unieważnić ręcznie
+        bump_catalog_version()
+
+    def measure(self, func, repeat):
+        func()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) * 1000 / repeat
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.catalog_service import bump_catalog_version
+from api.services.player_flat_service import find_player_flat_drift, sync_player_flat
+
+# ile przykładowych id wypisać dla każdego rodzaju rozbieżności
+SAMPLE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = "Sprawdza, czy PlayerFlat zgadza się z tabelami źródłowymi (opcjonalnie naprawia różnice)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Odśwież rozbieżne wiersze")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        missing, extra, stale = find_player_flat_drift(batch_size=options['batch_size'])
+        for label, ids in (("brakujące", missing), ("nadmiarowe", extra), ("nieaktualne", stale)):
+            if ids:
+                sample = ", ".join(str(player_id) for player_id in ids[:SAMPLE_SIZE])
+                self.stdout.write(f"{label}: {len(ids)} (np. {sample})")
+
+        drift = missing + extra + stale
+        if not drift:
+            self.stdout.write("PlayerFlat jest zgodny z tabelami źródłowymi")
+            return
+
+        if not options['fix']:
+            raise CommandError(f"PlayerFlat ma {len(drift)} rozbieżnych wierszy (uruchom z --fix)")
+
+        sync_player_flat(drift)
+        bump_catalog_version()
+        self.stdout.write(f"Naprawiono {len(drift)} wierszy PlayerFlat")
@@ -0,0 +1,265 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import (
+    Age, Club, Country, League, Player, Position, ShirtNumber, Transfer, TransferQuestionOfTheDay,
+    UserAccount, UserGuessLog, UserGuessLogTransfer, UserPlayerAssignment,
+)
+from api.normalization import fold_name
+from api.services.catalog_service import bump_catalog_version
+from api.services.daily_target_service import pick_daily_player_id
+from api.services.guess_log_service import MAX_ATTEMPTS
+from api.services.leaderboard_service import rebuild_user_scores
+from api.services.player_flat_service import rebuild_player_flat
+
+# Słowniki danych syntetycznych. Wagi krajów i pozycji są przybliżeniem składów
+# z dużych lig (dużo Hiszpanów i Francuzów, mało bramkarzy).
+COUNTRIES = [
+    ('Hiszpania', 9), ('Francja', 9), ('Anglia', 8), ('Brazylia', 8), ('Niemcy', 7), ('Włochy', 7),
+    ('Argentyna', 6), ('Portugalia', 5), ('Holandia', 4), ('Belgia', 3), ('Polska', 3), ('Chorwacja', 2),
+    ('Serbia', 2), ('Dania', 2), ('Szwajcaria', 2), ('Urugwaj', 2), ('Kolumbia', 2), ('Senegal', 2),
+    ('Nigeria', 2), ('Maroko', 2), ('Austria', 1), ('Szwecja', 1), ('Norwegia', 1), ('Czechy', 1),
+    ('Japonia', 1), ('Korea Południowa', 1), ('Stany Zjednoczone', 1), ('Meksyk', 1), ('Ghana', 1),
+    ('Wybrzeże Kości Słoniowej', 1),
+]
+LEAGUES = [
+    'Premier League', 'La Liga', 'Serie A', 'Bundesliga', 'Ligue 1', 'Eredivisie', 'Liga Portugal',
+    'Ekstraklasa', 'Super Lig', 'Jupiler Pro League', 'Scottish Premiership', 'Super League',
+    'Austrian Bundesliga', 'Superliga', 'Allsvenskan', 'Eliteserien', 'MLS', 'Liga MX', 'J1 League',
+    'Brasileirao',
+]
+POSITIONS = [('Bramkarz', 1), ('Obrońca', 4), ('Pomocnik', 4), ('Napastnik', 2)]
+CLUB_PREFIXES = ['FC', 'Real', 'Sporting', 'Dynamo', 'Atletico', 'Olympique', 'Racing', 'Union', 'Inter',
+                 'AS', 'Athletic', 'United']
+CITIES = [
+    'Madryt', 'Paryż', 'Londyn', 'Mediolan', 'Monachium', 'Lizbona', 'Porto', 'Amsterdam', 'Rotterdam',
+    'Warszawa', 'Kraków', 'Poznań', 'Gdańsk', 'Wrocław', 'Sewilla', 'Walencja', 'Turyn', 'Rzym',
+    'Neapol', 'Marsylia', 'Lyon', 'Lille', 'Berlin', 'Dortmund', 'Hamburg', 'Bruksela', 'Glasgow',
+    'Zurych', 'Wiedeń', 'Kopenhaga', 'Sztokholm', 'Oslo', 'Stambuł', 'Ateny', 'Praga', 'Belgrad',
+    'Zagrzeb', 'Kijów', 'Bukareszt', 'Budapeszt',
+]
+FIRST_NAMES = [
+    'Adam', 'Adrien', 'Alejandro', 'Alessandro', 'André', 'Antoine', 'Bartosz', 'Bruno', 'Carlos',
+    'Cristian', 'Daniel', 'David', 'Diego', 'Dominik', 'Erling', 'Federico', 'Gabriel', 'Hugo', 'Ivan',
+    'Jakub', 'Jan', 'João', 'Jonas', 'Jorge', 'Kacper', 'Kamil', 'Karim', 'Kevin', 'Luca', 'Lucas',
+    'Łukasz', 'Marco', 'Mateusz', 'Mohamed', 'Nicolás', 'Paul', 'Piotr', 'Rafael', 'Sergio', 'Thomas',
+]
+LAST_NAMES = [
+    'Alvarez', 'Bernardi', 'Costa', 'Dubois', 'Fernandes', 'García', 'Gonçalves', 'Hansen', 'Horvat',
+    'Jankowski', 'Kamiński', 'Kowalczyk', 'Lewandowski', 'López', 'Martínez', 'Mbaye', 'Moreau',
+    'Müller', 'Nowak', 'Olsen', 'Pereira', 'Petrović', 'Ricci', 'Rodríguez', 'Romano', 'Santos',
+    'Schmidt', 'Silva', 'Szymański', 'Traoré', 'Van Dijk', 'Wójcik', 'Zieliński', 'Yilmaz',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generuje syntetyczny zbiór danych (słowniki, piłkarze, transfery, użytkownicy, przydziały "
+        "i logi zgadywania) deterministycznie z ziarna - do pomiarów wydajności na dużych danych."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--players', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=30, help="Liczba dni historii gry, kończąc na dzisiaj")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='gen', help="Prefiks loginów i e-maili użytkowników")
+        parser.add_argument('--password', default='haslo123', help="Wspólne hasło wygenerowanych kont")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 0 or options['players'] < 1 or options['days'] < 1:
+            raise CommandError("--players i --days muszą być dodatnie, a --users nieujemne.")
+        if UserAccount.objects.filter(login__startswith=options['prefix']).exists():
+            raise CommandError(f"Istnieją już konta z prefiksem \"{options['prefix']}\", podaj inny --prefix.")
+
+        self.batch_size = options['batch_size']
+        self.seed = options['seed']
+        today = date.today()
+        self.days = [today - timedelta(days=offset) for offset in range(options['days'] - 1, -1, -1)]
+
+        started = time.monotonic()
+        lookups = self.create_lookups(options['players'])
+        player_ids = self.create_players(options['players'], lookups)
+        self.report("PlayerFlat", rebuild_player_flat(batch_size=self.batch_size))
+        transfer_ids = self.create_transfers(player_ids, lookups)
+        self.create_questions(transfer_ids)
+        # nowi piłkarze muszą trafić do list id, z których losowany jest piłkarz dnia
+        bump_catalog_version()
+        self.create_users(options['users'], options['prefix'], make_password(options['password']))
+        self.report("UserScore", rebuild_user_scores())
+        self.stdout.write(f"Gotowe w {time.monotonic() - started:.1f} s")
+
+    def report(self, label, count, started=None):
+        line = f"{label}: {count}"
+        if started is not None:
+            elapsed = time.monotonic() - started
+            line += f" ({count / elapsed if elapsed else count:.0f} wierszy/s)"
+        self.stdout.write(line)
+
+    def rng(self, *key):
+        # osobny generator dla każdej części danych, więc np. logi użytkownika nr i
+        # nie zależą od liczby piłkarzy ani od --batch-size
+        return random.Random(':'.join(str(part) for part in (self.seed, *key)))
+
+    def bulk_insert(self, model, objects, ids=None, **kwargs):
+        # wstawia obiekty z generatora partiami; id zapisanych wierszy tylko na żądanie (ids),
+        # żeby przy milionach logów nie trzymać ich w pamięci
+        started = time.monotonic()
+        created = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                created += self.flush(model, batch, ids, **kwargs)
+                batch = []
+        created += self.flush(model, batch, ids, **kwargs)
+        self.report(model.__name__, created, started)
+        return created
+
+    def flush(self, model, batch, ids, **kwargs):
+        objs = model.objects.bulk_create(batch, **kwargs)
+        if ids is not None:
+            ids.extend(obj.pk for obj in objs)
+        return len(objs)
+
+    def ensure(self, model, field, values):
+        # istniejące wpisy słowników są używane ponownie; zwraca id w kolejności values
+        existing = dict(model.objects.filter(**{f'{field}__in': values}).values_list(field, 'id'))
+        missing = [value for value in dict.fromkeys(values) if value not in existing]
+        for obj in model.objects.bulk_create([model(**{field: value}) for value in missing]):
+            existing[getattr(obj, field)] = obj.pk
+        return [existing[value] for value in values]
+
+    def create_lookups(self, players):
+        rng = self.rng('clubs')
+        # ~25 piłkarzy na klub, każdy klub należy do jednej ligi
+        clubs_per_league = min(max(players // (25 * len(LEAGUES)), 2), len(CLUB_PREFIXES) * len(CITIES) // len(LEAGUES))
+        club_names = [f"{prefix} {city}" for prefix in CLUB_PREFIXES for city in CITIES]
+        rng.shuffle(club_names)
+        club_ids = self.ensure(Club, 'name', club_names[:clubs_per_league * len(LEAGUES)])
+        return {
+            'countries': self.ensure(Country, 'name', [name for name, _ in COUNTRIES]),
+            'country_weights': [weight for _, weight in COUNTRIES],
+            'leagues': self.ensure(League, 'name', LEAGUES),
+            'league_clubs': [club_ids[i::len(LEAGUES)] for i in range(len(LEAGUES))],
+            'positions': self.ensure(Position, 'name', [name for name, _ in POSITIONS]),
+            'position_weights': [weight for _, weight in POSITIONS],
+            'ages': dict(zip(range(16, 41), self.ensure(Age, 'value', list(range(16, 41))))),
+            'shirt_numbers': self.ensure(ShirtNumber, 'number', list(range(1, 100))),
+            # numery 1-30 są najczęstsze
+            'shirt_weights': [5 if number <= 30 else 1 for number in range(1, 100)],
+        }
+
+    def player_names(self, count):
+        # unikalne po normalizacji (Player.normalized_name), także względem istniejących piłkarzy
+        rng = self.rng('names')
+        taken = set(Player.objects.values_list('normalized_name', flat=True).iterator(chunk_size=10000))
+        for _ in range(count):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            candidate, suffix = name, 1
+            while fold_name(candidate) in taken:
+                suffix += 1
+                candidate = f"{name} {suffix}"
+            taken.add(fold_name(candidate))
+            yield candidate
+
+    def create_players(self, count, lookups):
+        rng = self.rng('players')
+
+        def players():
+            for name in self.player_names(count):
+                league = rng.randrange(len(lookups['leagues']))
+                yield Player(
+                    # bulk_create pomija save(), więc normalized_name ustawiamy sami
+                    name=name,
+                    normalized_name=fold_name(name),
+                    country_id=rng.choices(lookups['countries'], lookups['country_weights'])[0],
+                    league_id=lookups['leagues'][league],
+                    club_id=rng.choice(lookups['league_clubs'][league]),
+                    position_id=rng.choices(lookups['positions'], lookups['position_weights'])[0],
+                    age_id=lookups['ages'][min(40, max(16, round(rng.triangular(17, 38, 26))))],
+                    shirt_number_id=rng.choices(lookups['shirt_numbers'], lookups['shirt_weights'])[0],
+                )
+
+        player_ids = []
+        self.bulk_insert(Player, players(), ids=player_ids)
+        return player_ids
+
+    def create_transfers(self, player_ids, lookups):
+        rng = self.rng('transfers')
+        club_ids = [club for clubs in lookups['league_clubs'] for club in clubs]
+        first_day = self.days[-1] - timedelta(days=5 * 365)
+
+        def transfers():
+            for player_id in player_ids:
+                # większość piłkarzy ma 0-2 transfery, kwoty (mln) mają długi ogon
+                while rng.random() < 0.55:
+                    from_club, to_club = rng.sample(club_ids, 2)
+                    yield Transfer(
+                        player_id=player_id, from_club_id=from_club, to_club_id=to_club,
+                        transfer_amount=Decimal(f"{min(rng.lognormvariate(1.5, 1.2), 250):.2f}"),
+                        date=first_day + timedelta(days=rng.randrange(5 * 365)),
+                    )
+
+        transfer_ids = []
+        self.bulk_insert(Transfer, transfers(), ids=transfer_ids)
+        return transfer_ids
+
+    def create_questions(self, transfer_ids):
+        if not transfer_ids:
+            return
+        rng = self.rng('questions')
+        # dni, które mają już pytanie dnia, zostają bez zmian
+        self.bulk_insert(TransferQuestionOfTheDay, (
+            TransferQuestionOfTheDay(transfer_id=rng.choice(transfer_ids), question_date=day) for day in self.days
+        ), ignore_conflicts=True)
+
+    def create_users(self, count, prefix, password):
+        for start in range(0, count, self.batch_size):
+            users = UserAccount.objects.bulk_create([
+                UserAccount(email=f"{prefix}{i}@example.com", login=f"{prefix}{i}", password=password)
+                for i in range(start, min(start + self.batch_size, count))
+            ])
+            self.report("UserAccount", start + len(users))
+            # numer użytkownika (a nie id) wyznacza jego dane, więc nie zależą od podziału na partie
+            users = [(start + offset, user.pk) for offset, user in enumerate(users)]
+            self.bulk_insert(UserGuessLog, self.guess_logs(users, UserGuessLog, 'guess'))
+            self.bulk_insert(UserGuessLogTransfer, self.guess_logs(users, UserGuessLogTransfer, 'transfer'))
+            self.bulk_insert(UserPlayerAssignment, (
+                UserPlayerAssignment(user_id=user_id, player_id=pick_daily_player_id(user_id, day), assignment_date=day)
+                for index, user_id in users
+                for day in self.user_activity(index)[0]
+            ))
+
+    def user_activity(self, index):
+        # dzień rejestracji (więcej nowych kont pod koniec okresu), odsetek dni z grą
+        # (większość gra rzadko) i skuteczność pojedynczej próby
+        rng = self.rng('user', index)
+        joined = int(len(self.days) * rng.random() ** 0.5)
+        activity, skill = rng.betavariate(0.7, 2.0), rng.betavariate(2, 5)
+        span = len(self.days) - joined
+        played = [self.days[joined + offset] for offset in sorted(rng.sample(range(span), round(span * activity)))]
+        return played, skill
+
+    def guess_logs(self, users, model, game):
+        for index, user_id in users:
+            played, skill = self.user_activity(index)
+            rng = self.rng('user', index, game)
+            for day in played:
+                # w grę z transferami użytkownik gra tylko w części dni
+                if game == 'transfer' and rng.random() < 0.4:
+                    continue
+                attempts, correct = 0, False
+                while attempts < MAX_ATTEMPTS and not correct:
+                    attempts += 1
+                    correct = rng.random() < skill
+                # część przegranych gier jest przerywana przed wykorzystaniem wszystkich prób
+                if not correct and rng.random() < 0.3:
+                    attempts = rng.randint(1, attempts)
+                yield model(user_id=user_id, guess_date=day, guess_number=attempts, guessed_correctly=correct)
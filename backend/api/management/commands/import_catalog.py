@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.catalog_import_service import (
+    PLAYER_CSV_COLUMNS, TRANSFER_CSV_COLUMNS, import_players, import_transfers,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importuje piłkarzy i transfery z plików CSV partiami (PostgreSQL: COPY do tabeli tymczasowej "
+        f"i jeden INSERT ... SELECT na partię). Kolumny piłkarzy: {', '.join(PLAYER_CSV_COLUMNS)}; "
+        f"kolumny transferów: {', '.join(TRANSFER_CSV_COLUMNS)}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('players', help="Plik CSV z piłkarzami")
+        parser.add_argument('transfers', nargs='?', help="Plik CSV z transferami (opcjonalny)")
+        parser.add_argument('--upsert', action='store_true',
+                            help="Nadpisuje istniejących piłkarzy i kwoty istniejących transferów")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size musi być dodatnie.")
+
+        self.run("piłkarze", import_players, options['players'], options)
+        if options['transfers']:
+            self.run("transfery", import_transfers, options['transfers'], options)
+
+    def run(self, label, importer, path, options):
+        started = time.monotonic()
+        try:
+            with open(path, newline='', encoding='utf-8') as file:
+                rows, created, existing = importer(file, upsert=options['upsert'], chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f"Nie można otworzyć pliku {path}: {e}")
+        except ValueError as e:
+            raise CommandError(f"{path}: {e}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{label}: {rows} wierszy w {elapsed:.2f} s ({rows / elapsed if elapsed else rows:.0f} wierszy/s)"
+        )
+        for model, count in created.items():
+            self.stdout.write(f"  nowe wpisy {model}: {count}")
+        if existing:
+            action = "nadpisane" if options['upsert'] else "pominięte"
+            self.stdout.write(f"  już istniejące ({action}): {existing}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.leaderboard_service import rebuild_user_scores
+
+
+class Command(BaseCommand):
+    help = "Przelicza tabelę UserScore (ranking) na podstawie logów zgadywania."
+
+    def handle(self, *args, **options):
+        users = rebuild_user_scores()
+        self.stdout.write(f"Przeliczono punkty {users} użytkowników")
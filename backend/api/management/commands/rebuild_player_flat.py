@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.services.catalog_service import bump_catalog_version
+from api.services.player_flat_service import rebuild_player_flat
+
+
+class Command(BaseCommand):
+    help = "Przebudowuje od zera tabelę PlayerFlat (kopia piłkarzy do odczytów)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        created = rebuild_player_flat(batch_size=options['batch_size'])
+        # kopie katalogu w pamięci procesów są ładowane z PlayerFlat
+        bump_catalog_version()
+        self.stdout.write(f"Zapisano {created} piłkarzy w PlayerFlat")
@@ -0,0 +1,102 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .services.metrics_service import get_metrics_registry
+from .services.slow_query_service import capture_slow_queries
+
+
+class QueryStats:
+    # execute_wrapper liczący zapytania SQL i ich łączny czas w obrębie jednego żądania
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def instrument_connections(wrapper):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+    return stack
+
+
+class AsyncCapableMiddleware:
+    # Działa w łańcuchu synchronicznym (WSGI) i asynchronicznym (ASGI) bez przejść między wątkami,
+    # które pod ASGI dokłada każdy middleware oparty na MiddlewareMixin
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    # Czas, liczba i czas zapytań SQL oraz rozmiar odpowiedzi per trasa (wzorzec z urls.py,
+    # a nie pełna ścieżka - stała liczba serii). Eksport: /api/metrics
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        with instrument_connections(stats):
+            response = self.get_response(request)
+        return self.observe(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        with instrument_connections(stats):
+            response = await self.get_response(request)
+        return self.observe(request, response, stats)
+
+    def observe(self, request, response, stats):
+        duration = time.perf_counter() - stats.started
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        if response.streaming:
+            size = response.get('Content-Length')
+            size = int(size) if size is not None else None
+        else:
+            size = len(response.content)
+        get_metrics_registry().observe_request(
+            route, request.method, response.status_code, duration, stats.count, stats.duration, size
+        )
+        return response
+
+
+class SlowQueryMiddleware(AsyncCapableMiddleware):
+    # Opt-in (SLOW_QUERY_ENABLED): odciski zapytań SQL z czasami i EXPLAIN wolnych zapytań,
+    # raport: /api/admin/slow-queries/
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_ENABLED:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with capture_slow_queries():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with capture_slow_queries():
+            return await self.get_response(request)
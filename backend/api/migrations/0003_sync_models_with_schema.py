@@ -0,0 +1,112 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('api', '0002_auto_add_sample_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transfer_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateField()),
+                ('from_club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers_from', to='api.club')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.player')),
+                ('to_club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers_to', to='api.club')),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='useraccount',
+            name='salt',
+        ),
+        migrations.AddField(
+            model_name='useraccount',
+            name='groups',
+            field=models.ManyToManyField(blank=True, to='auth.group'),
+        ),
+        migrations.AddField(
+            model_name='useraccount',
+            name='is_staff',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='useraccount',
+            name='is_superuser',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='useraccount',
+            name='last_login',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='last login'),
+        ),
+        migrations.AddField(
+            model_name='useraccount',
+            name='profile_picture',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='useraccount',
+            name='user_permissions',
+            field=models.ManyToManyField(blank=True, to='auth.permission'),
+        ),
+        migrations.AlterField(
+            model_name='useraccount',
+            name='id_role',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.role'),
+        ),
+        migrations.AlterField(
+            model_name='useraccount',
+            name='password',
+            field=models.CharField(max_length=128, verbose_name='password'),
+        ),
+        migrations.CreateModel(
+            name='UserPlayerAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assignment_date', models.DateField()),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.player')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserGuessLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('guess_date', models.DateField()),
+                ('guess_number', models.IntegerField(default=0)),
+                ('guessed_correctly', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TransferQuestionOfTheDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_date', models.DateField(default=django.utils.timezone.now, unique=True)),
+                ('transfer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.transfer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserGuessLogTransfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('guess_date', models.DateField()),
+                ('guess_number', models.IntegerField(default=0)),
+                ('guessed_correctly', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'guess_date')},
+            },
+        ),
+    ]
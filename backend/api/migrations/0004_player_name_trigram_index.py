@@ -0,0 +1,32 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Indeks GIN (pg_trgm) dla wyszukiwania podobnych nazwisk - tylko PostgreSQL,
+# na innych bazach (np. SQLite w testach) używany jest fallback w Pythonie.
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS api_player_name_trgm "
+        "ON api_player USING gin (name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS api_player_name_trgm")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("api", "0003_sync_models_with_schema"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from api.normalization import fold_name
+
+
+def fill_normalized_names(apps, schema_editor):
+    Player = apps.get_model("api", "Player")
+    seen = set()
+    for player in Player.objects.order_by('id').iterator():
+        normalized = fold_name(player.name)
+        # duplikaty nazw dostają sufiks z id; alias do zgadywania tworzy migracja 0014
+        if normalized in seen:
+            normalized = f"{normalized} #{player.pk}"
+        seen.add(normalized)
+        player.normalized_name = normalized
+        player.save(update_fields=['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_player_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='player',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=100, unique=True),
+        ),
+        migrations.CreateModel(
+            name='PlayerAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100)),
+                ('normalized_alias', models.CharField(editable=False, max_length=100, unique=True)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='api.player')),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+POINTS_PER_CORRECT_GUESS = 100
+
+
+# wypełnienie rankingu na podstawie dotychczasowych logów zgadywania
+def fill_user_scores(apps, schema_editor):
+    UserScore = apps.get_model("api", "UserScore")
+    UserGuessLog = apps.get_model("api", "UserGuessLog")
+    UserGuessLogTransfer = apps.get_model("api", "UserGuessLogTransfer")
+
+    scores = {}
+    for model, field in ((UserGuessLog, 'points_guess'), (UserGuessLogTransfer, 'points_transfer')):
+        counts = (
+            model.objects.filter(guessed_correctly=True)
+            .values('user_id').annotate(correct=models.Count('id'))
+            .values_list('user_id', 'correct')
+        )
+        for user_id, correct in counts:
+            score = scores.setdefault(user_id, UserScore(user_id=user_id))
+            setattr(score, field, correct * POINTS_PER_CORRECT_GUESS)
+
+    for score in scores.values():
+        score.total_points = score.points_guess + score.points_transfer
+    UserScore.objects.bulk_create(scores.values(), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_player_normalized_name_playeralias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserScore',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('points_guess', models.IntegerField(default=0)),
+                ('points_transfer', models.IntegerField(default=0)),
+                ('total_points', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_points', 'user'], name='api_userscore_ranking_idx')],
+            },
+        ),
+        migrations.RunPython(fill_user_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+def move_pictures_to_blob_store(apps, schema_editor):
+    from api.services.blob_store_service import put_blob
+
+    UserAccount = apps.get_model('api', 'UserAccount')
+    users = (
+        UserAccount.objects
+        .filter(profile_picture__isnull=False, profile_picture_hash__isnull=True)
+        .only('id', 'profile_picture')
+    )
+    for user in users.iterator(chunk_size=100):
+        if user.profile_picture:
+            user.profile_picture_hash = put_blob(bytes(user.profile_picture))
+        user.profile_picture = None
+        user.save(update_fields=['profile_picture_hash', 'profile_picture'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_userscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useraccount',
+            name='profile_picture_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(move_pictures_to_blob_store, migrations.RunPython.noop),
+    ]
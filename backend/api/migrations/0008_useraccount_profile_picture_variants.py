@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_move_profile_pictures_to_blob_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useraccount',
+            name='profile_picture_pending',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='useraccount',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# wypełnienie kopii do odczytów z tabel źródłowych
+def fill_player_flat(apps, schema_editor):
+    Player = apps.get_model("api", "Player")
+    PlayerFlat = apps.get_model("api", "PlayerFlat")
+
+    rows = Player.objects.order_by('id').values_list(
+        'id', 'name', 'country__name', 'league__name', 'club__name', 'position__name',
+        'age__value', 'shirt_number__number',
+    )
+    batch = []
+    for player_id, name, country, league, club, position, age, shirt_number in rows.iterator(chunk_size=5000):
+        batch.append(PlayerFlat(
+            player_id=player_id, name=name, country_name=country, league_name=league, club_name=club,
+            position_name=position, age_value=age, shirt_number_value=shirt_number,
+        ))
+        if len(batch) >= 5000:
+            PlayerFlat.objects.bulk_create(batch)
+            batch = []
+    PlayerFlat.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_useraccount_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerFlat',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='flat', serialize=False, to='api.player')),
+                ('name', models.CharField(max_length=100)),
+                ('country_name', models.CharField(max_length=100)),
+                ('league_name', models.CharField(max_length=100)),
+                ('club_name', models.CharField(max_length=100)),
+                ('position_name', models.CharField(max_length=50)),
+                ('age_value', models.IntegerField()),
+                ('shirt_number_value', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'player'], name='api_playerflat_name_idx'), models.Index(fields=['age_value', 'player'], name='api_playerflat_age_idx'), models.Index(fields=['country_name'], name='api_playerflat_country_idx'), models.Index(fields=['league_name'], name='api_playerflat_league_idx'), models.Index(fields=['position_name'], name='api_playerflat_position_idx')],
+            },
+        ),
+        migrations.RunPython(fill_player_flat, migrations.RunPython.noop),
+    ]
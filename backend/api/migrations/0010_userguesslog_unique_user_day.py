@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+# przed dodaniem unikalności scalamy zdublowane wpisy (użytkownik, dzień):
+# zostaje wpis o najmniejszym id z największą liczbą prób i zgadnięciem, jeśli było
+def merge_duplicate_guess_logs(apps, schema_editor):
+    UserGuessLog = apps.get_model("api", "UserGuessLog")
+    duplicates = (
+        UserGuessLog.objects.values('user_id', 'guess_date')
+        .annotate(n=models.Count('id'))
+        .filter(n__gt=1)
+    )
+    for duplicate in duplicates:
+        logs = list(
+            UserGuessLog.objects.filter(user_id=duplicate['user_id'], guess_date=duplicate['guess_date']).order_by('id')
+        )
+        kept = logs[0]
+        kept.guess_number = max(log.guess_number for log in logs)
+        kept.guessed_correctly = any(log.guessed_correctly for log in logs)
+        kept.save(update_fields=['guess_number', 'guessed_correctly'])
+        UserGuessLog.objects.filter(pk__in=[log.pk for log in logs[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_playerflat'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_guess_logs, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='userguesslog',
+            unique_together={('user', 'guess_date')},
+        ),
+    ]
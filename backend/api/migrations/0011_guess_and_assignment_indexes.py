@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_userguesslog_unique_user_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userguesslog',
+            index=models.Index(condition=models.Q(('guessed_correctly', True)), fields=['user'], name='api_guesslog_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userguesslogtransfer',
+            index=models.Index(condition=models.Q(('guessed_correctly', True)), fields=['user'], name='api_guesslogtr_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userplayerassignment',
+            index=models.Index(fields=['assignment_date', 'user'], name='api_assignment_day_user_idx'),
+        ),
+    ]
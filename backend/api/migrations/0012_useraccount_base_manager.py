@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 19:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_guess_and_assignment_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='useraccount',
+            options={'base_manager_name': 'objects'},
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# Indeksy do wyszukiwania użytkowników po prefiksie loginu / e-maila bez rozróżniania wielkości
+# liter (admin: /api/users/?search=, panel Django z search_fields '^login', '^email').
+# Django zamienia istartswith na UPPER("kolumna"::text) LIKE UPPER('abc%'), więc indeks jest
+# na tym samym wyrażeniu; varchar_pattern_ops pozwala użyć go dla LIKE przy dowolnym collation.
+# Tylko PostgreSQL - SQLite nie zna klas operatorów i i tak przegląda tabelę.
+SEARCH_INDEXES = {
+    'api_useraccount_login_upper_like': 'login',
+    'api_useraccount_email_upper_like': 'email',
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in SEARCH_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON api_useraccount (UPPER({column}::text) varchar_pattern_ops)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_useraccount_base_manager'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
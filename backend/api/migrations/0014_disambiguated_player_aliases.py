@@ -0,0 +1,36 @@
+from django.db import migrations
+
+from api.normalization import DISAMBIGUATION_SEPARATOR, fold_name
+
+
+# Piłkarze, którym migracja 0005 nadała klucz "<nazwa> #<id>" (nazwa zajęta przez innego piłkarza),
+# dostają alias "<nazwa> (<klub>)" - po nim można ich zgadnąć. Gdy i ten jest zajęty,
+# próbujemy "<nazwa> (<klub>, <kraj>)"; piłkarz bez wolnego aliasu zostaje tylko z kluczem.
+def create_aliases(apps, schema_editor):
+    Player = apps.get_model("api", "Player")
+    PlayerAlias = apps.get_model("api", "PlayerAlias")
+    taken = set(PlayerAlias.objects.values_list('normalized_alias', flat=True))
+    taken.update(Player.objects.values_list('normalized_name', flat=True))
+
+    players = Player.objects.filter(normalized_name__contains=DISAMBIGUATION_SEPARATOR).select_related('club', 'country')
+    for player in players.order_by('id').iterator():
+        if not player.normalized_name.endswith(f"{DISAMBIGUATION_SEPARATOR}{player.pk}"):
+            continue
+        for alias in (f"{player.name} ({player.club.name})", f"{player.name} ({player.club.name}, {player.country.name})"):
+            # historyczny model nie ma save() z modelu - normalized_alias ustawiamy sami
+            normalized = fold_name(alias)
+            if normalized not in taken and len(alias) <= 100:
+                PlayerAlias.objects.create(player=player, alias=alias, normalized_alias=normalized)
+                taken.add(normalized)
+                break
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_useraccount_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_aliases, migrations.RunPython.noop),
+    ]
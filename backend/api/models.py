@@ -5,11 +5,24 @@ from django.core.exceptions import ValidationError
 from django.conf import settings  
 from django.contrib.admin.models import LogEntry
 
+from .normalization import DISAMBIGUATION_SEPARATOR, fold_name
+
 # Token._meta.get_field('user').remote_field.model = settings.AUTH_USER_MODEL
 LogEntry._meta.get_field("user").remote_field.model = settings.AUTH_USER_MODEL
 
+class UserAccountQuerySet(models.QuerySet):
+    def with_profile_picture(self):
+        # jawne doczytanie przestarzałej kolumny profile_picture (bajty obrazka), domyślnie odroczonej
+        return self.defer(None)
+
+
 # Manager użytkowników
-class UserAccountManager(BaseUserManager):
+class UserAccountManager(BaseUserManager.from_queryset(UserAccountQuerySet)):
+    def get_queryset(self):
+        # profile_picture nie jest potrzebne przy logowaniu, listach i panelu admina - nie pobieramy
+        # bajtów obrazka z bazy; save() na takim obiekcie nie nadpisuje kolumny
+        return super().get_queryset().defer('profile_picture')
+
     def create_user(self, email, login, password=None, **extra_fields):
         if not email:
             raise ValueError("Użytkownik musi mieć adres e-mail")
@@ -46,7 +59,14 @@ class UserAccount(AbstractBaseUser, PermissionsMixin):
     login = models.CharField(max_length=50, unique=True)
     enabled = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # przestarzałe - obrazki są w magazynie "blobs" (profile_picture_hash), kolumna jest już pusta
     profile_picture = models.BinaryField(null=True, blank=True)
+    # skrót SHA-256 zdjęcia profilowego w magazynie "blobs"
+    profile_picture_hash = models.CharField(max_length=64, null=True, blank=True)
+    # warianty po przetworzeniu: {"avatar": {"webp": skrót, "jpeg": skrót}, "thumbnail": {...}}
+    profile_picture_variants = models.JSONField(null=True, blank=True)
+    # token trwającego przetwarzania w Celery (None = nic nie czeka)
+    profile_picture_pending = models.CharField(max_length=32, null=True, blank=True)
     # atrybuty wymagane do panelu admina
     is_staff = models.BooleanField(default=False) 
     is_superuser = models.BooleanField(default=False)  
@@ -66,6 +86,10 @@ class UserAccount(AbstractBaseUser, PermissionsMixin):
         blank=True
     )
 
+    class Meta:
+        # także odwołania przez klucze obce (np. log.user) pomijają bajty profile_picture
+        base_manager_name = 'objects'
+
     def clean(self):
         if len(self.login) < 4:
             raise ValidationError("Login musi mieć co najmniej 4 znaki.")
@@ -139,21 +163,112 @@ class Player(models.Model):
     position = models.ForeignKey(Position, on_delete=models.CASCADE)
     age = models.ForeignKey(Age, on_delete=models.CASCADE)
     shirt_number = models.ForeignKey(ShirtNumber, on_delete=models.CASCADE)
+    # nazwa bez wielkości liter i znaków diakrytycznych ("Łukasz" == "lukasz"), po niej szukamy piłkarza
+    normalized_name = models.CharField(max_length=100, unique=True, editable=False)
+
+    def normalized_key(self):
+        folded = fold_name(self.name)
+        # klucz z sufiksem " #id" (powtórzona nazwa, migracja 0005) zostaje, dopóki nie zmieni się nazwa -
+        # sama nazwa jest już zajęta przez pierwszego piłkarza o tej nazwie
+        if self.normalized_name.rsplit(DISAMBIGUATION_SEPARATOR, 1)[0] == folded:
+            return self.normalized_name
+        return folded
+
+    def validate_unique(self, exclude=None):
+        # normalized_name nie jest edytowalne, więc formularz (panel admina) pomija je przy sprawdzaniu
+        # unikalności i powtórzona nazwa kończyła się IntegrityError - sprawdzamy ją jako błąd pola name
+        exclude = {*(exclude or ()), 'normalized_name'}
+        super().validate_unique(exclude=exclude)
+        if 'name' in exclude:
+            return
+        if Player.objects.filter(normalized_name=self.normalized_key()).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': "Piłkarz o tej nazwie już istnieje (bez względu na wielkość liter "
+                                           "i znaki diakrytyczne). Dodaj wyróżnik, np. klub w nawiasie."})
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = self.normalized_key()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+# denormalizowana kopia piłkarza do odczytów: nazwy i wartości ze słowników w jednym wierszu,
+# utrzymywana sygnałami (api/signals.py), przebudowa: manage.py rebuild_player_flat
+class PlayerFlat(models.Model):
+    player = models.OneToOneField(Player, primary_key=True, related_name='flat', on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    country_name = models.CharField(max_length=100)
+    league_name = models.CharField(max_length=100)
+    club_name = models.CharField(max_length=100)
+    position_name = models.CharField(max_length=50)
+    age_value = models.IntegerField()
+    shirt_number_value = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            # stronicowanie kursorem listy piłkarzy: (kolumna sortowania, id) - id rozstrzyga remisy;
+            # sortowanie po wieku idzie po age_value w tym samym wierszu, bez złączenia z Age
+            models.Index(fields=['name', 'player'], name='api_playerflat_name_idx'),
+            models.Index(fields=['age_value', 'player'], name='api_playerflat_age_idx'),
+            models.Index(fields=['country_name'], name='api_playerflat_country_idx'),
+            models.Index(fields=['league_name'], name='api_playerflat_league_idx'),
+            models.Index(fields=['position_name'], name='api_playerflat_position_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+# tabela alternatywnych nazw piłkarzy (pseudonimy, inne zapisy nazwiska)
+class PlayerAlias(models.Model):
+    player = models.ForeignKey(Player, related_name='aliases', on_delete=models.CASCADE)
+    alias = models.CharField(max_length=100)
+    normalized_alias = models.CharField(max_length=100, unique=True, editable=False)
+
+    def validate_unique(self, exclude=None):
+        # jak w Player: formularz pomija nieedytowalne normalized_alias
+        exclude = {*(exclude or ()), 'normalized_alias'}
+        super().validate_unique(exclude=exclude)
+        if 'alias' in exclude:
+            return
+        if PlayerAlias.objects.filter(normalized_alias=fold_name(self.alias)).exclude(pk=self.pk).exists():
+            raise ValidationError({'alias': "Taki alias już istnieje (bez względu na wielkość liter i znaki diakrytyczne)."})
+
+    def save(self, *args, **kwargs):
+        self.normalized_alias = fold_name(self.alias)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.alias} ➜ {self.player.name}"
+
 class UserPlayerAssignment(models.Model):
     user = models.ForeignKey(UserAccount, on_delete=models.CASCADE)
     player = models.ForeignKey(Player, on_delete=models.CASCADE)
     assignment_date = models.DateField()
 
+    class Meta:
+        indexes = [
+            # równość na obu kolumnach: przydział (użytkownik, dzień) w grze dziennej,
+            # a dzień na początku obsługuje też backfill_player_assignments (przydziały z danego dnia);
+            # same zapytania po użytkowniku ma już indeks klucza obcego
+            models.Index(fields=['assignment_date', 'user'], name='api_assignment_day_user_idx'),
+        ]
+
 class UserGuessLog(models.Model):
     user = models.ForeignKey(UserAccount, on_delete=models.CASCADE)
     guess_date = models.DateField()
     guess_number = models.IntegerField(default=0)
     guessed_correctly = models.BooleanField(default=False)
 
+    class Meta:
+        unique_together = ('user', 'guess_date')
+        indexes = [
+            # indeks częściowy tylko z trafieniami: liczba trafień na użytkownika (przeliczanie rankingu)
+            models.Index(fields=['user'], condition=models.Q(guessed_correctly=True), name='api_guesslog_correct_idx'),
+        ]
+
 class Transfer(models.Model):
     player = models.ForeignKey(Player, on_delete=models.CASCADE)
     from_club = models.ForeignKey(Club, related_name='transfers_from', on_delete=models.CASCADE)
@@ -179,6 +294,26 @@ class UserGuessLogTransfer(models.Model):
 
     class Meta:
         unique_together = ('user', 'guess_date')
+        indexes = [
+            models.Index(fields=['user'], condition=models.Q(guessed_correctly=True), name='api_guesslogtr_correct_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.login} - {self.guess_date} ({'✔' if self.guessed_correctly else '✘'})"
+
+
+# tabela punktów użytkowników (ranking) - aktualizowana przy każdym trafieniu,
+# żeby profil i ranking nie liczyły logów zgadywania przy każdym odczycie
+class UserScore(models.Model):
+    user = models.OneToOneField(UserAccount, primary_key=True, related_name='score', on_delete=models.CASCADE)
+    points_guess = models.IntegerField(default=0)
+    points_transfer = models.IntegerField(default=0)
+    total_points = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-total_points', 'user'], name='api_userscore_ranking_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.login}: {self.total_points} pkt"
@@ -0,0 +1,18 @@
+import unicodedata
+
+# Litery, których NFKD nie rozkłada na literę bazową + znak diakrytyczny
+_EXTRA_FOLDS = str.maketrans({
+    'ł': 'l', 'ø': 'o', 'đ': 'd', 'ð': 'd', 'ħ': 'h', 'ı': 'i', 'ŧ': 't',
+    'æ': 'ae', 'œ': 'oe', 'þ': 'th',
+})
+
+# Piłkarze o powtórzonej nazwie mają normalized_name "<nazwa> #<id>" (migracja 0005)
+# i alias "<nazwa> (<klub>)" (migracja 0014)
+DISAMBIGUATION_SEPARATOR = ' #'
+
+
+def fold_name(text):
+    # "  Łukasz  Fabiański " -> "lukasz fabianski"
+    text = unicodedata.normalize('NFKD', text.casefold().translate(_EXTRA_FOLDS))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split())
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Player, Role, Transfer, TransferQuestionOfTheDay, UserAccount, Country, League, Club, Position, Age, ShirtNumber, UserGuessLog, UserGuessLogTransfer, UserPlayerAssignment
-import base64
+from .services.leaderboard_service import POINTS_PER_CORRECT_GUESS, get_user_score
+from .services.user_profile_service import get_profile_picture_url
 
 # serializer dla pikarzy
 class PlayerSerializer(serializers.ModelSerializer):
@@ -24,7 +25,8 @@ class PlayerSerializer(serializers.ModelSerializer):
 class UserAccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserAccount
-        fields = '__all__'
+        # bez hasha hasła i surowych bajtów profile_picture (zdjęcie jest pod profile_picture_hash)
+        exclude = ['password', 'profile_picture']
 
 # serializer dla ról użytkowników
 class RoleSerializer(serializers.ModelSerializer):
@@ -96,15 +98,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'login', 'email', 'created_at', 'points_guess', 'points_transfer', 'profile_picture']
 
     def get_profile_picture(self, obj):
-        if obj.profile_picture:
-            return base64.b64encode(obj.profile_picture).decode('utf-8')
-        return None
+        return get_profile_picture_url(obj)
 
+    # serializer zwraca liczbę trafień (jak przed tabelą rankingu), a nie punkty
     def get_points_guess(self, obj):
-        return UserGuessLog.objects.filter(user=obj, guessed_correctly=True).count()
+        return get_user_score(obj).points_guess // POINTS_PER_CORRECT_GUESS
 
     def get_points_transfer(self, obj):
-        return UserGuessLogTransfer.objects.filter(user=obj, guessed_correctly=True).count()
+        return get_user_score(obj).points_transfer // POINTS_PER_CORRECT_GUESS
     
 # serializer dla transferów
 class TransferSerializer(serializers.ModelSerializer):
@@ -0,0 +1,93 @@
+import threading
+from bisect import bisect_left, insort
+
+from api.models import Player
+from api.normalization import fold_name
+from api.services.catalog_service import get_catalog_version
+
+
+def name_keys(name):
+    # Klucze wyszukiwania: całe imię i nazwisko oraz każdy sufiks zaczynający się
+    # od kolejnego słowa ("lewan" -> "Robert Lewandowski", "van d" -> "Virgil van Dijk")
+    tokens = fold_name(name).split()
+    return sorted({' '.join(tokens[i:]) for i in range(len(tokens))})
+
+
+class NamePrefixIndex:
+    # Posortowana lista par (klucz, id piłkarza) przeszukiwana bisekcją
+
+    def __init__(self, version, players):
+        self.version = version
+        self.lock = threading.Lock()
+        self.names = {}
+        self.keys_by_id = {}
+        entries = []
+        for player_id, name in players:
+            keys = name_keys(name)
+            self.names[player_id] = name
+            self.keys_by_id[player_id] = keys
+            entries.extend((key, player_id) for key in keys)
+        entries.sort()
+        self.entries = entries
+
+    def search(self, query, limit=10):
+        prefix = fold_name(query)
+        if not prefix:
+            return []
+
+        found = []
+        seen = set()
+        with self.lock:
+            position = bisect_left(self.entries, (prefix,))
+            while position < len(self.entries) and len(found) < limit:
+                key, player_id = self.entries[position]
+                if not key.startswith(prefix):
+                    break
+                if player_id not in seen:
+                    seen.add(player_id)
+                    found.append(self.names[player_id])
+                position += 1
+        return found
+
+    def put(self, player_id, name):
+        with self.lock:
+            self._remove(player_id)
+            keys = name_keys(name)
+            self.names[player_id] = name
+            self.keys_by_id[player_id] = keys
+            for key in keys:
+                insort(self.entries, (key, player_id))
+
+    def remove(self, player_id):
+        with self.lock:
+            self._remove(player_id)
+
+    def _remove(self, player_id):
+        for key in self.keys_by_id.pop(player_id, ()):
+            position = bisect_left(self.entries, (key, player_id))
+            if position < len(self.entries) and self.entries[position] == (key, player_id):
+                del self.entries[position]
+        self.names.pop(player_id, None)
+
+
+_index = None
+
+
+def get_name_index():
+    # Pełna przebudowa tylko gdy katalog zmienił inny proces
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is None or index.version != version:
+        players = Player.objects.values_list('id', 'name').iterator(chunk_size=10000)
+        index = NamePrefixIndex(version, players)
+        _index = index
+    return index
+
+
+def get_fresh_name_index():
+    # Indeks, o ile jest załadowany i aktualny (do aktualizacji w miejscu)
+    index = _index
+    if index is not None and index.version == get_catalog_version():
+        return index
+    return None
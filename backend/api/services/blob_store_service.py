@@ -0,0 +1,77 @@
+import hashlib
+import re
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+
+from api.exceptions import BlobNotFoundException
+
+# Magazyn plików adresowanych treścią: nazwa pliku = SHA-256 zawartości,
+# więc te same bajty zapisujemy raz, a raz wydany URL nigdy się nie zmienia.
+BLOB_STORAGE_ALIAS = 'blobs'
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def get_blob_storage():
+    return storages[BLOB_STORAGE_ALIAS]
+
+
+def blob_name(digest):
+    if not DIGEST_RE.match(digest or ''):
+        raise BlobNotFoundException()
+    # dwa poziomy katalogów, żeby nie trzymać milionów plików w jednym katalogu
+    return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def put_blob(content):
+    # content: bytes albo plik Django (liczymy skrót strumieniowo, po kawałkach)
+    file = ContentFile(content) if isinstance(content, (bytes, bytearray, memoryview)) else content
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    storage = get_blob_storage()
+    name = blob_name(digest)
+    if not storage.exists(name):
+        file.seek(0)
+        storage.save(name, file)
+    return digest
+
+
+def open_blob(digest):
+    storage = get_blob_storage()
+    name = blob_name(digest)
+    if not storage.exists(name):
+        raise BlobNotFoundException()
+    return storage.open(name, 'rb')
+
+
+def guess_content_type(head):
+    # rozpoznajemy format po sygnaturze pliku, bo w magazynie nie trzymamy rozszerzeń
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def get_blob_modified_time(digest):
+    if not DIGEST_RE.match(digest or ''):
+        return None
+    storage = get_blob_storage()
+    name = blob_name(digest)
+    if not storage.exists(name):
+        return None
+    try:
+        return storage.get_modified_time(name)
+    except NotImplementedError:
+        return None
+
+
+def delete_blob(digest):
+    get_blob_storage().delete(blob_name(digest))
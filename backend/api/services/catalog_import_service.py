@@ -0,0 +1,226 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+
+from api.models import Age, Club, Country, League, Player, Position, ShirtNumber, Transfer
+from api.normalization import fold_name
+from api.services.catalog_service import bump_catalog_version
+from api.services.player_flat_service import sync_player_flat
+
+# kolumny plików CSV (pierwszy wiersz to nagłówek)
+PLAYER_CSV_COLUMNS = ('name', 'country', 'league', 'club', 'position', 'age', 'shirt_number')
+TRANSFER_CSV_COLUMNS = ('player', 'from_club', 'to_club', 'transfer_amount', 'date')
+
+# kolumna CSV -> (słownik, pole wartości w słowniku)
+PLAYER_LOOKUPS = {
+    'country': (Country, 'name'),
+    'league': (League, 'name'),
+    'club': (Club, 'name'),
+    'position': (Position, 'name'),
+    'age': (Age, 'value'),
+    'shirt_number': (ShirtNumber, 'number'),
+}
+
+# Tabele tymczasowe (per połączenie), do których partia trafia przed scaleniem
+# z docelową tabelą jednym INSERT ... SELECT
+PLAYER_STAGING = (
+    'import_player',
+    (('name', 'varchar(100)'), ('normalized_name', 'varchar(100)'), ('country_id', 'bigint'),
+     ('league_id', 'bigint'), ('club_id', 'bigint'), ('position_id', 'bigint'), ('age_id', 'bigint'),
+     ('shirt_number_id', 'bigint')),
+)
+TRANSFER_STAGING = (
+    'import_transfer',
+    (('player_id', 'bigint'), ('from_club_id', 'bigint'), ('to_club_id', 'bigint'),
+     ('transfer_amount', 'numeric(12, 2)'), ('date', 'date')),
+)
+# transfer nie ma klucza naturalnego w bazie - za ten sam uznajemy (piłkarz, skąd, dokąd, data)
+TRANSFER_KEY = ('player_id', 'from_club_id', 'to_club_id', 'date')
+
+
+class LookupCache:
+    # Wartość słownika -> id, w pamięci; brakujące wpisy są tworzone jednym bulk_create na partię
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        # przy zdublowanych wartościach wygrywa najstarszy wpis
+        self.ids = dict(model.objects.order_by('-id').values_list(field, 'id'))
+        self.created = 0
+
+    def resolve(self, values):
+        missing = [value for value in dict.fromkeys(values) if value not in self.ids]
+        if missing:
+            for obj in self.model.objects.bulk_create([self.model(**{self.field: value}) for value in missing]):
+                self.ids[getattr(obj, self.field)] = obj.pk
+            self.created += len(missing)
+        return self.ids
+
+
+def read_chunks(file, columns, chunk_size):
+    # (numer linii, wiersz) partiami po chunk_size, bez wczytywania całego pliku
+    reader = csv.DictReader(file)
+    missing = [column for column in columns if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"Brak kolumn w nagłówku: {', '.join(missing)}")
+    rows = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_field(line, column, value, parse):
+    value = (value or '').strip()
+    if not value:
+        raise ValueError(f"Linia {line}: puste pole {column}")
+    try:
+        return parse(value)
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"Linia {line}: nieprawidłowa wartość {column}: {value!r}")
+
+
+def create_staging_table(cursor, staging):
+    table, columns = staging
+    cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} ({', '.join(f'{name} {kind}' for name, kind in columns)})")
+    cursor.execute(f"DELETE FROM {table}")
+
+
+def stage_rows(cursor, staging, rows):
+    # PostgreSQL: COPY z bufora CSV (jedno polecenie na partię); inne bazy: executemany
+    table, columns = staging
+    names = ', '.join(name for name, _ in columns)
+    if connection.vendor == 'postgresql':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        placeholders = ', '.join(['%s'] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({names}) VALUES ({placeholders})", rows)
+
+
+def count_existing(cursor, staging, target, condition):
+    # ile wierszy partii ma już odpowiednik w docelowej tabeli (pominięte albo nadpisane)
+    cursor.execute(f"SELECT COUNT(*) FROM {staging} WHERE EXISTS (SELECT 1 FROM {target} WHERE {condition})")
+    return cursor.fetchone()[0]
+
+
+def import_players(file, upsert=False, chunk_size=5000):
+    # Zwraca (liczba wierszy, utworzone wpisy słowników, istniejący piłkarze). Piłkarza identyfikuje
+    # nazwa (transfery też wskazują go nazwą): bez upsert istniejący piłkarze (ten sam normalized_name)
+    # są pomijani, z upsert - nadpisywani danymi z pliku; ich liczbę raportuje import_catalog.
+    # Dwa różne wiersze z tą samą nazwą w pliku to błąd - różnych piłkarzy o tej samej nazwie
+    # rozróżnia klucz z sufiksem i alias (migracje 0005, 0014), nie import.
+    lookups = {column: LookupCache(model, field) for column, (model, field) in PLAYER_LOOKUPS.items()}
+    columns = [name for name, _ in PLAYER_STAGING[1]]
+    target = connection.ops.quote_name(Player._meta.db_table)
+    # WHERE true: bez niego SQLite myli ON CONFLICT z klauzulą złączenia w SELECT
+    conflict = 'DO NOTHING'
+    if upsert:
+        conflict = 'DO UPDATE SET ' + ', '.join(
+            f"{column} = excluded.{column}" for column in columns if column != 'normalized_name'
+        )
+    merge = (
+        f"INSERT INTO {target} ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM {PLAYER_STAGING[0]} WHERE true "
+        f"ON CONFLICT (normalized_name) {conflict}"
+    )
+
+    existing_condition = f"{target}.normalized_name = {PLAYER_STAGING[0]}.normalized_name"
+
+    total = existing = 0
+    # znormalizowana nazwa -> (linia, dane) z całego pliku
+    seen = {}
+    for chunk in read_chunks(file, PLAYER_CSV_COLUMNS, chunk_size):
+        parsed = {}
+        for line, row in chunk:
+            name = ' '.join(parse_field(line, 'name', row['name'], str).split())
+            values = {
+                column: parse_field(line, column, row[column], int if field != 'name' else str)
+                for column, (_, field) in PLAYER_LOOKUPS.items()
+            }
+            key = fold_name(name)
+            if key in seen and seen[key][1] != values:
+                raise ValueError(
+                    f"Linia {line}: piłkarz {name!r} ma tę samą nazwę co w linii {seen[key][0]}, ale inne dane"
+                )
+            # powtórzony identyczny wiersz jest pomijany
+            seen.setdefault(key, (line, values))
+            parsed[key] = (name, values)
+
+        with transaction.atomic():
+            ids = {
+                column: cache.resolve([values[column] for _, values in parsed.values()])
+                for column, cache in lookups.items()
+            }
+            rows = [
+                (name, key, *(ids[column][values[column]] for column in PLAYER_LOOKUPS))
+                for key, (name, values) in parsed.items()
+            ]
+            with connection.cursor() as cursor:
+                create_staging_table(cursor, PLAYER_STAGING)
+                stage_rows(cursor, PLAYER_STAGING, rows)
+                existing += count_existing(cursor, PLAYER_STAGING[0], target, existing_condition)
+                cursor.execute(merge)
+            # surowy SQL omija sygnały, więc kopię do odczytów odświeżamy sami
+            sync_player_flat(Player.objects.filter(normalized_name__in=parsed).values_list('id', flat=True))
+        total += len(chunk)
+
+    bump_catalog_version()
+    return total, {cache.model.__name__: cache.created for cache in lookups.values() if cache.created}, existing
+
+
+def import_transfers(file, upsert=False, chunk_size=5000):
+    # Piłkarz musi już istnieć (szukany po znormalizowanej nazwie), kluby są tworzone w razie potrzeby.
+    # Transfer o tym samym kluczu (TRANSFER_KEY) nie jest dublowany; z upsert dostaje kwotę z pliku.
+    clubs = LookupCache(Club, 'name')
+    players = dict(Player.objects.values_list('normalized_name', 'id').iterator(chunk_size=10000))
+    columns = [name for name, _ in TRANSFER_STAGING[1]]
+    target = connection.ops.quote_name(Transfer._meta.db_table)
+    staging = TRANSFER_STAGING[0]
+    same_transfer = ' AND '.join(f"{target}.{column} = {staging}.{column}" for column in TRANSFER_KEY)
+    update = (
+        f"UPDATE {target} SET transfer_amount = {staging}.transfer_amount "
+        f"FROM {staging} WHERE {same_transfer}"
+    )
+    insert = (
+        f"INSERT INTO {target} ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM {staging} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {target} WHERE {same_transfer})"
+    )
+
+    total = existing = 0
+    for chunk in read_chunks(file, TRANSFER_CSV_COLUMNS, chunk_size):
+        parsed = {}
+        for line, row in chunk:
+            player = parse_field(line, 'player', row['player'], fold_name)
+            if player not in players:
+                raise ValueError(f"Linia {line}: nie znaleziono piłkarza {row['player'].strip()!r}")
+            from_club = ' '.join(parse_field(line, 'from_club', row['from_club'], str).split())
+            to_club = ' '.join(parse_field(line, 'to_club', row['to_club'], str).split())
+            amount = parse_field(line, 'transfer_amount', row['transfer_amount'], Decimal)
+            day = parse_field(line, 'date', row['date'], date.fromisoformat)
+            parsed[(players[player], from_club, to_club, day)] = amount
+
+        with transaction.atomic():
+            club_ids = clubs.resolve([club for _, from_club, to_club, _ in parsed for club in (from_club, to_club)])
+            rows = [
+                (player_id, club_ids[from_club], club_ids[to_club], str(amount), day.isoformat())
+                for (player_id, from_club, to_club, day), amount in parsed.items()
+            ]
+            with connection.cursor() as cursor:
+                create_staging_table(cursor, TRANSFER_STAGING)
+                stage_rows(cursor, TRANSFER_STAGING, rows)
+                existing += count_existing(cursor, staging, target, same_transfer)
+                if upsert:
+                    cursor.execute(update)
+                cursor.execute(insert)
+        total += len(chunk)
+
+    bump_catalog_version()
+    return total, {'Club': clubs.created} if clubs.created else {}, existing
@@ -0,0 +1,38 @@
+from array import array
+from uuid import uuid4
+
+from django.core.cache import cache
+
+# Klucz w cache ze współdzieloną wersją katalogu (piłkarze, transfery, słowniki).
+# Wersja jest losowym tokenem, a nie licznikiem, więc wyczyszczenie cache zawsze
+# unieważnia lokalne kopie trzymane w pamięci procesów.
+CATALOG_VERSION_KEY = 'catalog_version'
+
+# Lokalne (per proces) kopie list id, zależne od wersji katalogu
+_ordered_ids = {}
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    version = uuid4().hex
+    cache.set(CATALOG_VERSION_KEY, version, None)
+    return version
+
+
+def get_ordered_ids(model):
+    # Stabilna (rosnąca) lista id wierszy modelu, odświeżana tylko po zmianie katalogu.
+    # array('q') zajmuje 8 bajtów na id (1M wierszy to ~8 MB).
+    version = get_catalog_version()
+    entry = _ordered_ids.get(model._meta.label)
+    if entry is None or entry[0] != version:
+        ids = array('q', model.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=10000))
+        entry = (version, ids)
+        _ordered_ids[model._meta.label] = entry
+    return entry[1]
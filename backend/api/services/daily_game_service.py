@@ -1,21 +1,47 @@
 from datetime import date
+from django.conf import settings
+from django.db import transaction
 from api.models import Player, UserGuessLog, UserPlayerAssignment
 from api.exceptions import (
     MissingPlayerNameException,
     PlayerNotFoundException,
     NoMoreAttemptsException,
-    AlreadyGuessedException
+    AlreadyGuessedException,
+    NoPlayersFoundException
 )
+from api.services.autocomplete_service import get_name_index
+from api.services.daily_target_service import pick_daily_player_id
+from api.services.fuzzy_name_service import suggest_similar_names
+from api.services.guess_log_service import MAX_ATTEMPTS, get_guess_state, record_guess
+from api.services.leaderboard_service import GAME_GUESS, record_correct_guess
+from api.services.player_catalog import get_player_catalog
+from api.services.player_resolver_service import resolve_player_id
+from api.services.sampling_service import sample_ids
 
 
-def get_or_assign_today_player(user):
+def get_today_player_id(user):
     today = date.today()
-    assignment, _ = UserPlayerAssignment.objects.get_or_create(
-        user=user,
-        assignment_date=today,
-        defaults={'player': Player.objects.order_by('?').first()}
-    )
-    return assignment.player
+    # piłkarz dnia wynika z hasha (użytkownik, dzień) - bez ORDER BY RANDOM() i bez zapisu
+    player_id = pick_daily_player_id(user.pk, today)
+    if player_id is None:
+        raise NoPlayersFoundException()
+
+    # tryb audytu: przydział zapisujemy w bazie, a istniejący wpis ma pierwszeństwo
+    if settings.DAILY_TARGET_PERSIST_ASSIGNMENTS:
+        assignment, _ = UserPlayerAssignment.objects.get_or_create(
+            user=user,
+            assignment_date=today,
+            defaults={'player_id': player_id}
+        )
+        return assignment.player_id
+
+    return player_id
+
+
+def get_or_assign_today_player(user):
+    return Player.objects.select_related(
+        'country', 'league', 'club', 'position', 'age', 'shirt_number'
+    ).get(pk=get_today_player_id(user))
 
 
 def compare_values(val1, val2):
@@ -32,55 +58,58 @@ def handle_player_guess(user, player_name):
         raise MissingPlayerNameException()
 
     today = date.today()
-    target_player = get_or_assign_today_player(user)
-
-    try:
-        guessed_player = Player.objects.select_related(
-            'country', 'league', 'club', 'position', 'age', 'shirt_number'
-        ).get(name=player_name)
-    except Player.DoesNotExist:
-        guess_log, _ = UserGuessLog.objects.get_or_create(user=user, guess_date=today)
-        guess_log.guess_number += 1
-        guess_log.save()
-
-        remaining_attempts = max(0, 5 - guess_log.guess_number)
+    # porównanie odbywa się na kopii katalogu w pamięci - bez joinów do słowników
+    catalog = get_player_catalog()
+    target_row = catalog.row(get_today_player_id(user))
+    target_name = catalog.names[target_row]
+    guessed_player_id = resolve_player_id(player_name)
+
+    if guessed_player_id is None:
+        # nieznany piłkarz też zużywa próbę
+        recorded = record_guess(UserGuessLog, user, today, correct=False)
+        if recorded is None:
+            guess_number, guessed_correctly = get_guess_state(UserGuessLog, user, today)
+            if guessed_correctly:
+                raise AlreadyGuessedException(detail=f"Już zgadłeś. Piłkarz to: {target_name}.")
+        else:
+            guess_number, _ = recorded
+
+        remaining_attempts = max(0, MAX_ATTEMPTS - guess_number)
         game_over = remaining_attempts == 0
         return {
             'status': 404,
             'data': {
-                'error': f"Skończyły Ci się próby na dzisiaj. Gra zakończona. Szukanym piłkarzem był: {target_player.name}." if game_over else 'Nie znaleziono piłkarza.',
+                'error': f"Skończyły Ci się próby na dzisiaj. Gra zakończona. Szukanym piłkarzem był: {target_name}." if game_over else 'Nie znaleziono piłkarza.',
                 'remaining_attempts': remaining_attempts,
-                'game_over': game_over
+                'game_over': game_over,
+                # podpowiedzi "czy chodziło o..." dla literówek
+                'suggestions': [] if game_over else suggest_similar_names(player_name)
             }
         }
 
-    guess_log, _ = UserGuessLog.objects.get_or_create(user=user, guess_date=today)
+    guessed_row = catalog.row(guessed_player_id)
 
-    if guess_log.guessed_correctly:
-        raise AlreadyGuessedException(detail=f"Już zgadłeś. Piłkarz to: {target_player.name}.")
-
-    if guess_log.guess_number >= 5:
-        raise NoMoreAttemptsException(detail=f"Brak prób. Piłkarz to: {target_player.name}.")
-
-    guess_log.guess_number += 1
-
-    match_dict = {
-        'country': guessed_player.country.name == target_player.country.name,
-        'league': guessed_player.league.name == target_player.league.name,
-        'club': guessed_player.club.name == target_player.club.name,
-        'position': guessed_player.position.name == target_player.position.name,
-        'age': guessed_player.age.value == target_player.age.value,
-        'shirt_number': guessed_player.shirt_number.number == target_player.shirt_number.number,
-        'age_comparison': compare_values(guessed_player.age.value, target_player.age.value),
-        'shirt_number_comparison': compare_values(guessed_player.shirt_number.number, target_player.shirt_number.number)
-    }
+    match_dict = catalog.matches(guessed_row, target_row)
+    match_dict['age_comparison'] = compare_values(catalog.ages[guessed_row], catalog.ages[target_row])
+    match_dict['shirt_number_comparison'] = compare_values(
+        catalog.shirt_numbers[guessed_row], catalog.shirt_numbers[target_row]
+    )
 
     game_over = all(match_dict.values())
-    if game_over:
-        guess_log.guessed_correctly = True
-
-    guess_log.save()
-    remaining_attempts = max(0, 5 - guess_log.guess_number)
+    # zapis próby i punkty w jednej transakcji; limit i "już zgadnięte" sprawdza sam UPDATE
+    with transaction.atomic():
+        recorded = record_guess(UserGuessLog, user, today, correct=game_over)
+        if recorded is not None and game_over:
+            record_correct_guess(user, GAME_GUESS)
+
+    if recorded is None:
+        _, guessed_correctly = get_guess_state(UserGuessLog, user, today)
+        if guessed_correctly:
+            raise AlreadyGuessedException(detail=f"Już zgadłeś. Piłkarz to: {target_name}.")
+        raise NoMoreAttemptsException(detail=f"Brak prób. Piłkarz to: {target_name}.")
+    guess_number, _ = recorded
+
+    remaining_attempts = max(0, MAX_ATTEMPTS - guess_number)
     game_over_due_to_attempts = remaining_attempts == 0 and not game_over
 
     return {
@@ -88,19 +117,11 @@ def handle_player_guess(user, player_name):
         'data': {
             'correct': game_over,
             'remaining_attempts': remaining_attempts,
-            'player_data': {
-                'name': guessed_player.name,
-                'country': guessed_player.country.name,
-                'league': guessed_player.league.name,
-                'club': guessed_player.club.name,
-                'position': guessed_player.position.name,
-                'age': guessed_player.age.value,
-                'number': guessed_player.shirt_number.number,
-            },
+            'player_data': catalog.describe(guessed_row),
             'matches': match_dict,
             'message': (
-                f"Brawo! Zgadłeś! Szukanym piłkarzem był: {target_player.name}." if game_over else (
-                    f"Skończyły Ci się próby na dzisiaj. Gra zakończona. Szukanym piłkarzem był: {target_player.name}." if game_over_due_to_attempts else "Spróbuj ponownie."
+                f"Brawo! Zgadłeś! Szukanym piłkarzem był: {target_name}." if game_over else (
+                    f"Skończyły Ci się próby na dzisiaj. Gra zakończona. Szukanym piłkarzem był: {target_name}." if game_over_due_to_attempts else "Spróbuj ponownie."
                 )
             ),
             'game_over': game_over or game_over_due_to_attempts
@@ -111,11 +132,11 @@ def handle_player_guess(user, player_name):
 def get_daily_game_status(user):
     today = date.today()
     guess_log, _ = UserGuessLog.objects.get_or_create(user=user, guess_date=today)
-    remaining_attempts = max(0, 5 - guess_log.guess_number)
+    remaining_attempts = max(0, MAX_ATTEMPTS - guess_log.guess_number)
     guessed_correctly = guess_log.guessed_correctly
     game_over = remaining_attempts == 0
 
-    target_player = get_or_assign_today_player(user)
+    target_player_id = get_today_player_id(user)
 
     data = {
         'remaining_attempts': remaining_attempts,
@@ -125,14 +146,14 @@ def get_daily_game_status(user):
 
     # Ujawniam target_player_name tylko jeśli gra się zakończyła
     if guessed_correctly or game_over:
-        data['target_player_name'] = target_player.name
+        catalog = get_player_catalog()
+        data['target_player_name'] = catalog.names[catalog.row(target_player_id)]
 
     return data
 
 
 def get_player_name_suggestions(query):
     if query:
-        players = Player.objects.filter(name__istartswith=query)[:10]
-    else:
-        players = Player.objects.order_by('?')[:10]
+        return get_name_index().search(query, limit=10)
+    players = Player.objects.filter(pk__in=sample_ids(Player, 10))
     return [player.name for player in players]
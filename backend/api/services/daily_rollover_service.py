@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import TransferQuestionOfTheDay
+from .transfer_game_service import create_transfer_questions, get_transfer_question, question_cache_key
+
+# Wynik ostatniego przebiegu harmonogramu (api.tasks.schedule_daily_puzzles) dla strony statusu
+ROLLOVER_STATUS_KEY = 'daily_rollover:last_run'
+
+
+def upcoming_days(days_ahead, start=None):
+    start = start or date.today()
+    return [start + timedelta(days=offset) for offset in range(days_ahead + 1)]
+
+
+def schedule_upcoming_puzzles(days_ahead):
+    # Pytania dnia gry transferowej od dziś do days_ahead dni naprzód i ich wpisy w cache, więc
+    # pierwsze żądania po północy nie tworzą pytania ani nie czytają transferu z bazy.
+    # Piłkarz dnia w grze "zgadnij piłkarza" wynika z hasha (daily_target_service) - nie ma czego
+    # przygotowywać. Przebieg jest idempotentny: istniejące pytania i wpisy w cache zostają.
+    days = upcoming_days(days_ahead)
+    created = create_transfer_questions(days)
+    warmed = [day for day in days if get_transfer_question(day) is not None]
+
+    status = {
+        "finished_at": timezone.now().isoformat(),
+        "days_ahead": days_ahead,
+        "created": [day.isoformat() for day in created],
+        "warmed": len(warmed),
+    }
+    cache.set(ROLLOVER_STATUS_KEY, status, None)
+    return status
+
+
+def get_daily_schedule(days_ahead):
+    days = upcoming_days(days_ahead)
+    questions = {
+        question.question_date: question
+        for question in TransferQuestionOfTheDay.objects.filter(question_date__in=days).select_related(
+            'transfer__player', 'transfer__from_club', 'transfer__to_club'
+        )
+    }
+    keys = {day: question_cache_key(day) for day in days}
+    cached = cache.get_many(list(keys.values()))
+
+    schedule = []
+    for day in days:
+        question = questions.get(day)
+        transfer = question.transfer if question else None
+        schedule.append({
+            "date": day.isoformat(),
+            "transfer": {
+                "id": transfer.pk,
+                "player": transfer.player.name,
+                "from_club": transfer.from_club.name,
+                "to_club": transfer.to_club.name,
+                "transfer_amount": float(transfer.transfer_amount),
+            } if transfer else None,
+            "cached": keys[day] in cached,
+        })
+
+    return {
+        "last_run": cache.get(ROLLOVER_STATUS_KEY),
+        "missing": sum(1 for entry in schedule if entry["transfer"] is None),
+        "days": schedule,
+    }
@@ -0,0 +1,94 @@
+import hashlib
+from array import array
+from bisect import bisect_left
+from datetime import date
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from api.models import Player
+from api.services.catalog_service import get_ordered_ids
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Lista id piłkarzy, z której losujemy cel, jest zamrażana na cały dzień (migawka we wspólnym
+# cache), żeby dodanie lub usunięcie piłkarza w trakcie dnia nie zmieniało celów użytkowników.
+DAILY_IDS_TIMEOUT = 2 * 24 * 60 * 60
+
+# Lokalne (per proces) kopie migawek: dzień -> (token migawki, array('q'))
+_daily_ids = {}
+
+
+def jump_consistent_hash(key, num_buckets):
+    # Jump consistent hash (Lamping, Veach): O(log n), bez pamięci pomocniczej.
+    # Przy dopisaniu piłkarza na koniec listy zmienia się tylko ~1/n przydziałów.
+    bucket, j = -1, 0
+    while j < num_buckets:
+        bucket = j
+        key = (key * 2862933555777941757 + 1) & _MASK_64
+        j = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+def daily_seed(user_id, day):
+    # Ziarno zależne od użytkownika, dnia i wersji sposobu losowania
+    raw = f"{settings.DAILY_TARGET_ORDERING_VERSION}:{user_id}:{day.isoformat()}"
+    return int.from_bytes(hashlib.blake2b(raw.encode(), digest_size=8).digest(), 'big')
+
+
+def daily_ids_key(day):
+    return f"daily_player_ids:{day.isoformat()}"
+
+
+def get_daily_ids(day):
+    # migawka w cache to (token, bajty listy); lokalna kopia jest ważna, dopóki token się zgadza,
+    # więc po wyczyszczeniu cache wszystkie procesy przejdą na tę samą, nową migawkę
+    key = daily_ids_key(day)
+    token_key = f"{key}:token"
+    token = cache.get(token_key)
+    entry = _daily_ids.get(day)
+    if entry is not None and entry[0] == token:
+        return entry[1]
+
+    snapshot = cache.get(key)
+    if snapshot is None:
+        live_ids = get_ordered_ids(Player)
+        # migawkę zakłada tylko bieżący dzień (pierwszy proces wygrywa, cache.add);
+        # dni przeszłe bez migawki (backfill, generowanie danych) losują z bieżącej listy
+        if day != date.today() or not live_ids:
+            return live_ids
+        snapshot = (uuid4().hex, live_ids.tobytes())
+        if cache.add(key, snapshot, DAILY_IDS_TIMEOUT):
+            cache.set(token_key, snapshot[0], DAILY_IDS_TIMEOUT)
+        else:
+            snapshot = cache.get(key, snapshot)
+    if token != snapshot[0]:
+        cache.add(token_key, snapshot[0], DAILY_IDS_TIMEOUT)
+
+    ids = array('q')
+    ids.frombytes(snapshot[1])
+    # trzymamy najwyżej dwa dni (okolice północy), starsze migawki tylko zajmują pamięć
+    for old_day in [d for d in _daily_ids if d < day]:
+        del _daily_ids[old_day]
+    _daily_ids[day] = (snapshot[0], ids)
+    return ids
+
+
+def contains_id(ids, player_id):
+    position = bisect_left(ids, player_id)
+    return position < len(ids) and ids[position] == player_id
+
+
+def pick_daily_player_id(user_id, day):
+    seed = daily_seed(user_id, day)
+    player_ids = get_daily_ids(day)
+    live_ids = get_ordered_ids(Player)
+    if player_ids:
+        player_id = player_ids[jump_consistent_hash(seed, len(player_ids))]
+        if player_ids is live_ids or contains_id(live_ids, player_id):
+            return player_id
+    # cel z migawki został usunięty w trakcie dnia - tylko wtedy losujemy z bieżącej listy
+    if not live_ids:
+        return None
+    return live_ids[jump_consistent_hash(seed, len(live_ids))]
@@ -0,0 +1,92 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+
+from ..exceptions import UnknownExportException
+from ..models import UserAccount, UserGuessLog, UserGuessLogTransfer
+
+# eksport -> (model, kolumny); bez hasha hasła i zdjęć użytkownika
+EXPORT_DATASETS = {
+    'users': (UserAccount, ('id', 'login', 'email', 'enabled', 'is_staff', 'is_superuser', 'created_at', 'last_login')),
+    'guesses': (UserGuessLog, ('id', 'user_id', 'guess_date', 'guess_number', 'guessed_correctly')),
+    'transfer-guesses': (UserGuessLogTransfer, ('id', 'user_id', 'guess_date', 'guess_number', 'guessed_correctly')),
+}
+
+
+class EchoBuffer:
+    # csv.writer pisze do "pliku", który zwraca zapisany wiersz zamiast go przechowywać
+    def write(self, value):
+        return value
+
+
+def encode_ndjson(fields, chunks):
+    # jeden koder na cały eksport (json.dumps z cls= tworzy nowy przy każdym wierszu)
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for rows in chunks:
+        yield ''.join(encoder.encode(dict(zip(fields, row))) + '\n' for row in rows)
+
+
+def encode_csv(fields, chunks):
+    writer = csv.writer(EchoBuffer())
+    # nagłówek idzie do klienta, zanim baza zwróci pierwszy wiersz
+    yield writer.writerow(fields)
+    for rows in chunks:
+        yield ''.join(writer.writerow(row) for row in rows)
+
+
+# format -> (Content-Type, koder)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson; charset=utf-8', encode_ndjson),
+    'csv': ('text/csv; charset=utf-8', encode_csv),
+}
+
+
+def read_chunks(queryset, chunk_size):
+    # iterator() na PostgreSQL czyta kursorem po stronie serwera (DECLARE ... CURSOR), więc w pamięci
+    # procesu jest najwyżej chunk_size wierszy. Transakcja: kursor bez WITH HOLD (w autocommit
+    # PostgreSQL materializuje cały wynik przy zatwierdzeniu) i spójny snapshot całego eksportu.
+    with transaction.atomic(using=queryset.db):
+        rows = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            rows.append(row)
+            if len(rows) == chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+
+async def iterate_in_request_thread(iterator):
+    # Pod ASGI Django 4.2 czyta synchroniczny iterator StreamingHttpResponse w całości do pamięci
+    # (sync_to_async(list)). Każdą porcję pobieramy osobno w wątku żądania (thread_sensitive,
+    # ThreadSensitiveContext obejmuje też wysyłanie odpowiedzi), bo tam żyją połączenie,
+    # transakcja i kursor eksportu.
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(iterator, None)) is not None:
+            yield chunk
+    finally:
+        # przerwane pobieranie: zamykamy kursor i transakcję w tym samym wątku
+        await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def stream_export(dataset, file_format, asynchronous=False):
+    if dataset not in EXPORT_DATASETS or file_format not in EXPORT_FORMATS:
+        raise UnknownExportException()
+    model, fields = EXPORT_DATASETS[dataset]
+    content_type, encode = EXPORT_FORMATS[file_format]
+
+    # zapytanie wykonuje się dopiero podczas wysyłania odpowiedzi, po wyjściu z widoku
+    queryset = model.objects.order_by('pk').values_list(*fields)
+    content = encode(fields, read_chunks(queryset, settings.EXPORT_CHUNK_SIZE))
+    if asynchronous:
+        content = iterate_in_request_thread(content)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+    # proxy (nginx) nie buforuje całej odpowiedzi przed wysłaniem
+    response['X-Accel-Buffering'] = 'no'
+    return response
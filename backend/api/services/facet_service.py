@@ -0,0 +1,102 @@
+import hashlib
+import json
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from api.models import PlayerFlat
+from api.services.catalog_service import get_catalog_version
+
+# facet (klucz odpowiedzi) -> (parametr filtra, kolumna PlayerFlat)
+FACETS = {
+    'countries': ('country', 'country_name'),
+    'leagues': ('league', 'league_name'),
+    'positions': ('position', 'position_name'),
+}
+# wynik zmienia się tylko razem z katalogiem, limit czasu tylko sprząta stare wersje
+FACET_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_facet_filters(params):
+    # te same filtry (icontains) co w liście piłkarzy
+    return {
+        param: params.get(param, '').strip()
+        for param, _ in FACETS.values()
+        if params.get(param, '').strip()
+    }
+
+
+def matches(value, needle):
+    return needle.casefold() in (value or '').casefold()
+
+
+def facet_counts_postgres(filters):
+    # Jedno przejście po PlayerFlat: GROUPING SETS daje osobne grupy dla każdego
+    # facetu, a FILTER liczy każdy facet z filtrami pozostałych facetów (bez własnego),
+    # więc po wybraniu kraju lista krajów nadal pokazuje alternatywy.
+    table = connection.ops.quote_name(PlayerFlat._meta.db_table)
+    conditions = {}
+    params = []
+    for param, column in FACETS.values():
+        if param in filters:
+            conditions[param] = f"strpos(lower({column}), lower(%s)) > 0"
+        else:
+            conditions[param] = "TRUE"
+
+    columns = [column for _, column in FACETS.values()]
+    selects = []
+    for param, _ in FACETS.values():
+        others = [conditions[other] for other, _ in FACETS.values() if other != param]
+        params.extend(filters[other] for other, _ in FACETS.values() if other != param and other in filters)
+        selects.append(f"COUNT(*) FILTER (WHERE {' AND '.join(others)})")
+
+    sql = (
+        f"SELECT {', '.join(columns)}, {', '.join(selects)}, "
+        f"GROUPING({', '.join(columns)}) "
+        f"FROM {table} "
+        f"GROUP BY GROUPING SETS ({', '.join(f'({column})' for column in columns)})"
+    )
+    counts = {facet: {} for facet in FACETS}
+    # GROUPING zwraca maskę bitową: bit ustawiony = kolumna NIE należy do grupy
+    full_mask = (1 << len(columns)) - 1
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            values, facet_counts, grouping = row[:len(columns)], row[len(columns):-1], row[-1]
+            for position, facet in enumerate(FACETS):
+                if grouping == full_mask ^ (1 << (len(columns) - 1 - position)):
+                    if values[position]:
+                        counts[facet][values[position]] = facet_counts[position]
+    return counts
+
+
+def facet_counts_fallback(filters):
+    # Bez GROUPING SETS: jedno GROUP BY po trójkach (kraj, liga, pozycja), resztę liczymy w Pythonie
+    columns = [column for _, column in FACETS.values()]
+    grouped = PlayerFlat.objects.order_by().values(*columns).annotate(n=Count('pk')).values_list(*columns, 'n')
+
+    counts = {facet: Counter() for facet in FACETS}
+    params = [param for param, _ in FACETS.values()]
+    for *values, count in grouped:
+        ok = [param not in filters or matches(value, filters[param]) for param, value in zip(params, values)]
+        for position, facet in enumerate(FACETS):
+            if values[position] and all(ok[:position] + ok[position + 1:]):
+                counts[facet][values[position]] += count
+            elif values[position]:
+                counts[facet].setdefault(values[position], 0)
+    return {facet: dict(values) for facet, values in counts.items()}
+
+
+def get_facet_counts(filters):
+    key = hashlib.sha1(json.dumps(filters, sort_keys=True).encode('utf-8')).hexdigest()
+    cache_key = f"player_facets:{get_catalog_version()}:{key}"
+    counts = cache.get(cache_key)
+    if counts is None:
+        if connection.vendor == 'postgresql':
+            counts = facet_counts_postgres(filters)
+        else:
+            counts = facet_counts_fallback(filters)
+        cache.set(cache_key, counts, FACET_CACHE_TIMEOUT)
+    return counts
@@ -0,0 +1,96 @@
+from collections import Counter
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+
+from api.models import Player
+from api.normalization import fold_name
+from api.services.catalog_service import get_catalog_version
+
+# Próg podobieństwa taki sam jak domyślny pg_trgm.similarity_threshold
+SIMILARITY_THRESHOLD = 0.3
+
+_has_pg_trgm = None
+
+
+def trigrams(text):
+    # Trigramy liczone jak w pg_trgm: każde słowo dopełnione "  " z przodu i " " z tyłu
+    grams = set()
+    for word in fold_name(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    # Odwrócony indeks trigram -> wiersze; kandydatów liczymy tylko z list
+    # trafionych trigramów, bez przeglądania wszystkich nazwisk
+
+    def __init__(self, version, players):
+        self.version = version
+        self.names = []
+        self.sizes = []
+        self.postings = {}
+        for _, name in players:
+            row = len(self.names)
+            grams = trigrams(name)
+            self.names.append(name)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(row)
+
+    def search(self, query, limit):
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scored = []
+        for row, common in shared.items():
+            similarity = common / (len(grams) + self.sizes[row] - common)
+            if similarity >= SIMILARITY_THRESHOLD:
+                scored.append((-similarity, self.names[row]))
+        scored.sort()
+        return [name for _, name in scored[:limit]]
+
+
+_index = None
+
+
+def get_trigram_index():
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is None or index.version != version:
+        players = Player.objects.values_list('id', 'name').iterator(chunk_size=10000)
+        index = TrigramIndex(version, players)
+        _index = index
+    return index
+
+
+def pg_trgm_available():
+    global _has_pg_trgm
+    if _has_pg_trgm is None:
+        if connection.vendor != 'postgresql':
+            _has_pg_trgm = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _has_pg_trgm = cursor.fetchone() is not None
+    return _has_pg_trgm
+
+
+def suggest_similar_names(name, limit=5):
+    # PostgreSQL: operator % korzysta z indeksu GIN api_player_name_trgm
+    if pg_trgm_available():
+        return list(
+            Player.objects
+            .filter(name__trigram_similar=name)
+            .annotate(similarity=TrigramSimilarity('name', name))
+            .order_by('-similarity', 'name')
+            .values_list('name', flat=True)[:limit]
+        )
+    return get_trigram_index().search(name, limit)
@@ -0,0 +1,35 @@
+from django.db import connection
+
+# limit prób dziennie w obu grach
+MAX_ATTEMPTS = 5
+
+
+def record_guess(model, user, day, correct):
+    # Jedno zapytanie INSERT ... ON CONFLICT DO UPDATE ... WHERE (PostgreSQL i SQLite >= 3.35):
+    # pierwsza próba tworzy wpis, kolejne zwiększają guess_number tylko wtedy, gdy
+    # limit nie jest wyczerpany i piłkarz nie został jeszcze zgadnięty. Równoległe
+    # żądania (podwójne kliknięcie, ponowienie) nie gubią prób ani nie przekraczają limitu.
+    # Zwraca (guess_number, guessed_correctly) po zapisie albo None, gdy próba została odrzucona.
+    # model: UserGuessLog albo UserGuessLogTransfer (unikalne (user, guess_date))
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, guess_date, guess_number, guessed_correctly) "
+            f"VALUES (%s, %s, 1, %s) "
+            f"ON CONFLICT (user_id, guess_date) DO UPDATE SET "
+            f"guess_number = {table}.guess_number + 1, "
+            f"guessed_correctly = {table}.guessed_correctly OR excluded.guessed_correctly "
+            f"WHERE {table}.guess_number < %s AND NOT {table}.guessed_correctly "
+            f"RETURNING guess_number, guessed_correctly",
+            [user.pk, day, bool(correct), MAX_ATTEMPTS],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0], bool(row[1])
+
+
+def get_guess_state(model, user, day):
+    # stan po odrzuconej próbie: (guess_number, guessed_correctly)
+    log = model.objects.filter(user=user, guess_date=day).values_list('guess_number', 'guessed_correctly').first()
+    return log or (0, False)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from api.exceptions import FileTooLargeException, InvalidImageException
+from api.models import UserAccount
+from api.services.blob_store_service import put_blob
+
+# Warianty zdjęcia profilowego: nazwa -> bok kwadratu w pikselach.
+# Klient pobiera mały wariant zamiast oryginału prosto z aparatu.
+PROFILE_PICTURE_VARIANTS = {
+    'avatar': 512,
+    'thumbnail': 128,
+}
+# format zapisu -> (format Pillow, opcje kodera)
+PROFILE_PICTURE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP', 'BMP', 'MPO'}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def check_image_header(path):
+    # Pillow czyta tu tylko nagłówek, więc sprawdzenie formatu i wymiarów nie dekoduje pikseli
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            width, height = image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidImageException()
+    if image_format not in ACCEPTED_FORMATS or width * height > settings.PROFILE_PICTURE_MAX_PIXELS:
+        raise InvalidImageException()
+
+
+def stage_upload(image_file):
+    # przepisujemy upload kawałkami do katalogu współdzielonego z workerem Celery,
+    # pilnując limitu rozmiaru także wtedy, gdy klient podał fałszywy Content-Length
+    max_size = settings.PROFILE_PICTURE_MAX_UPLOAD_SIZE
+    if image_file.size and image_file.size > max_size:
+        raise FileTooLargeException()
+
+    upload_dir = settings.PROFILE_PICTURE_UPLOAD_DIR
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='upload-', dir=upload_dir)
+    try:
+        written = 0
+        with os.fdopen(fd, 'wb') as staged:
+            for chunk in image_file.chunks(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_size:
+                    raise FileTooLargeException()
+                staged.write(chunk)
+        check_image_header(path)
+    except Exception:
+        discard_upload(path)
+        raise
+    return path
+
+
+def discard_upload(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def render_variants(path):
+    # zwraca {wariant: {format: skrót bloba}}; bloby są adresowane treścią,
+    # więc zapis przed publikacją niczego nie nadpisuje
+    variants = {}
+    largest = max(PROFILE_PICTURE_VARIANTS.values())
+    with Image.open(path) as image:
+        # JPEG dekodujemy od razu w zmniejszonej skali (DCT), zamiast rozpakowywać całe 20 Mpx
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            # przezroczystość (PNG/GIF) spłaszczamy na białe tło, bo JPEG jej nie obsługuje
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+
+        for name, side in sorted(PROFILE_PICTURE_VARIANTS.items(), key=lambda item: -item[1]):
+            resized = ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS)
+            variants[name] = {}
+            for extension, (pil_format, options) in PROFILE_PICTURE_FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, **options)
+                variants[name][extension] = put_blob(buffer.getvalue())
+    return variants
+
+
+def request_profile_picture_processing(user):
+    # nowy token unieważnia wynik wcześniejszego, jeszcze nieukończonego przetwarzania
+    token = uuid.uuid4().hex
+    UserAccount.objects.filter(pk=user.pk).update(profile_picture_pending=token)
+    user.profile_picture_pending = token
+    return token
+
+
+def publish_profile_picture(user_id, token, variants):
+    # jeden warunkowy UPDATE: wszystkie warianty pojawiają się naraz albo wcale,
+    # a wynik starszego uploadu nie nadpisze nowszego
+    return UserAccount.objects.filter(pk=user_id, profile_picture_pending=token).update(
+        profile_picture_hash=variants['avatar']['jpeg'],
+        profile_picture_variants=variants,
+        profile_picture_pending=None,
+        profile_picture=None,
+    ) == 1
+
+
+def abandon_profile_picture(user_id, token):
+    UserAccount.objects.filter(pk=user_id, profile_picture_pending=token).update(profile_picture_pending=None)
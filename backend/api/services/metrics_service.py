@@ -0,0 +1,219 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+
+# Histogramy per trasa: nazwa -> (opis, granice kubełków). Metryki zbiera MetricsMiddleware.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("Czas obsługi żądania HTTP", LATENCY_BUCKETS),
+    'http_request_db_queries': ("Liczba zapytań SQL w jednym żądaniu", (0, 1, 2, 5, 10, 20, 50, 100)),
+    'http_request_db_duration_seconds': ("Łączny czas zapytań SQL w jednym żądaniu", LATENCY_BUCKETS),
+    'http_response_size_bytes': ("Rozmiar treści odpowiedzi", (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)),
+}
+REQUEST_LABELS = ('route', 'method', 'status')
+
+# Suma liczników zakończonych procesów; ich pliki są po scaleniu usuwane
+TOTALS_FILE = 'totals.json'
+
+
+class MetricsRegistry:
+    # Stan procesu trzymany w pamięci (aktualizacja to kilka operacji na słowniku pod blokadą)
+    # i co flush_interval sekund zapisywany atomowo do pliku <katalog>/<pid>-<token>.json.
+    # Token odróżnia procesy o tym samym (ponownie użytym) pid, więc nowy worker nie nadpisze
+    # liczników zakończonego. Eksport scala pliki zakończonych procesów do totals.json
+    # i sumuje go z plikami żyjących, więc liczniki nie cofają się po restarcie workera.
+    # Sprawdzanie, czy proces żyje, zakłada katalog lokalny dla hosta (kontenera).
+    def __init__(self, directory, flush_interval=1.0):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # po fork() proces potomny zaczyna od zera, żeby nie zdublować liczników rodzica
+        self.pid = os.getpid()
+        self.path = self.directory / f'{self.pid}-{uuid4().hex}.json'
+        self.values = {name: {} for name in HISTOGRAMS}
+        self.flushed_at = 0.0
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            # [liczniki kubełków..., suma, liczba obserwacji]
+            series = self.values[name].setdefault(labels, [0] * len(buckets) + [0, 0])
+            position = bisect_left(buckets, value)
+            if position < len(buckets):
+                series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def observe_request(self, route, method, status, duration, queries, db_duration, size=None):
+        labels = (route, method, str(status))
+        self.observe('http_request_duration_seconds', labels, duration)
+        self.observe('http_request_db_queries', labels, queries)
+        self.observe('http_request_db_duration_seconds', labels, db_duration)
+        if size is not None:
+            self.observe('http_response_size_bytes', labels, size)
+        self.flush()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed_at < self.flush_interval:
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            self.flushed_at = now
+            state = {name: [[list(labels), series] for labels, series in values.items()]
+                     for name, values in self.values.items()}
+        write_json_atomic(self.path, state)
+
+    def collect(self):
+        # suma stanów wszystkich procesów: nazwa -> {etykiety: [kubełki..., suma, liczba]}
+        self.flush(force=True)
+        self.merge_finished_workers()
+        merged = {name: {} for name in HISTOGRAMS}
+        totals = read_totals(self.directory)
+        add_state(merged, totals['values'])
+        for path, state in read_worker_files(self.directory):
+            # plik już doliczony do sumy, ale jeszcze nieusunięty
+            if path.name not in totals['merged']:
+                add_state(merged, state)
+        return merged
+
+    def merge_finished_workers(self):
+        # Pliki zakończonych procesów trafiają do totals.json (pod blokadą pliku, jeden scalający
+        # naraz). Nazwy scalonych plików są zapisywane razem z sumą, więc przerwanie między
+        # zapisem sumy a usunięciem plików nie dolicza ich drugi raz.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            totals = read_totals(self.directory)
+            workers = list(read_worker_files(self.directory))
+            existing = {path.name for path, _ in workers}
+            finished = [(path, state) for path, state in workers if not process_alive(worker_pid(path))]
+            stale = set(totals['merged']) - existing
+            if not finished and not stale:
+                return
+
+            merged_names = set(totals['merged']) & existing
+            values = {name: {} for name in HISTOGRAMS}
+            add_state(values, totals['values'])
+            for path, state in finished:
+                if path.name not in merged_names:
+                    add_state(values, state)
+                    merged_names.add(path.name)
+            write_json_atomic(self.directory / TOTALS_FILE, {
+                'merged': sorted(merged_names),
+                'values': {name: [[list(labels), series] for labels, series in entries.items()]
+                           for name, entries in values.items()},
+            })
+            for path, _ in finished:
+                path.unlink(missing_ok=True)
+
+    def render(self):
+        # format tekstowy Prometheusa (text/plain; version=0.0.4)
+        lines = []
+        for name, series in self.collect().items():
+            description, buckets = HISTOGRAMS[name]
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, values in sorted(series.items()):
+                label_text = ','.join(f'{key}="{escape_label(value)}"' for key, value in zip(REQUEST_LABELS, labels))
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {values[-1]}')
+                lines.append(f'{name}_sum{{{label_text}}} {values[-2]}')
+                lines.append(f'{name}_count{{{label_text}}} {values[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def write_json_atomic(path, data):
+    # zapis do pliku tymczasowego i podmiana, więc czytelnik nigdy nie widzi połowy pliku
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+def read_json_files(directory):
+    # stany zapisane przez wszystkie procesy; plik uszkodzony lub w trakcie podmiany jest pomijany
+    for path in Path(directory).glob('*.json'):
+        try:
+            yield json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+
+
+def read_worker_files(directory):
+    # stany zapisane przez procesy: (ścieżka, stan); plik uszkodzony lub w trakcie podmiany jest pomijany
+    for path in Path(directory).glob('*.json'):
+        if path.name == TOTALS_FILE:
+            continue
+        try:
+            yield path, json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+
+
+def read_totals(directory):
+    try:
+        return json.loads((Path(directory) / TOTALS_FILE).read_text())
+    except (OSError, ValueError):
+        return {'merged': [], 'values': {}}
+
+
+def add_state(merged, state):
+    for name, entries in state.items():
+        if name not in merged:
+            continue
+        for labels, series in entries:
+            total = merged[name].setdefault(tuple(labels), [0] * len(series))
+            for position, value in enumerate(series):
+                total[position] += value
+
+
+def worker_pid(path):
+    return int(path.stem.split('-', 1)[0])
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # proces istnieje, ale należy do innego użytkownika
+        return True
+    return True
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry():
+    global _registry
+    directory = Path(settings.METRICS_DIR)
+    if _registry is None or _registry.directory != directory:
+        with _registry_lock:
+            if _registry is None or _registry.directory != directory:
+                _registry = MetricsRegistry(directory, settings.METRICS_FLUSH_INTERVAL)
+    return _registry
@@ -0,0 +1,87 @@
+from array import array
+
+from api.exceptions import PlayerNotFoundException
+from api.services.catalog_service import get_catalog_version
+from api.services.player_flat_service import flat_rows
+
+# Słowniki porównywane w grze po nazwie (kraj, liga, klub, pozycja)
+DIMENSIONS = ('country', 'league', 'club', 'position')
+
+
+class PlayerCatalog:
+    # Kolumnowa kopia katalogu piłkarzy trzymana w pamięci procesu.
+    # Wiersz = pozycja w równoległych tablicach; nazwy słowników są zamienione
+    # na małe kody, więc porównanie dwóch piłkarzy to kilka porównań liczb.
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.ids = array('q')
+        self.names = []
+        self.codes = {dimension: array('l') for dimension in DIMENSIONS}
+        self.labels = {dimension: [] for dimension in DIMENSIONS}
+        self.ages = array('l')
+        self.shirt_numbers = array('l')
+        self.row_by_id = {}
+
+        code_by_label = {dimension: {} for dimension in DIMENSIONS}
+        for player_id, name, *labels, age, shirt_number in rows:
+            row = len(self.ids)
+            self.ids.append(player_id)
+            self.names.append(name)
+            for dimension, label in zip(DIMENSIONS, labels):
+                codes = code_by_label[dimension]
+                if label not in codes:
+                    codes[label] = len(self.labels[dimension])
+                    self.labels[dimension].append(label)
+                self.codes[dimension].append(codes[label])
+            self.ages.append(age)
+            self.shirt_numbers.append(shirt_number)
+            self.row_by_id[player_id] = row
+
+    def row(self, player_id):
+        try:
+            return self.row_by_id[player_id]
+        except KeyError:
+            raise PlayerNotFoundException()
+
+    def label(self, dimension, row):
+        return self.labels[dimension][self.codes[dimension][row]]
+
+    def describe(self, row):
+        return {
+            'name': self.names[row],
+            'country': self.label('country', row),
+            'league': self.label('league', row),
+            'club': self.label('club', row),
+            'position': self.label('position', row),
+            'age': self.ages[row],
+            'number': self.shirt_numbers[row],
+        }
+
+    def matches(self, guessed_row, target_row):
+        result = {
+            dimension: self.codes[dimension][guessed_row] == self.codes[dimension][target_row]
+            for dimension in DIMENSIONS
+        }
+        result['age'] = self.ages[guessed_row] == self.ages[target_row]
+        result['shirt_number'] = self.shirt_numbers[guessed_row] == self.shirt_numbers[target_row]
+        return result
+
+
+_catalog = None
+
+
+def load_player_catalog(version):
+    # PlayerFlat ma kolumny w kolejności oczekiwanej przez PlayerCatalog, więc to skan jednej tabeli
+    return PlayerCatalog(version, flat_rows().iterator(chunk_size=10000))
+
+
+def get_player_catalog():
+    # Katalog ładujemy jednym zapytaniem i trzymamy do zmiany wersji katalogu
+    global _catalog
+    version = get_catalog_version()
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        catalog = load_player_catalog(version)
+        _catalog = catalog
+    return catalog
@@ -0,0 +1,104 @@
+from django.db import connection, transaction
+
+from api.models import Player, PlayerFlat
+
+# kolumna PlayerFlat -> ścieżka w Player (źródło prawdy)
+PLAYER_FLAT_SOURCE = {
+    'name': 'name',
+    'country_name': 'country__name',
+    'league_name': 'league__name',
+    'club_name': 'club__name',
+    'position_name': 'position__name',
+    'age_value': 'age__value',
+    'shirt_number_value': 'shirt_number__number',
+}
+PLAYER_FLAT_FIELDS = tuple(PLAYER_FLAT_SOURCE)
+
+# słownik -> (klucz obcy w Player, kolumna PlayerFlat, pole wartości w słowniku)
+PLAYER_FLAT_LOOKUPS = {
+    'Country': ('country', 'country_name', 'name'),
+    'League': ('league', 'league_name', 'name'),
+    'Club': ('club', 'club_name', 'name'),
+    'Position': ('position', 'position_name', 'name'),
+    'Age': ('age', 'age_value', 'value'),
+    'ShirtNumber': ('shirt_number', 'shirt_number_value', 'number'),
+}
+
+
+def source_rows(queryset=None):
+    # (id, *kolumny PlayerFlat) liczone z tabel źródłowych jednym zapytaniem z JOIN-ami
+    queryset = Player.objects.all() if queryset is None else queryset
+    return queryset.order_by('id').values_list('id', *PLAYER_FLAT_SOURCE.values())
+
+
+def flat_rows(queryset=None):
+    queryset = PlayerFlat.objects.all() if queryset is None else queryset
+    return queryset.order_by('player_id').values_list('player_id', *PLAYER_FLAT_FIELDS)
+
+
+def build_flat(row):
+    player_id, *values = row
+    return PlayerFlat(player_id=player_id, **dict(zip(PLAYER_FLAT_FIELDS, values)))
+
+
+def sync_player_flat(player_ids):
+    # Odświeża wiersze podanych piłkarzy; brak piłkarza w źródle = usunięcie kopii.
+    # Nowe wiersze wstawia INSERT ... SELECT po stronie bazy (bez obiektów w Pythonie),
+    # więc tak samo działa dla jednego piłkarza z sygnału i dla partii importu.
+    player_ids = set(player_ids)
+    sql, params = source_rows(Player.objects.filter(pk__in=player_ids)).query.sql_with_params()
+    table = connection.ops.quote_name(PlayerFlat._meta.db_table)
+    columns = ', '.join(
+        connection.ops.quote_name(PlayerFlat._meta.get_field(field).column) for field in ('player', *PLAYER_FLAT_FIELDS)
+    )
+    with transaction.atomic():
+        PlayerFlat.objects.filter(pk__in=player_ids).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table} ({columns}) {sql}", params)
+            return cursor.rowcount
+
+
+def update_lookup_value(lookup, instance):
+    # zmiana nazwy w słowniku to jeden UPDATE na kopiach, bez przeliczania piłkarzy
+    player_field, flat_field, value_field = PLAYER_FLAT_LOOKUPS[lookup]
+    return PlayerFlat.objects.filter(**{f'player__{player_field}': instance.pk}).update(
+        **{flat_field: getattr(instance, value_field)}
+    )
+
+
+@transaction.atomic
+def rebuild_player_flat(batch_size=5000):
+    PlayerFlat.objects.all().delete()
+    batch = []
+    created = 0
+    for row in source_rows().iterator(chunk_size=batch_size):
+        batch.append(build_flat(row))
+        if len(batch) >= batch_size:
+            PlayerFlat.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    PlayerFlat.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+def find_player_flat_drift(batch_size=5000):
+    # Porównuje obie strony scalaniem dwóch list posortowanych po id (bez ładowania
+    # całych tabel do pamięci). Zwraca (brakujące, nadmiarowe, różniące się) id.
+    missing, extra, stale = [], [], []
+    source = iter(source_rows().iterator(chunk_size=batch_size))
+    flat = iter(flat_rows().iterator(chunk_size=batch_size))
+    expected = next(source, None)
+    actual = next(flat, None)
+    while expected is not None or actual is not None:
+        if actual is None or (expected is not None and expected[0] < actual[0]):
+            missing.append(expected[0])
+            expected = next(source, None)
+        elif expected is None or actual[0] < expected[0]:
+            extra.append(actual[0])
+            actual = next(flat, None)
+        else:
+            if tuple(expected) != tuple(actual):
+                stale.append(expected[0])
+            expected = next(source, None)
+            actual = next(flat, None)
+    return missing, extra, stale
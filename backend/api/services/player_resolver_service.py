@@ -0,0 +1,15 @@
+from api.models import Player, PlayerAlias
+from api.normalization import fold_name
+
+
+def resolve_player_id(name):
+    # Wspólne dla obu gier: "lukasz fabianski" == "Łukasz Fabiański".
+    # Najpierw unikalny indeks Player.normalized_name, potem tabela aliasów.
+    key = fold_name(name or '')
+    if not key:
+        return None
+
+    player_id = Player.objects.filter(normalized_name=key).values_list('id', flat=True).first()
+    if player_id is None:
+        player_id = PlayerAlias.objects.filter(normalized_alias=key).values_list('player_id', flat=True).first()
+    return player_id
@@ -1,17 +1,112 @@
+import base64
+import binascii
+import json
+
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.utils.urls import replace_query_param
+from django.db.models import F, Q
+
+from ..models import PlayerFlat
+from ..exceptions import InvalidCursorException, PlayerNotFoundException
+from .facet_service import get_facet_counts, get_facet_filters
+from .player_flat_service import PLAYER_FLAT_FIELDS
+
 
-from ..models import Player
-from ..serializers import PlayerSerializer
-from ..exceptions import PlayerNotFoundException
-from rest_framework.pagination import PageNumberPagination
+# dozwolone sortowania listy piłkarzy; każde dostaje id jako drugi klucz (remisy)
+VALID_PLAYER_SORTS = ['name', '-name', 'age__value', '-age__value']
+# parametr sort -> kolumna PlayerFlat
+PLAYER_SORT_COLUMNS = {'name': 'name', 'age__value': 'age_value'}
 
+# Piłkarzy czytamy z PlayerFlat (jedna tabela, bez JOIN-ów); kolumny PlayerFlat
+# nazywają się tak samo jak klucze odpowiedzi PlayerSerializer
+PLAYER_ROW_FIELDS = ('player_id', *PLAYER_FLAT_FIELDS)
+PLAYER_ROW_KEYS = ('id', *PLAYER_FLAT_FIELDS)
 
-class PlayerPagination(PageNumberPagination):
+
+class PlayerCursorPagination(BasePagination):
+    # Stronicowanie kursorem (keyset): zamiast OFFSET i COUNT(*) zapamiętujemy
+    # (wartość sortowania, id) ostatniego wiersza i następna strona zaczyna się
+    # od warunku WHERE na parze (kolumna, id) - bez liczenia i przewijania wcześniejszych wierszy.
+    # Oczekuje querysetu values_list z kluczem głównym w pierwszej kolumnie; wartość sortowania
+    # jest dopisywana jako ostatnia kolumna wiersza.
     page_size = 3
     page_size_query_param = 'page_size'
     max_page_size = 10
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value, last_id, reverse = cursor['v'], int(cursor['id']), bool(cursor['r'])
+        except (ValueError, TypeError, KeyError, binascii.Error, UnicodeEncodeError):
+            raise InvalidCursorException()
+        if not isinstance(value, (str, int)) or isinstance(value, bool):
+            raise InvalidCursorException()
+        return value, last_id, reverse
+
+    def cursor_key(self, row):
+        # (wartość sortowania, id) wiersza values_list
+        return row[-1], row[0]
+
+    def encode_cursor(self, row, reverse):
+        value, row_id = self.cursor_key(row)
+        cursor = {'v': value, 'id': row_id, 'r': reverse}
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, sort='name', view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        field = sort.lstrip('-')
+        cursor = self.decode_cursor(request)
+        backwards = cursor is not None and cursor[2]
+
+        # cofając się, czytamy w odwrotnej kolejności od pierwszego wiersza strony
+        descending = sort.startswith('-') != backwards
+        prefix = '-' if descending else ''
+        queryset = queryset.annotate(cursor_value=F(field)).order_by(prefix + field, prefix + 'pk')
+
+        if cursor is not None:
+            value, last_id, _ = cursor
+            op = 'lt' if descending else 'gt'
+            # "kolumna >= v AND (kolumna > v OR id > ostatnie_id)" - pierwszy warunek to zakres,
+            # który indeks (kolumna, id) może przejść bez sortowania
+            queryset = queryset.filter(**{f'{field}__{op}e': value}).filter(
+                Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': last_id})
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+
+        self.next = self.previous = None
+        if rows:
+            if has_more or backwards:
+                self.next = self.encode_cursor(rows[-1], reverse=False)
+            if (has_more and backwards) or (cursor is not None and not backwards):
+                self.previous = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next,
+            'previous': self.previous,
+            'results': data,
+        })
 
 
 def fetch_all_players(request):
@@ -21,42 +116,43 @@ def fetch_all_players(request):
     position = request.GET.get('position')
 
     if country:
-        query &= Q(country__name__icontains=country)
+        query &= Q(country_name__icontains=country)
     if league:
-        query &= Q(league__name__icontains=league)
+        query &= Q(league_name__icontains=league)
     if position:
-        query &= Q(position__name__icontains=position)
+        query &= Q(position_name__icontains=position)
 
     sort = request.GET.get('sort')
-    valid_sorts = ['name', '-name', 'age__value', '-age__value']
-    if sort not in valid_sorts:
+    if sort not in VALID_PLAYER_SORTS:
         sort = 'name'
+    descending = sort.startswith('-')
+    sort = ('-' if descending else '') + PLAYER_SORT_COLUMNS[sort.lstrip('-')]
+
+    players = PlayerFlat.objects.filter(query).values_list(*PLAYER_ROW_FIELDS)
 
-    players = Player.objects.filter(query).order_by(sort)
+    paginator = PlayerCursorPagination()
+    page = paginator.paginate_queryset(players, request, sort)
 
-    paginator = PlayerPagination()
-    page = paginator.paginate_queryset(players, request)
+    return paginator.get_paginated_response(serialize_player_rows(page))
 
-    # nawet jeśli page to None (czyli brak wyników), dalej zwracamy pustą listę    
-    serializer = PlayerSerializer(page or [], many=True)
-    return paginator.get_paginated_response(serializer.data)
+
+def serialize_player_rows(rows):
+    # Szybka ścieżka zamiast PlayerSerializer(many=True): krotki z values_list
+    # zamieniamy na słowniki bez pól DRF (kolumna kursora na końcu jest pomijana).
+    return [dict(zip(PLAYER_ROW_KEYS, row)) for row in rows]
 
 
 def fetch_player_by_id(player_id):
-    player = Player.objects.filter(pk=player_id).first()
-    if not player:
+    row = PlayerFlat.objects.filter(pk=player_id).values_list(*PLAYER_ROW_FIELDS).first()
+    if not row:
         raise PlayerNotFoundException()
-    serializer = PlayerSerializer(player)
-    return Response(serializer.data, status=status.HTTP_200_OK)
-
+    return Response(dict(zip(PLAYER_ROW_KEYS, row)), status=status.HTTP_200_OK)
 
-def fetch_unique_filters():
-    countries = Player.objects.values_list('country__name', flat=True).distinct()
-    leagues = Player.objects.values_list('league__name', flat=True).distinct()
-    positions = Player.objects.values_list('position__name', flat=True).distinct()
 
+def fetch_unique_filters(params):
+    # wartości facetów (wszystkie) + liczby piłkarzy przy filtrach pozostałych facetów
+    counts = get_facet_counts(get_facet_filters(params))
     return Response({
-        'countries': sorted(filter(None, countries)),
-        'leagues': sorted(filter(None, leagues)),
-        'positions': sorted(filter(None, positions)),
+        **{facet: sorted(values) for facet, values in counts.items()},
+        'counts': counts,
     })
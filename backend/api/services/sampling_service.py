@@ -0,0 +1,24 @@
+import random
+
+from api.services.catalog_service import get_ordered_ids
+
+# Losowanie wierszy bez ORDER BY RANDOM(): losujemy pozycje z zapamiętanej
+# (per proces) listy id i pobieramy wiersze po kluczu głównym - O(k) zamiast
+# pełnego skanu i sortowania tabeli.
+
+
+def sample_ids(model, k, rng=random):
+    ids = get_ordered_ids(model)
+    return [ids[i] for i in rng.sample(range(len(ids)), min(k, len(ids)))]
+
+
+def sample_one_id(model, rng=random):
+    ids = sample_ids(model, 1, rng)
+    return ids[0] if ids else None
+
+
+def sample_rows(queryset, k, rng=random):
+    ids = sample_ids(queryset.model, k, rng)
+    rows = queryset.in_bulk(ids)
+    # zachowujemy losową kolejność; wiersze usunięte w międzyczasie pomijamy
+    return [rows[pk] for pk in ids if pk in rows]
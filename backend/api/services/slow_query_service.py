@@ -0,0 +1,245 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from api.services.metrics_service import read_json_files, write_json_atomic
+
+# Normalizacja SQL do odcisku: literały i parametry -> ?, listy IN (...) i wiele
+# wierszy VALUES zwinięte, białe znaki ujednolicone
+FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r"%s"), '?'),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), '?'),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), '(?+)'),
+    (re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+"), '(?+), ...'),
+    (re.compile(r"\s+"), ' '),
+]
+# ostatnie czasy per odcisk, z których liczony jest p95
+SAMPLE_SIZE = 100
+FLUSH_INTERVAL = 5.0
+
+API_DIR = os.path.dirname(os.path.dirname(__file__)) + os.sep
+SERVICES_DIR = API_DIR + 'services' + os.sep
+# ramki pomijane przy szukaniu wywołującego (sama instrumentacja)
+SKIPPED_FILES = {__file__, API_DIR + 'middleware.py'}
+
+
+def fingerprint(sql):
+    normalized = sql.strip()
+    for pattern, replacement in FINGERPRINT_RULES:
+        normalized = pattern.sub(replacement, normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16], normalized
+
+
+def find_caller():
+    # Pierwsza funkcja z api/services na stosie (np. daily_game_service.handle_player_guess),
+    # a jeśli zapytanie wyszło z widoku lub serializera - pierwsza ramka z pakietu api
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(API_DIR) and filename not in SKIPPED_FILES:
+            name = f"{Path(filename).stem}.{frame.f_code.co_name}"
+            if filename.startswith(SERVICES_DIR):
+                return name
+            fallback = fallback or name
+        frame = frame.f_back
+    return fallback or 'unknown'
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class SlowQueryLog:
+    # Statystyki per odcisk w pamięci procesu (zrzut co FLUSH_INTERVAL do <katalog>/<pid>.json,
+    # raport sumuje pliki wszystkich workerów) i rotowany plik slow_queries.log z wolnymi
+    # zapytaniami i ich planami
+    def __init__(self, directory, threshold_ms, explain_interval, max_bytes, backups):
+        self.directory = Path(directory)
+        self.threshold = threshold_ms / 1000
+        self.explain_interval = explain_interval
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.logger = logging.getLogger('api.slow_queries')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            self.directory / 'slow_queries.log', maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True
+        )
+        self.logger.addHandler(handler)
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.stats = {}
+        self.explained_at = {}
+        self.flushed_at = time.monotonic()
+
+    def close(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper; EXPLAIN uruchomiony z wnętrza wrappera nie jest mierzony ponownie
+        if getattr(self.local, 'explaining', False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        self.record(sql, params, many, time.perf_counter() - started, context['connection'])
+        return result
+
+    def record(self, sql, params, many, duration, connection):
+        key, normalized = fingerprint(sql)
+        caller = find_caller()
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            entry = self.stats.get(key)
+            if entry is None:
+                entry = self.stats[key] = {
+                    'sql': normalized, 'count': 0, 'total': 0.0, 'max': 0.0,
+                    'samples': deque(maxlen=SAMPLE_SIZE), 'callers': Counter(), 'plan': None,
+                }
+            entry['count'] += 1
+            entry['total'] += duration
+            entry['max'] = max(entry['max'], duration)
+            entry['samples'].append(duration)
+            entry['callers'][caller] += 1
+
+            slow = duration >= self.threshold
+            explain = (
+                slow and not many and sql.lstrip()[:6].upper() == 'SELECT'
+                and time.monotonic() - self.explained_at.get(key, -self.explain_interval) >= self.explain_interval
+            )
+            if explain:
+                self.explained_at[key] = time.monotonic()
+
+        if slow:
+            plan = self.explain(connection, sql, params) if explain else None
+            if plan is not None:
+                with self.lock:
+                    entry['plan'] = {'duration': duration, 'caller': caller, 'text': plan}
+            self.logger.info(json.dumps({
+                'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'fingerprint': key,
+                'caller': caller,
+                'duration_ms': round(duration * 1000, 3),
+                'sql': normalized,
+                'plan': plan,
+            }, ensure_ascii=False))
+        self.flush()
+
+    def explain(self, connection, sql, params):
+        # PostgreSQL: EXPLAIN (ANALYZE, BUFFERS) - zapytanie wykonuje się drugi raz, dlatego tylko
+        # SELECT i najwyżej raz na explain_interval dla odcisku. Savepoint chroni transakcję żądania.
+        if connection.vendor == 'postgresql':
+            statement = f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+        elif connection.vendor == 'sqlite':
+            statement = f"EXPLAIN QUERY PLAN {sql}"
+        else:
+            return None
+        self.local.explaining = True
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(statement, params)
+                    rows = cursor.fetchall()
+            return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+        except DatabaseError as e:
+            return f"EXPLAIN nie powiódł się: {e}"
+        finally:
+            self.local.explaining = False
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed_at < FLUSH_INTERVAL:
+            return
+        with self.lock:
+            self.flushed_at = now
+            state = {
+                key: {**entry, 'samples': list(entry['samples']), 'callers': dict(entry['callers'])}
+                for key, entry in self.stats.items()
+            }
+        write_json_atomic(self.directory / f'{self.pid}.json', state)
+
+    def report(self, limit=50):
+        # odciski z największym łącznym czasem, zsumowane ze wszystkich procesów
+        self.flush(force=True)
+        merged = {}
+        for state in read_json_files(self.directory):
+            for key, entry in state.items():
+                total = merged.setdefault(key, {
+                    'sql': entry['sql'], 'count': 0, 'total': 0.0, 'max': 0.0,
+                    'samples': [], 'callers': Counter(), 'plan': None,
+                })
+                total['count'] += entry['count']
+                total['total'] += entry['total']
+                total['max'] = max(total['max'], entry['max'])
+                total['samples'].extend(entry['samples'])
+                total['callers'].update(entry['callers'])
+                if entry['plan'] and (total['plan'] is None or entry['plan']['duration'] > total['plan']['duration']):
+                    total['plan'] = entry['plan']
+
+        rows = sorted(merged.items(), key=lambda item: item[1]['total'], reverse=True)[:limit]
+        return [
+            {
+                'fingerprint': key,
+                'sql': entry['sql'],
+                'count': entry['count'],
+                'total_ms': round(entry['total'] * 1000, 3),
+                'avg_ms': round(entry['total'] * 1000 / entry['count'], 3),
+                'p95_ms': round(percentile(entry['samples'], 0.95) * 1000, 3),
+                'max_ms': round(entry['max'] * 1000, 3),
+                'callers': [{'name': name, 'count': count} for name, count in entry['callers'].most_common()],
+                'plan': entry['plan']['text'] if entry['plan'] else None,
+            }
+            for key, entry in rows
+        ]
+
+
+_query_log = None
+_query_log_lock = threading.Lock()
+
+
+def get_slow_query_log():
+    global _query_log
+    directory = Path(settings.SLOW_QUERY_DIR)
+    if _query_log is None or _query_log.directory != directory:
+        with _query_log_lock:
+            if _query_log is None or _query_log.directory != directory:
+                if _query_log is not None:
+                    _query_log.close()
+                _query_log = SlowQueryLog(
+                    directory, settings.SLOW_QUERY_THRESHOLD_MS, settings.SLOW_QUERY_EXPLAIN_INTERVAL,
+                    settings.SLOW_QUERY_LOG_MAX_BYTES, settings.SLOW_QUERY_LOG_BACKUPS,
+                )
+    return _query_log
+
+
+@contextmanager
+def capture_slow_queries():
+    # instrumentacja wszystkich połączeń na czas bloku (żądanie, zadanie Celery, komenda)
+    query_log = get_slow_query_log()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(query_log))
+        yield query_log
@@ -1,20 +1,95 @@
 from datetime import date
+from django.core.cache import cache
+from django.db import transaction
 from ..models import Transfer, TransferQuestionOfTheDay, UserGuessLogTransfer
 from ..exceptions import (
     MissingPlayerNameException,
     GameNotStartedException,
-    NoMoreAttemptsException
+    NoMoreAttemptsException,
+    NoTransfersFoundException
 )
+from .catalog_service import get_catalog_version
+from .guess_log_service import MAX_ATTEMPTS, get_guess_state, record_guess
+from .leaderboard_service import GAME_TRANSFER, record_correct_guess
+from .player_resolver_service import resolve_player_id
+from .sampling_service import sample_ids
+
+# relacje transferu potrzebne w odpowiedziach
+TRANSFER_RELATED = ('player', 'from_club', 'to_club')
+
+# Pytanie dnia trzymamy we współdzielonym cache jako słownik ze wszystkim, czego potrzebują
+# odpowiedzi gry - bez zapytań o pytanie, transfer, kluby i piłkarza. Klucz zawiera wersję
+# katalogu (zmiana transferu, klubu lub piłkarza), zmianę samego pytania obsługuje api/signals.py.
+QUESTION_CACHE_TIMEOUT = 7 * 24 * 60 * 60
 
-def start_game_for_user(user):
-    today = date.today()
 
-    question, _ = TransferQuestionOfTheDay.objects.get_or_create(
-        question_date=today,
-        defaults={'transfer': Transfer.objects.order_by('?').first()}
+def question_cache_key(day):
+    return f"transfer_question:{get_catalog_version()}:{day.isoformat()}"
+
+
+def build_question(transfer):
+    return {
+        "transfer_id": transfer.pk,
+        "player_id": transfer.player_id,
+        "player_name": transfer.player.name,
+        "from_club": transfer.from_club.name,
+        "to_club": transfer.to_club.name,
+        "transfer_amount": float(transfer.transfer_amount),
+    }
+
+
+def create_transfer_questions(days):
+    # Losowe transfery dla dni bez pytania. ignore_conflicts: gdy ten sam dzień tworzy równolegle
+    # inne żądanie lub drugi worker, wygrywa pierwszy zapis - bez IntegrityError i bez nadpisania
+    existing = set(
+        TransferQuestionOfTheDay.objects.filter(question_date__in=days).values_list('question_date', flat=True)
     )
+    missing = [day for day in days if day not in existing]
+    transfer_ids = sample_ids(Transfer, len(missing))
+    if not transfer_ids:
+        return []
+    TransferQuestionOfTheDay.objects.bulk_create([
+        # mniej transferów niż dni - transfery się powtarzają
+        TransferQuestionOfTheDay(question_date=day, transfer_id=transfer_ids[i % len(transfer_ids)])
+        for i, day in enumerate(missing)
+    ], ignore_conflicts=True)
+    return missing
+
+
+def load_question_transfer(day):
+    # pytanie dnia razem z transferem i jego relacjami - jedno zapytanie
+    return Transfer.objects.select_related(*TRANSFER_RELATED).filter(
+        transferquestionoftheday__question_date=day
+    ).first()
+
+
+def get_transfer_question(day, create=False):
+    # Pytanie dnia z cache, przy braku z bazy; create=True tworzy brakujące pytanie (gdy
+    # harmonogram w Celery nie zdążył). None, gdy pytania nie ma (albo nie ma żadnych transferów).
+    key = question_cache_key(day)
+    question = cache.get(key)
+    if question is not None:
+        return question
+
+    transfer = load_question_transfer(day)
+    if transfer is None and create:
+        # pytanie mogło powstać równolegle w innym żądaniu - czytamy ponownie tak czy inaczej
+        create_transfer_questions([day])
+        transfer = load_question_transfer(day)
+    if transfer is None:
+        return None
+
+    question = build_question(transfer)
+    cache.set(key, question, QUESTION_CACHE_TIMEOUT)
+    return question
 
-    transfer = question.transfer
+
+def start_game_for_user(user):
+    today = date.today()
+
+    question = get_transfer_question(today, create=True)
+    if question is None:
+        raise NoTransfersFoundException()
 
     log, _ = UserGuessLogTransfer.objects.get_or_create(
         user=user,
@@ -22,19 +97,19 @@ def start_game_for_user(user):
         defaults={'guess_number': 0, 'guessed_correctly': False}
     )
 
-    remaining_attempts = max(0, 5 - log.guess_number)
+    remaining_attempts = max(0, MAX_ATTEMPTS - log.guess_number)
     game_over = log.guessed_correctly or remaining_attempts == 0
 
     return {
         "transfer_details": {
-            "from_club": transfer.from_club.name,
-            "to_club": transfer.to_club.name,
-            "transfer_amount": float(transfer.transfer_amount),
+            "from_club": question["from_club"],
+            "to_club": question["to_club"],
+            "transfer_amount": question["transfer_amount"],
         },
         "remaining_attempts": remaining_attempts,
         "game_over": game_over,
         "guessed_correctly": log.guessed_correctly,
-        "correct_player": transfer.player.name if game_over else None
+        "correct_player": question["player_name"] if game_over else None
     }
 
 
@@ -44,54 +119,49 @@ def guess_player(user, player_name):
 
     today = date.today()
 
-    try:
-        question = TransferQuestionOfTheDay.objects.get(question_date=today)
-    except TransferQuestionOfTheDay.DoesNotExist:
+    question = get_transfer_question(today)
+    if question is None:
         raise GameNotStartedException()
 
-    transfer = question.transfer
-    log, _ = UserGuessLogTransfer.objects.get_or_create(
-        user=user,
-        guess_date=today,
-        defaults={'guess_number': 0, 'guessed_correctly': False}
-    )
-
-    if log.guessed_correctly:
-        raise NoMoreAttemptsException(detail={
-            "error": "Już zgadłeś dzisiaj piłkarza. Spróbuj jutro.",
-            "correct_player": transfer.player.name,
-            "game_over": True,
-        })
-
-    if log.guess_number >= 5:
+    guessed_correctly = resolve_player_id(player_name) == question["player_id"]
+
+    # zapis próby i punkty w jednej transakcji; limit i "już zgadnięte" sprawdza sam UPDATE
+    with transaction.atomic():
+        recorded = record_guess(UserGuessLogTransfer, user, today, correct=guessed_correctly)
+        if recorded is not None and guessed_correctly:
+            record_correct_guess(user, GAME_TRANSFER)
+
+    if recorded is None:
+        _, already_guessed = get_guess_state(UserGuessLogTransfer, user, today)
+        if already_guessed:
+            raise NoMoreAttemptsException(detail={
+                "error": "Już zgadłeś dzisiaj piłkarza. Spróbuj jutro.",
+                "correct_player": question["player_name"],
+                "game_over": True,
+            })
         raise NoMoreAttemptsException(detail={
             "error": "Nie masz więcej prób. Spróbuj ponownie jutro.",
-            "correct_player": transfer.player.name,
+            "correct_player": question["player_name"],
             "game_over": True,
             "remaining_attempts": 0
         })
+    guess_number, _ = recorded
 
-    guessed_correctly = player_name.lower() == transfer.player.name.lower()
-    log.guess_number += 1
-    if guessed_correctly:
-        log.guessed_correctly = True
-    log.save()
-
-    remaining_attempts = max(0, 5 - log.guess_number)
+    remaining_attempts = max(0, MAX_ATTEMPTS - guess_number)
     game_over = guessed_correctly or remaining_attempts == 0
 
     response_data = {
         "guessed_correctly": guessed_correctly,
         "remaining_attempts": remaining_attempts,
         "game_over": game_over,
-        "correct_player": transfer.player.name if guessed_correctly or game_over else None
+        "correct_player": question["player_name"] if guessed_correctly or game_over else None
     }
 
     if guessed_correctly or game_over:
         response_data.update({
-            "from_club": transfer.from_club.name,
-            "to_club": transfer.to_club.name,
-            "transfer_amount": float(transfer.transfer_amount)
+            "from_club": question["from_club"],
+            "to_club": question["to_club"],
+            "transfer_amount": question["transfer_amount"]
         })
 
     return response_data
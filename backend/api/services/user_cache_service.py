@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from api.models import UserAccount
+
+# Pola użytkownika trzymane w pamięci procesu. Reszta wiersza (m.in. BinaryField profile_picture)
+# jest w zwracanym obiekcie odroczona i doczytywana przez Django dopiero przy pierwszym użyciu.
+# Kolejność jak w modelu - tak wartości przyjmuje Model.from_db.
+CACHED_USER_FIELDS = tuple(
+    field.attname for field in UserAccount._meta.concrete_fields
+    if field.attname in ('id', 'login', 'email', 'enabled', 'is_staff', 'is_superuser')
+)
+
+
+def user_version_key(user_id):
+    return f"user_version:{user_id}"
+
+
+def bump_user_version(user_id):
+    # Wspólny (dla wszystkich procesów) znacznik wersji konta - jak wersja katalogu w catalog_service.
+    # Wystarczy, że żyje tyle co wpisy w pamięci: po wygaśnięciu znacznika wpisy i tak są odświeżane.
+    cache.set(user_version_key(user_id), uuid4().hex, settings.JWT_USER_CACHE_TTL)
+
+
+class CachedUser:
+    __slots__ = CACHED_USER_FIELDS + ('version', 'expires_at')
+
+    def __init__(self, values, version, expires_at):
+        for field, value in zip(CACHED_USER_FIELDS, values):
+            setattr(self, field, value)
+        self.version = version
+        self.expires_at = expires_at
+
+    def values(self):
+        return [getattr(self, field) for field in CACHED_USER_FIELDS]
+
+
+class UserCache:
+    # LRU z TTL: najwyżej max_size wpisów, każdy ważny ttl sekund. Zapis i usunięcie UserAccount
+    # usuwa wpis w tym procesie i zmienia znacznik wersji konta we wspólnym cache (api/signals.py);
+    # inne workery porównują znacznik przy każdym trafieniu, więc też od razu czytają wiersz na nowo.
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.records = OrderedDict()
+        # licznik unieważnień: wiersz odczytany przed unieważnieniem nie trafia do pamięci
+        self.generation = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        # znacznik czytany przed wierszem: zmiana zatwierdzona w trakcie odczytu zmieni go później
+        version = cache.get(user_version_key(user_id))
+        with self.lock:
+            record = self.records.get(user_id)
+            if record is not None and record.expires_at > now and record.version == version:
+                self.records.move_to_end(user_id)
+                return record
+            generation = self.generation
+
+        values = UserAccount.objects.filter(pk=user_id).values_list(*CACHED_USER_FIELDS).first()
+        if values is None:
+            return None
+        record = CachedUser(values, version, now + self.ttl)
+        with self.lock:
+            if generation == self.generation:
+                self.records[user_id] = record
+                self.records.move_to_end(user_id)
+                while len(self.records) > self.max_size:
+                    self.records.popitem(last=False)
+        return record
+
+    def discard(self, user_id):
+        with self.lock:
+            self.generation += 1
+            self.records.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.records.clear()
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache(settings.JWT_USER_CACHE_SIZE, settings.JWT_USER_CACHE_TTL)
+    return _user_cache
+
+
+def invalidate_cached_user(user_id):
+    bump_user_version(user_id)
+    get_user_cache().discard(user_id)
+
+
+def get_cached_user(user_id):
+    # Nowy obiekt UserAccount na każde żądanie (bez współdzielenia instancji między wątkami),
+    # zbudowany z wpisu w pamięci - bez zapytania do bazy. save() zapisze tylko wczytane pola.
+    record = get_user_cache().get(user_id)
+    if record is None:
+        return None
+    return UserAccount.from_db(DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, record.values())
+
+
+def load_user_fields(user, fields=None):
+    # Doczytuje odroczone pola jednym zapytaniem (domyślnie wszystkie poza bajtami profile_picture) -
+    # bez tego Django wykonuje osobne zapytanie przy pierwszym dostępie do każdego z nich
+    deferred = user.get_deferred_fields()
+    missing = deferred - {'profile_picture'} if fields is None else deferred.intersection(fields)
+    if missing:
+        user.refresh_from_db(fields=sorted(missing))
+    return user
@@ -1,29 +1,49 @@
-import base64
-from api.models import UserGuessLog, UserGuessLogTransfer
-from api.exceptions import MissingFileException
+from django.db import transaction
+from django.urls import reverse
 
+from api.exceptions import MissingFileException, ProfilePictureQueueException
+from api.services.image_processing_service import (
+    abandon_profile_picture, discard_upload, request_profile_picture_processing, stage_upload
+)
+from api.services.leaderboard_service import get_user_score
+from api.services.user_cache_service import load_user_fields
+from api.tasks import process_profile_picture
 
-def get_user_profile(user):
-    correct_guesses = UserGuessLog.objects.filter(user=user, guessed_correctly=True).count()
-    points_guess = correct_guesses * 100
+# pola profilu spoza wpisu CachedJWTAuthentication
+PROFILE_FIELDS = ('created_at', 'profile_picture_hash', 'profile_picture_variants', 'profile_picture_pending')
 
-    correct_guesses_transfer = UserGuessLogTransfer.objects.filter(user=user, guessed_correctly=True).count()
-    points_guess_transfer = correct_guesses_transfer * 100
 
-    total = points_guess + points_guess_transfer
+def get_profile_picture_url(user):
+    # adres obrazka zależy od jego treści, więc przeglądarka może go trzymać w cache bez końca
+    if not user.profile_picture_hash:
+        return None
+    return reverse('profile_picture', args=[user.profile_picture_hash])
 
-    profile_picture_base64 = None
-    if user.profile_picture:
-        profile_picture_base64 = base64.b64encode(user.profile_picture).decode('utf-8')
+
+def get_profile_picture_variant_urls(user):
+    if not user.profile_picture_variants:
+        return None
+    return {
+        name: {extension: reverse('profile_picture', args=[digest]) for extension, digest in formats.items()}
+        for name, formats in user.profile_picture_variants.items()
+    }
+
+
+def get_user_profile(user):
+    load_user_fields(user, PROFILE_FIELDS)
+    # punkty z tabeli rankingu zamiast liczenia logów zgadywania przy każdym odczycie
+    score = get_user_score(user)
 
     return {
         "login": user.login,
         "email": user.email,
         "created_at": user.created_at,
-        "points_guess": points_guess,
-        "points_transfer": points_guess_transfer,
-        "total_points": total,
-        "profile_picture": profile_picture_base64,
+        "points_guess": score.points_guess,
+        "points_transfer": score.points_transfer,
+        "total_points": score.total_points,
+        "profile_picture": get_profile_picture_url(user),
+        "profile_picture_variants": get_profile_picture_variant_urls(user),
+        "profile_picture_processing": bool(user.profile_picture_pending),
     }
 
 
@@ -31,7 +51,21 @@ def save_profile_picture(user, image_file):
     if not image_file:
         raise MissingFileException()
 
-    # zapisujemy obrazek binarnie w polu modelu user.profile_picture (pole typu BinaryField)
-    user.profile_picture = image_file.read()
-    user.save()
-    return {"success": "Zdjęcie profilowe zostało zapisane."}
+    # w wątku żądania tylko zapisujemy plik na dysk i sprawdzamy nagłówek obrazka;
+    # skalowanie i kodowanie wariantów robi worker Celery
+    upload_path = stage_upload(image_file)
+    token = request_profile_picture_processing(user)
+
+    def enqueue():
+        try:
+            process_profile_picture.delay(user.pk, upload_path, token)
+        except Exception:
+            # broker niedostępny: zdejmujemy znacznik przetwarzania (tylko jeśli to nadal nasz upload)
+            # i usuwamy plik, którego żaden worker już nie odbierze
+            abandon_profile_picture(user.pk, token)
+            user.profile_picture_pending = None
+            discard_upload(upload_path)
+            raise ProfilePictureQueueException()
+
+    transaction.on_commit(enqueue)
+    return {"success": "Zdjęcie profilowe zostało przyjęte do przetworzenia."}
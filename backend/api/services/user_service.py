@@ -1,4 +1,12 @@
+import json
+
 from django.contrib.auth import authenticate
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from api.models import UserAccount
@@ -7,16 +15,113 @@ from api.models import UserAccount
 from api.exceptions import (
     MissingFieldsException, EmailExistsException, LoginExistsException,
     RegistrationFailedException, InvalidCredentialsException, LoginFailedException,
-    NoUsersFoundException, UserNotFoundException
+    UserNotFoundException
 )
+from .player_service import PlayerCursorPagination
 from ..tasks import send_registration_email
 
 
-def get_all_users_service():
-    users = UserAccount.objects.all()   # Pobranie wszystkich użytkowników
-    if not users.exists():
-        raise NoUsersFoundException()   # Brak użytkowników to  wyjątek
-    return users
+def estimate_row_count(queryset):
+    # Szacunek liczby wierszy z PostgreSQL zamiast COUNT(*), który przy milionie wierszy czyta
+    # całą tabelę (lub indeks). None, gdy szacunku nie ma: inna baza albo tabela bez statystyk.
+    if not isinstance(queryset, QuerySet) or queryset.query.is_sliced:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            # cała tabela: reltuples z ostatniego ANALYZE / autovacuum (-1 przed pierwszym)
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            estimate = cursor.fetchone()[0]
+        else:
+            # z filtrem: liczba wierszy przewidziana przez planer dla tego zapytania
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+    return int(estimate) if estimate >= 0 else None
+
+
+def approximate_count(queryset, exact_count_limit):
+    # (liczba wierszy, czy to szacunek): szacunek planisty dla dużych wyników, poniżej limitu COUNT(*)
+    estimate = estimate_row_count(queryset)
+    if estimate is not None and estimate >= exact_count_limit:
+        return estimate, True
+    return queryset.count(), False
+
+
+class ApproximateCountPaginator(Paginator):
+    # Paginator Django (panel admina), który dla dużych wyników podaje szacowaną liczbę wierszy
+    # (estimate_row_count), a dokładny COUNT(*) wykonuje tylko poniżej exact_count_limit.
+    # Strona to wycinek LIMIT/OFFSET, więc głęboka strona kosztuje O(offset) - API używa kursora
+    # (UserCursorPagination). Szacunek może być zaniżony: strony za szacowanym końcem nie są
+    # odrzucane z góry, tylko gdy naprawdę są puste, a ostatnia strona nie jest obcinana.
+    exact_count_limit = 10_000
+    count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        count, self.count_is_approximate = approximate_count(self.object_list, self.exact_count_limit)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.count_is_approximate or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        if not object_list and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        return self._get_page(object_list, number, self)
+
+
+class UserCursorPagination(PlayerCursorPagination):
+    # Stronicowanie kursorem po loginie (unikalny indeks) - głęboka strona kosztuje tyle co pierwsza.
+    # Strona to obiekty UserAccount; count to szacunek dla dużych wyników (ApproximateCountPaginator).
+    page_size = 50
+    max_page_size = 200
+
+    def cursor_key(self, row):
+        return row.cursor_value, row.pk
+
+    def paginate_queryset(self, queryset, request, sort='login', view=None):
+        self.count, self.count_is_approximate = approximate_count(
+            queryset, ApproximateCountPaginator.exact_count_limit
+        )
+        return super().paginate_queryset(queryset, request, sort, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_is_approximate': self.count_is_approximate,
+            'next': self.next,
+            'previous': self.previous,
+            'results': data,
+        })
+
+
+def paginate_users_service(request):
+    users = UserAccount.objects.prefetch_related('groups', 'user_permissions')
+    search = request.query_params.get('search', '').strip()
+    if search:
+        # prefiks loginu lub e-maila bez rozróżniania wielkości liter - indeksy z migracji 0013
+        users = users.filter(Q(login__istartswith=search) | Q(email__istartswith=search))
+
+    paginator = UserCursorPagination()
+    page = paginator.paginate_queryset(users, request)
+    return paginator, page
 
 
 def get_user_by_id_service(user_id):
@@ -7,6 +7,7 @@ from api.exceptions import (
     LoginTakenException,
     AccountUpdateFailedException
 )
+from api.services.user_cache_service import load_user_fields
 
 
 def get_user_settings(user):
@@ -25,11 +26,13 @@ def update_user_account(user, login, email):
     if not email or '@' not in email:
         raise InvalidEmailException()
 
+    # full_clean sprawdza wszystkie pola - doczytujemy je jednym zapytaniem (bez bajtów profile_picture)
+    load_user_fields(user)
     user.login = login
     user.email = email
 
     try:
-        user.full_clean()
+        user.full_clean(exclude=['profile_picture'])
         user.save()
     except ValidationError as e:
         for field, messages in e.message_dict.items():
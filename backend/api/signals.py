@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Age, Club, Country, League, Player, Position, ShirtNumber, Transfer, TransferQuestionOfTheDay, UserAccount
+from .services.autocomplete_service import get_fresh_name_index
+from .services.catalog_service import bump_catalog_version, get_catalog_version
+from .services.player_flat_service import PLAYER_FLAT_LOOKUPS, sync_player_flat, update_lookup_value
+from .services.transfer_game_service import question_cache_key
+from .services.user_cache_service import invalidate_cached_user
+
+# Modele, których zmiana unieważnia kopie katalogu trzymane w pamięci procesów
+CATALOG_MODELS = (Transfer, Country, League, Club, Position, Age, ShirtNumber)
+
+
+# Wersję podbijamy od razu i jeszcze raz po commicie, żeby inny proces nie
+# zapamiętał pod nową wersją danych sprzed zatwierdzenia transakcji.
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+# Zmiana piłkarza dodatkowo aktualizuje w miejscu indeks podpowiedzi tego procesu,
+# zamiast przebudowywać go od zera - ale dopiero po commicie. Do tego czasu indeks jest
+# nieaktualny (podbita wersja), więc po wycofaniu transakcji zostanie przebudowany z bazy.
+# Inne procesy przebudują go po zmianie wersji.
+def player_changed(sender, instance, signal, **kwargs):
+    index = get_fresh_name_index()
+    version = bump_catalog_version()
+    if index is None:
+        transaction.on_commit(bump_catalog_version)
+        return
+
+    player_id, name, deleted = instance.pk, instance.name, signal is post_delete
+
+    def after_commit():
+        # jeśli od naszego podbicia nikt inny nie zmienił katalogu, wystarczy poprawić jeden wpis
+        still_fresh = get_catalog_version() == version
+        new_version = bump_catalog_version()
+        if still_fresh:
+            if deleted:
+                index.remove(player_id)
+            else:
+                index.put(player_id, name)
+            index.version = new_version
+
+    transaction.on_commit(after_commit)
+
+
+# Kopia do odczytów (PlayerFlat) zmienia się w tej samej transakcji co źródło.
+# Usunięcie piłkarza lub słownika kasuje kopię przez CASCADE.
+def player_flat_player_saved(sender, instance, **kwargs):
+    sync_player_flat([instance.pk])
+
+
+def player_flat_lookup_saved(sender, instance, created, **kwargs):
+    if not created:
+        update_lookup_value(sender.__name__, instance)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_changed_save_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_changed_delete_{model.__name__}')
+
+post_save.connect(player_changed, sender=Player, dispatch_uid='player_changed_save')
+post_delete.connect(player_changed, sender=Player, dispatch_uid='player_changed_delete')
+
+post_save.connect(player_flat_player_saved, sender=Player, dispatch_uid='player_flat_player_saved')
+for model in CATALOG_MODELS:
+    if model.__name__ in PLAYER_FLAT_LOOKUPS:
+        post_save.connect(player_flat_lookup_saved, sender=model, dispatch_uid=f'player_flat_lookup_saved_{model.__name__}')
+
+
+# Użytkownik zapamiętany przez CachedJWTAuthentication - wpis unieważniamy (we wszystkich procesach)
+# od razu i jeszcze raz po commicie, żeby równoległe żądanie nie zapamiętało wiersza sprzed zmiany
+def user_account_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+post_save.connect(user_account_changed, sender=UserAccount, dispatch_uid='user_account_changed_save')
+post_delete.connect(user_account_changed, sender=UserAccount, dispatch_uid='user_account_changed_delete')
+
+
+# Pytanie dnia zmienione np. w panelu admina - wpis w cache usuwamy od razu i po commicie
+def transfer_question_changed(sender, instance, **kwargs):
+    day = instance.question_date
+    cache.delete(question_cache_key(day))
+    transaction.on_commit(lambda: cache.delete(question_cache_key(day)))
+
+
+post_save.connect(transfer_question_changed, sender=TransferQuestionOfTheDay, dispatch_uid='transfer_question_changed_save')
+post_delete.connect(transfer_question_changed, sender=TransferQuestionOfTheDay, dispatch_uid='transfer_question_changed_delete')
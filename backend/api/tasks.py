@@ -10,3 +10,29 @@ def send_registration_email(email):
     message = 'Dziękujemy za rejestrację w naszej aplikacji.'
     from_email = 'goaldle.noreply@gmail.com'
     send_mail(subject, message, from_email, [email])
+
+
+@shared_task
+def process_profile_picture(user_id, upload_path, token):
+    from api.services.image_processing_service import (
+        abandon_profile_picture, discard_upload, publish_profile_picture, render_variants
+    )
+
+    try:
+        variants = render_variants(upload_path)
+    except Exception as e:
+        print(f"Błąd przetwarzania zdjęcia użytkownika {user_id}: {e}")
+        abandon_profile_picture(user_id, token)
+        return False
+    finally:
+        discard_upload(upload_path)
+    return publish_profile_picture(user_id, token, variants)
+
+
+@shared_task
+def schedule_daily_puzzles():
+    # uruchamiane przez Celery beat (CELERY_BEAT_SCHEDULE w settings.py)
+    from django.conf import settings
+    from api.services.daily_rollover_service import schedule_upcoming_puzzles
+
+    return schedule_upcoming_puzzles(settings.DAILY_PUZZLE_DAYS_AHEAD)
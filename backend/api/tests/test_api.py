@@ -3,11 +3,27 @@ from rest_framework.test import APIClient
 from rest_framework.test import force_authenticate
 from django.urls import reverse
 from api.services.daily_game_service import compare_values, get_or_assign_today_player
+from api.services.daily_target_service import daily_seed, jump_consistent_hash
+from api.services.sampling_service import sample_ids, sample_rows
+from api.services.player_catalog import get_player_catalog
+from api.services.facet_service import facet_counts_fallback, facet_counts_postgres, get_facet_counts
+from api.services.autocomplete_service import get_name_index
+from api.normalization import fold_name
+from api.services.fuzzy_name_service import suggest_similar_names, trigrams
+from api.services.player_resolver_service import resolve_player_id
+from api.services.blob_store_service import get_blob_storage, open_blob, put_blob
+from api.services.image_processing_service import PROFILE_PICTURE_VARIANTS, request_profile_picture_processing, stage_upload
+from api.services.user_profile_service import get_user_profile
+from api.services.user_cache_service import get_user_cache
+from api.tasks import process_profile_picture
+from api.services.leaderboard_service import GAME_GUESS, GAME_TRANSFER, record_correct_guess
 from api.views.players import get_all_players, get_player, get_unique_filters
 
 from api.views.example import ExampleView
-from api.models import Age, Club, Country, League, Position, ShirtNumber, Transfer, TransferQuestionOfTheDay, UserAccount, Player, Role,  UserGuessLog, UserGuessLogTransfer, UserPlayerAssignment
+from api.models import Age, Club, Country, League, Position, ShirtNumber, Transfer, TransferQuestionOfTheDay, UserAccount, Player, PlayerAlias, PlayerFlat, Role,  UserGuessLog, UserGuessLogTransfer, UserPlayerAssignment, UserScore
 import base64
+import hashlib
+import os
 from datetime import date
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIRequestFactory
@@ -17,6 +33,37 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError
 from decimal import Decimal
+from io import BytesIO, StringIO
+from PIL import Image
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+# Każdy test startuje z pustym cache (wersja katalogu i kopie w pamięci procesu)
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    # id użytkowników powtarzają się między testami (wycofane transakcje)
+    get_user_cache().clear()
+
+# Magazyn obrazków w katalogu tymczasowym, żeby testy nie pisały do backend/var
+@pytest.fixture(autouse=True)
+def blob_storage(settings, tmp_path):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'blobs': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': tmp_path / 'blobs'},
+        },
+    }
+    settings.PROFILE_PICTURE_UPLOAD_DIR = tmp_path / 'uploads'
+
+# Pliki metryk procesów też w katalogu tymczasowym (osobny rejestr dla każdego testu)
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = tmp_path / 'metrics'
+    settings.SLOW_QUERY_DIR = tmp_path / 'slow_queries'
+    return settings.METRICS_DIR
 
 # Fixture inicjalizujący niezalogowanego klienta API
 @pytest.fixture
@@ -97,8 +144,9 @@ def transfer_question(db):
 
 
 @pytest.fixture
-def assign_target_player(user, target_player):
-    # Przypisujemy target_player do user na dzisiaj
+def assign_target_player(settings, user, target_player):
+    # Przypisujemy target_player do user na dzisiaj (tryb audytu - zapisany przydział ma pierwszeństwo)
+    settings.DAILY_TARGET_PERSIST_ASSIGNMENTS = True
     return UserPlayerAssignment.objects.create(user=user, assignment_date=date.today(), player=target_player)
 
 
@@ -249,75 +297,344 @@ def test_compare_values_down():
 def test_compare_values_equal():
     assert compare_values(7, 7) == 'equal'
 
-@patch('api.models.Player.objects.order_by')
-@patch('api.models.UserPlayerAssignment.objects.get_or_create')
-def test_get_or_assign_today_player_creates_assignment(mock_get_or_create, mock_order_by):
-    mock_user = MagicMock()
-    mock_player = MagicMock()
-    mock_order_by.return_value.first.return_value = mock_player
-    mock_get_or_create.return_value = (MagicMock(player=mock_player), True)
+@pytest.mark.django_db
+def test_get_or_assign_today_player_is_deterministic(user, target_player, guessed_player):
+    first = get_or_assign_today_player(user)
+    second = get_or_assign_today_player(user)
+
+    assert first.pk == second.pk
+    assert first.pk in (target_player.pk, guessed_player.pk)
+
+@pytest.mark.django_db
+def test_get_or_assign_today_player_does_not_persist_by_default(user, target_player):
+    result = get_or_assign_today_player(user)
+
+    assert result == target_player
+    assert not UserPlayerAssignment.objects.filter(user=user).exists()
+
+@pytest.mark.django_db
+def test_get_or_assign_today_player_audit_mode_persists(settings, user, target_player):
+    settings.DAILY_TARGET_PERSIST_ASSIGNMENTS = True
+
+    result = get_or_assign_today_player(user)
+
+    assignment = UserPlayerAssignment.objects.get(user=user, assignment_date=date.today())
+    assert assignment.player == result == target_player
+
+@pytest.mark.django_db
+def test_get_or_assign_today_player_audit_mode_honours_existing_row(settings, user, target_player, guessed_player):
+    settings.DAILY_TARGET_PERSIST_ASSIGNMENTS = True
+    picked = get_or_assign_today_player(user)
+    other = guessed_player if picked == target_player else target_player
+    UserPlayerAssignment.objects.filter(user=user).update(player=other)
+
+    assert get_or_assign_today_player(user) == other
+
+@pytest.mark.django_db
+def test_get_or_assign_today_player_no_players(user):
+    from api.exceptions import NoPlayersFoundException
+
+    with pytest.raises(NoPlayersFoundException):
+        get_or_assign_today_player(user)
+
+def test_jump_consistent_hash_is_stable_when_catalog_grows():
+    # dopisanie jednego piłkarza na koniec listy przenosi tylko ~1/n przydziałów
+    moved = sum(
+        jump_consistent_hash(daily_seed(user_id, date(2025, 1, 1)), 100) !=
+        jump_consistent_hash(daily_seed(user_id, date(2025, 1, 1)), 101)
+        for user_id in range(2000)
+    )
+    assert moved < 60
+
+def test_daily_seed_changes_with_day_and_user():
+    assert daily_seed(1, date(2025, 1, 1)) != daily_seed(1, date(2025, 1, 2))
+    assert daily_seed(1, date(2025, 1, 1)) != daily_seed(2, date(2025, 1, 1))
+
+@pytest.mark.django_db
+def test_daily_target_is_pinned_for_the_day(player_data):
+    from api.services.daily_target_service import pick_daily_player_id
+
+    players = [Player.objects.create(name=f"Dzienny {i}", **player_data) for i in range(10)]
+    today = date.today()
+    targets = {user_id: pick_daily_player_id(user_id, today) for user_id in range(1, 200)}
+
+    # nowy piłkarz w trakcie dnia nie zmienia niczyjego celu
+    Player.objects.create(name="Dopisany w trakcie dnia", **player_data)
+    assert {user_id: pick_daily_player_id(user_id, today) for user_id in targets} == targets
+
+    # usunięcie piłkarza zmienia cel tylko tym, którzy go wylosowali
+    removed_id = players[0].pk
+    players[0].delete()
+    after_delete = {user_id: pick_daily_player_id(user_id, today) for user_id in targets}
+    assert removed_id in targets.values()
+    assert all(
+        after_delete[user_id] == target if target != removed_id else after_delete[user_id] != removed_id
+        for user_id, target in targets.items()
+    )
+
+@pytest.mark.django_db
+def test_backfill_player_assignments_command(user, target_player):
+    call_command('backfill_player_assignments', '--date', '2025-01-01', '--days', '2', stdout=StringIO())
+    call_command('backfill_player_assignments', '--date', '2025-01-01', stdout=StringIO())
+
+    assignments = UserPlayerAssignment.objects.filter(user=user)
+    assert assignments.count() == 2
+    assert {a.player_id for a in assignments} == {target_player.pk}
+
+@pytest.mark.django_db
+def test_sample_rows_returns_distinct_rows(player_data):
+    for i in range(20):
+        Player.objects.create(name=f"Sample {i}", **player_data)
+
+    rows = sample_rows(Player.objects.all(), 5)
+
+    assert len(rows) == 5
+    assert len({row.pk for row in rows}) == 5
+
+@pytest.mark.django_db
+def test_sample_ids_caps_k_and_sees_new_rows(player_data):
+    assert sample_ids(Player, 10) == []
+
+    player = Player.objects.create(name="Jedyny", **player_data)
+
+    assert sample_ids(Player, 10) == [player.pk]
+
+@pytest.mark.django_db
+def test_start_transfer_game_creates_question_of_the_day(auth_client, transfer):
+    response = auth_client.get('/api/transfer/start')
+
+    assert response.status_code == 200
+    assert TransferQuestionOfTheDay.objects.get(question_date=date.today()).transfer == transfer
+
+@pytest.mark.django_db
+def test_player_catalog_describes_and_compares(target_player, guessed_player):
+    catalog = get_player_catalog()
+    target_row = catalog.row(target_player.pk)
+    guessed_row = catalog.row(guessed_player.pk)
+
+    assert catalog.describe(target_row) == {
+        'name': "Target Player", 'country': "Poland", 'league': "Ekstraklasa", 'club': "Club",
+        'position': "Forward", 'age': 25, 'number': 10,
+    }
+    assert all(catalog.matches(guessed_row, target_row).values())
+
+@pytest.mark.django_db
+def test_player_catalog_compares_lookups_by_name(target_player, guessed_player):
+    # osobny wiersz Country o tej samej nazwie nadal jest "tym samym" krajem
+    guessed_player.country = Country.objects.create(name="Poland")
+    guessed_player.save()
 
-    result = get_or_assign_today_player(mock_user)
-    assert result == mock_player
+    catalog = get_player_catalog()
+    assert catalog.matches(catalog.row(guessed_player.pk), catalog.row(target_player.pk))['country'] is True
 
-@patch('api.models.Player.objects.order_by')
-@patch('api.models.UserPlayerAssignment.objects.get_or_create')
-def test_get_or_assign_today_player_creates_assignment(mock_get_or_create, mock_order_by):
-    mock_user = MagicMock()
-    mock_player = MagicMock()
-    mock_order_by.return_value.first.return_value = mock_player
-    mock_assignment = MagicMock(player=mock_player)
-    mock_get_or_create.return_value = (mock_assignment, True)
+@pytest.mark.django_db
+def test_player_catalog_invalidated_on_lookup_change(target_player):
+    assert get_player_catalog().describe(get_player_catalog().row(target_player.pk))['club'] == "Club"
 
-    result = get_or_assign_today_player(mock_user)
+    target_player.club.name = "Nowy Klub"
+    target_player.club.save()
 
-    mock_order_by.assert_called_once_with('?')
-    assert result == mock_player
+    catalog = get_player_catalog()
+    assert catalog.describe(catalog.row(target_player.pk))['club'] == "Nowy Klub"
 
-@patch('api.models.Player.objects.order_by')
-@patch('api.models.UserPlayerAssignment.objects.get_or_create')
-def test_get_or_assign_today_player_assignment_already_exists(mock_get_or_create, mock_order_by):
-    mock_user = MagicMock()
-    mock_player = MagicMock()
-    mock_assignment = MagicMock(player=mock_player)
-    mock_get_or_create.return_value = (mock_assignment, False)
+@pytest.mark.django_db
+def test_handle_player_guess_does_not_join_lookups(user, target_player, guessed_player):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from api.services.daily_game_service import handle_player_guess
 
-    result = get_or_assign_today_player(mock_user)
+    handle_player_guess(user, "Nieistniejący")  # rozgrzanie katalogu w pamięci
+    with CaptureQueriesContext(connection) as queries:
+        result = handle_player_guess(user, guessed_player.name)
 
-    assert result == mock_player
+    assert result['status'] == 200
+    assert result['data']['player_data']['name'] == guessed_player.name
+    assert not any('JOIN' in query['sql'] for query in queries.captured_queries)
+
+def test_fold_name_strips_case_and_diacritics():
+    assert fold_name("  Łukasz  FABIAŃSKI ") == "lukasz fabianski"
+    assert fold_name("Martin Ødegaard") == "martin odegaard"
 
 @pytest.mark.django_db
-@patch('api.models.UserPlayerAssignment.objects.get_or_create')
-def test_get_or_assign_today_player_returns_correct_player(mock_get_or_create):
-    mock_user = MagicMock()
-    mock_player = MagicMock()
-    mock_assignment = MagicMock(player=mock_player)
-    mock_get_or_create.return_value = (mock_assignment, False)
+def test_name_index_matches_surname_and_diacritics(player_data):
+    Player.objects.create(name="Robert Lewandowski", **player_data)
+    Player.objects.create(name="Wojciech Szczęsny", **player_data)
+    Player.objects.create(name="Virgil van Dijk", **player_data)
 
-    result = get_or_assign_today_player(mock_user)
+    index = get_name_index()
 
-    assert result == mock_player
+    assert index.search("lewan") == ["Robert Lewandowski"]
+    assert index.search("ROB") == ["Robert Lewandowski"]
+    assert index.search("szczes") == ["Wojciech Szczęsny"]
+    assert index.search("van d") == ["Virgil van Dijk"]
+    assert index.search("messi") == []
 
-@patch('api.models.Player.objects.order_by')
-@patch('api.models.UserPlayerAssignment.objects.get_or_create')
-def test_get_or_assign_today_player_orders_by_random(mock_get_or_create, mock_order_by):
-    mock_user = MagicMock()
-    mock_player = MagicMock()
-    mock_order_by.return_value.first.return_value = mock_player
-    mock_assignment = MagicMock(player=mock_player)
-    mock_get_or_create.return_value = (mock_assignment, True)
+@pytest.mark.django_db
+def test_name_index_updates_in_place(player_data, django_capture_on_commit_callbacks):
+    player = Player.objects.create(name="Robert Lewandowski", **player_data)
+    index = get_name_index()
 
-    result = get_or_assign_today_player(mock_user)
+    with django_capture_on_commit_callbacks(execute=True):
+        player.name = "Robert Kubica"
+        player.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        Player.objects.create(name="Kamil Grosicki", **player_data)
+
+    assert get_name_index() is index
+    assert index.search("lewan") == []
+    assert index.search("kubi") == ["Robert Kubica"]
+    assert index.search("gros") == ["Kamil Grosicki"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        player.delete()
+    assert get_name_index().search("rob") == []
+
+@pytest.mark.django_db
+def test_name_index_rebuilds_after_rolled_back_change(player_data, django_capture_on_commit_callbacks):
+    from django.db import transaction
+
+    player = Player.objects.create(name="Robert Lewandowski", **player_data)
+    index = get_name_index()
+
+    # wycofana transakcja: on_commit nie wykonuje się, indeksu nie wolno poprawić w miejscu
+    with django_capture_on_commit_callbacks(execute=False):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            Player.objects.create(name="Kamil Grosicki", **player_data)
+            player.delete()
+            raise RuntimeError()
+
+    assert index.search("gros") == []
+    rebuilt = get_name_index()
+    assert rebuilt is not index
+    assert rebuilt.search("gros") == []
+    assert rebuilt.search("lewan") == ["Robert Lewandowski"]
+
+def test_trigrams_match_pg_trgm_padding():
+    assert trigrams("Ana") == {"  a", " an", "ana", "na "}
+
+@pytest.mark.django_db
+def test_suggest_similar_names_ranks_near_matches(player_data):
+    Player.objects.create(name="Robert Lewandowski", **player_data)
+    Player.objects.create(name="Robert Kubica", **player_data)
+    Player.objects.create(name="Lionel Messi", **player_data)
+
+    suggestions = suggest_similar_names("Robert Lewandosky")
+
+    assert suggestions[0] == "Robert Lewandowski"
+    assert "Lionel Messi" not in suggestions
+
+@pytest.mark.django_db
+def test_check_guess_not_found_returns_suggestions(user_auth_client, assign_target_player, target_player):
+    response = user_auth_client.post(reverse('check_guess'), data={'player_name': 'Target Plyer'})
+
+    assert response.status_code == 404
+    assert response.data['suggestions'] == [target_player.name]
+
+@pytest.mark.django_db
+def test_resolve_player_id_ignores_case_and_diacritics(player_data):
+    player = Player.objects.create(name="Łukasz Fabiański", **player_data)
+
+    assert player.normalized_name == "lukasz fabianski"
+    assert resolve_player_id("lukasz FABIANSKI") == player.pk
+    assert resolve_player_id("Łukasz Fabiańsk") is None
+    assert resolve_player_id("") is None
+
+@pytest.mark.django_db
+def test_resolve_player_id_uses_aliases(player_data):
+    player = Player.objects.create(name="Kylian Mbappé", **player_data)
+    PlayerAlias.objects.create(player=player, alias="Donatello")
 
-    mock_order_by.assert_called_once_with('?')
-    mock_order_by.return_value.first.assert_called_once()
-    assert result == mock_player
+    assert resolve_player_id("donatello") == player.pk
 
-@patch('api.models.Player.objects')
+@pytest.mark.django_db
+def test_player_normalized_name_is_unique(player_data):
+    from django.db import IntegrityError, transaction
+
+    Player.objects.create(name="Wojciech Szczęsny", **player_data)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Player.objects.create(name="wojciech szczesny", **player_data)
+
+def hammer(worker, threads=16):
+    # równoległe wywołania z osobnych wątków (każdy ma własne połączenie z bazą)
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Barrier
+    from django.db import connection
+
+    if connection.vendor == 'sqlite':
+        # testowa baza SQLite w pamięci (shared cache) zgłasza "table is locked" zamiast czekać
+        pytest.skip("test współbieżności wymaga PostgreSQL")
+    barrier = Barrier(threads)
+
+    def run(_):
+        try:
+            barrier.wait()
+            return worker()
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(run, range(threads)))
+
+# Test: wiele równoległych prób jednego użytkownika - dokładnie 5 przyjętych, bez zgubionych zapisów
+@pytest.mark.django_db(transaction=True)
+def test_record_guess_concurrent_respects_attempt_limit(user):
+    from api.services.guess_log_service import MAX_ATTEMPTS, record_guess
+
+    results = hammer(lambda: record_guess(UserGuessLog, user, date.today(), correct=False))
+
+    accepted = sorted(result[0] for result in results if result is not None)
+    assert accepted == list(range(1, MAX_ATTEMPTS + 1))
+    log = UserGuessLog.objects.get(user=user, guess_date=date.today())
+    assert log.guess_number == MAX_ATTEMPTS
+
+# Test: równoległe trafienia w grze transferowej - punkty naliczone tylko raz
+@pytest.mark.django_db(transaction=True)
+def test_guess_transfer_concurrent_correct_guesses_score_once(user, transfer_question):
+    from api.services.transfer_game_service import guess_player
+    from api.exceptions import NoMoreAttemptsException
+
+    player_name = transfer_question.transfer.player.name
+
+    def guess():
+        try:
+            return guess_player(user, player_name)["guessed_correctly"]
+        except NoMoreAttemptsException:
+            return None
+
+    results = hammer(guess, threads=8)
+
+    assert results.count(True) == 1
+    assert results.count(None) == 7
+    log = UserGuessLogTransfer.objects.get(user=user, guess_date=date.today())
+    assert (log.guess_number, log.guessed_correctly) == (1, True)
+    assert UserScore.objects.get(user=user).points_transfer == 100
+
+# Test: po zgadnięciu i po wyczerpaniu limitu kolejna próba jest odrzucana bez zapisu
+@pytest.mark.django_db
+def test_record_guess_rejects_after_correct_guess(user):
+    from api.services.guess_log_service import record_guess
+
+    assert record_guess(UserGuessLog, user, date.today(), correct=False) == (1, False)
+    assert record_guess(UserGuessLog, user, date.today(), correct=True) == (2, True)
+    assert record_guess(UserGuessLog, user, date.today(), correct=False) is None
+    assert UserGuessLog.objects.get(user=user).guess_number == 2
+
+@pytest.mark.django_db
+def test_guess_transfer_player_ignores_diacritics(auth_client, transfer_question):
+    player = transfer_question.transfer.player
+    player.name = "Łukasz Piszczek"
+    player.save()
+
+    response = auth_client.post('/api/transfer/guess', {"player_name": "lukasz piszczek"}, format='json')
+
+    assert response.status_code == 200
+    assert response.data["guessed_correctly"] is True
+
+@patch('api.models.PlayerFlat.objects')
 def test_get_all_players_default_sort(mock_player_objects, api_factory, user):
     mock_qs = MagicMock()
-    mock_player_objects.filter.return_value.order_by.return_value = mock_qs
-    mock_qs.__len__.return_value = 0  # zero wyników
+    mock_player_objects.filter.return_value.values_list.return_value.annotate.return_value.order_by.return_value = mock_qs
+    mock_qs.__getitem__.return_value = []  # zero wyników
 
     request = api_factory.get('/players')
     force_authenticate(request, user=user)
@@ -325,15 +642,18 @@ def test_get_all_players_default_sort(mock_player_objects, api_factory, user):
     response = get_all_players(request)
 
     assert response.status_code == 200
-    assert 'results' in response.data  # paginacja DRF
+    assert 'results' in response.data
     mock_player_objects.filter.assert_called_once()
-    mock_player_objects.filter.return_value.order_by.assert_called_with('name')
+    # id jako drugi klucz sortowania - kursor musi jednoznacznie wskazywać wiersz
+    mock_player_objects.filter.return_value.values_list.return_value.annotate.return_value.order_by.assert_called_with('name', 'pk')
+    mock_qs.__getitem__.assert_called_with(slice(None, 4))
 
 
-@patch('api.models.Player.objects')
+@patch('api.models.PlayerFlat.objects')
 def test_get_all_players_with_filters_and_sort(mock_player_objects, api_factory, user):
     mock_qs = MagicMock()
-    mock_player_objects.filter.return_value.order_by.return_value = mock_qs
+    mock_player_objects.filter.return_value.values_list.return_value.annotate.return_value.order_by.return_value = mock_qs
+    mock_qs.__getitem__.return_value = []
 
     request = api_factory.get('/players', {'country': 'Poland', 'league': 'Ekstraklasa', 'position': 'Defender', 'sort': '-name'})
     force_authenticate(request, user=user)
@@ -343,17 +663,17 @@ def test_get_all_players_with_filters_and_sort(mock_player_objects, api_factory,
     mock_player_objects.filter.assert_called()
     args, kwargs = mock_player_objects.filter.call_args
     # sprawdzamy czy filtr zawiera country, league i position
-    assert 'country__name__icontains' in str(args[0])
-    assert 'league__name__icontains' in str(args[0])
-    assert 'position__name__icontains' in str(args[0])
-    mock_player_objects.filter.return_value.order_by.assert_called_with('-name')
+    assert 'country_name__icontains' in str(args[0])
+    assert 'league_name__icontains' in str(args[0])
+    assert 'position_name__icontains' in str(args[0])
+    mock_player_objects.filter.return_value.values_list.return_value.annotate.return_value.order_by.assert_called_with('-name', '-pk')
 
 @patch('api.serializers.PlayerSerializer')
 def test_get_player_found(mock_serializer, api_factory, user):
-    mock_player = MagicMock()
-    with patch('api.models.Player.objects.filter') as mock_filter:
-        mock_filter.return_value.first.return_value = mock_player
-        mock_serializer.return_value.data = {'id': 1, 'name': 'Test Player'}
+    with patch('api.models.PlayerFlat.objects.filter') as mock_filter:
+        mock_filter.return_value.values_list.return_value.first.return_value = (
+            1, 'Test Player', 'Poland', 'Ekstraklasa', 'Club', 'Forward', 25, 10,
+        )
 
         request = api_factory.get('/players/1')
         force_authenticate(request, user=user)
@@ -535,7 +855,7 @@ def test_get_all_users_with_data(auth_client):
     UserAccount.objects.create_user(email="test@example.com", login="innylogin", password="haslo123")
     response = auth_client.get('/api/users/')
     assert response.status_code == 200
-    assert isinstance(response.data, list)
+    assert isinstance(response.data['results'], list)
 
 # Test: pobieranie konkretnego użytkownika po jego ID — sprawdzenie poprawności danych
 @pytest.mark.django_db
@@ -587,6 +907,59 @@ def test_get_unique_filters(auth_client, target_player):
     assert target_player.league.name in data["leagues"]
     assert target_player.position.name in data["positions"]
 
+@pytest.fixture
+def faceted_players(db):
+    lookups = {
+        "club": Club.objects.create(name="Club"),
+        "age": Age.objects.create(value=25),
+        "shirt_number": ShirtNumber.objects.create(number=10),
+    }
+    poland, spain = Country.objects.create(name="Poland"), Country.objects.create(name="Spain")
+    ekstraklasa, laliga = League.objects.create(name="Ekstraklasa"), League.objects.create(name="La Liga")
+    forward, defender = Position.objects.create(name="Forward"), Position.objects.create(name="Defender")
+    rows = [
+        (poland, ekstraklasa, forward), (poland, ekstraklasa, defender), (poland, laliga, forward),
+        (spain, laliga, forward), (spain, laliga, defender), (spain, laliga, defender),
+    ]
+    for i, (country, league, position) in enumerate(rows):
+        Player.objects.create(name=f"Facet {i}", country=country, league=league, position=position, **lookups)
+
+# Test: liczby w facecie uwzględniają filtry pozostałych facetów, ale nie własny
+@pytest.mark.django_db
+def test_get_unique_filters_counts(auth_client, faceted_players):
+    data = auth_client.get('/api/filters/').data
+    assert data["countries"] == ["Poland", "Spain"]
+    assert data["counts"]["countries"] == {"Poland": 3, "Spain": 3}
+    assert data["counts"]["positions"] == {"Forward": 3, "Defender": 3}
+
+    data = auth_client.get('/api/filters/?country=pol&position=Defender').data
+    assert data["countries"] == ["Poland", "Spain"]
+    assert data["counts"]["countries"] == {"Poland": 1, "Spain": 2}
+    assert data["counts"]["leagues"] == {"Ekstraklasa": 1, "La Liga": 0}
+    assert data["counts"]["positions"] == {"Forward": 2, "Defender": 1}
+
+# Test: wynik facetów jest w cache do zmiany katalogu
+@pytest.mark.django_db
+def test_facet_counts_cached_until_player_write(faceted_players, django_assert_num_queries):
+    get_facet_counts({})
+    with django_assert_num_queries(0):
+        counts = get_facet_counts({})
+    assert counts["countries"]["Poland"] == 3
+
+    player = Player.objects.get(name="Facet 3")
+    player.country = Country.objects.get(name="Poland")
+    player.save()
+    assert get_facet_counts({})["countries"] == {"Poland": 4, "Spain": 2}
+
+# Test: zapytanie GROUPING SETS daje to samo co wariant bez niego
+@pytest.mark.django_db
+def test_facet_counts_postgres_matches_fallback(faceted_players):
+    from django.db import connection
+    if connection.vendor != 'postgresql':
+        pytest.skip("GROUPING SETS ... FILTER testujemy na PostgreSQL")
+    for filters in ({}, {"country": "pol"}, {"league": "liga", "position": "def"}):
+        assert facet_counts_postgres(filters) == facet_counts_fallback(filters)
+
 @pytest.mark.django_db
 def test_get_all_players_with_filters_and_sort(auth_client, target_player):
     response = auth_client.get('/api/players/?country=Poland&sort=name')
@@ -597,7 +970,7 @@ def test_get_all_players_with_filters_and_sort(auth_client, target_player):
 
 @pytest.mark.django_db
 def test_players_pagination(auth_client, player_data):
-    # Tworzymy 5 graczy, a page_size = 3, więc będzie 2 strony
+    # Tworzymy 5 graczy, a page_size = 3, więc będą 2 strony
     for i in range(5):
         Player.objects.create(
             name=f"Player {i}",
@@ -609,13 +982,163 @@ def test_players_pagination(auth_client, player_data):
             shirt_number=player_data["shirt_number"],
         )
 
-    response = auth_client.get('/api/players/?page=1')
+    response = auth_client.get('/api/players/')
     assert response.status_code == 200
-    assert len(response.data["results"]) <= 3
+    assert [p["name"] for p in response.data["results"]] == ["Player 0", "Player 1", "Player 2"]
+    assert response.data["previous"] is None
+    assert "count" not in response.data  # bez COUNT(*)
 
-    response2 = auth_client.get('/api/players/?page=2')
+    response2 = auth_client.get(response.data["next"])
     assert response2.status_code == 200
-    assert len(response2.data["results"]) <= 3
+    assert [p["name"] for p in response2.data["results"]] == ["Player 3", "Player 4"]
+    assert response2.data["next"] is None
+
+    back = auth_client.get(response2.data["previous"])
+    assert [p["name"] for p in back.data["results"]] == ["Player 0", "Player 1", "Player 2"]
+    assert back.data["previous"] is None
+    assert back.data["next"] is not None
+
+# Test: kursor z remisami w kolumnie sortowania - każdy piłkarz dokładnie raz, w obu kierunkach, z filtrem
+@pytest.mark.django_db
+@pytest.mark.parametrize("sort", ['age__value', '-age__value', 'name', '-name'])
+def test_players_cursor_pagination_walks_all_rows(auth_client, player_data, sort):
+    other_country = Country.objects.create(name="Spain")
+    ages = [Age.objects.create(value=value) for value in (30, 19, 25)]
+    for i in range(11):
+        Player.objects.create(
+            name=f"Player {i:02d}",
+            country=player_data["country"] if i % 4 else other_country,
+            league=player_data["league"],
+            club=player_data["club"],
+            position=player_data["position"],
+            age=ages[i % 3],
+            shirt_number=player_data["shirt_number"],
+        )
+
+    expected = list(
+        Player.objects.filter(country__name__icontains="Poland")
+        .order_by(sort, ('-' if sort.startswith('-') else '') + 'id')
+        .values_list('id', flat=True)
+    )
+
+    pages = []
+    url = f'/api/players/?sort={sort}&country=Poland&page_size=2'
+    while url:
+        response = auth_client.get(url)
+        assert response.status_code == 200
+        pages.append([p["id"] for p in response.data["results"]])
+        url = response.data["next"]
+        last = response.data
+    assert [player_id for page in pages for player_id in page] == expected
+
+    # z ostatniej strony cofamy się do pierwszej
+    back = []
+    url = last["previous"]
+    while url:
+        response = auth_client.get(url)
+        back.insert(0, [p["id"] for p in response.data["results"]])
+        url = response.data["previous"]
+    assert back == pages[:-1]
+
+# Test: strona listy piłkarzy to jedno zapytanie, bez JOIN-ów do słowników
+@pytest.mark.django_db
+def test_players_list_is_one_query_per_page(api_factory, user, player_data, django_assert_num_queries):
+    for i in range(7):
+        Player.objects.create(name=f"Player {i}", **player_data)
+
+    url = '/players?page_size=3'
+    pages = 0
+    while url:
+        request = api_factory.get(url)
+        force_authenticate(request, user=user)
+        with django_assert_num_queries(1) as captured:
+            response = get_all_players(request)
+        assert 'JOIN' not in captured.captured_queries[0]['sql'].upper()
+        pages += 1
+        url = response.data["next"]
+    assert pages == 3
+
+    request = api_factory.get('/players', {'sort': '-age__value', 'country': 'Pol', 'page_size': 10})
+    force_authenticate(request, user=user)
+    with django_assert_num_queries(1):
+        response = get_all_players(request)
+    assert response.data["results"][0] == {
+        "id": response.data["results"][0]["id"],
+        "name": "Player 6",
+        "country_name": "Poland",
+        "league_name": "Ekstraklasa",
+        "club_name": "Club",
+        "position_name": "Forward",
+        "age_value": 25,
+        "shirt_number_value": 10,
+    }
+
+# Test: PlayerFlat nadąża za zmianami piłkarza i słowników
+@pytest.mark.django_db
+def test_player_flat_follows_source_tables(player_data):
+    player = Player.objects.create(name="Flat Player", **player_data)
+    flat = PlayerFlat.objects.get(pk=player.pk)
+    assert (flat.name, flat.country_name, flat.age_value, flat.shirt_number_value) == ("Flat Player", "Poland", 25, 10)
+
+    player.name = "Renamed Player"
+    player.club = Club.objects.create(name="Other Club")
+    player.save()
+    flat.refresh_from_db()
+    assert (flat.name, flat.club_name) == ("Renamed Player", "Other Club")
+
+    country = player_data["country"]
+    country.name = "Polska"
+    country.save()
+    age = player_data["age"]
+    age.value = 26
+    age.save()
+    flat.refresh_from_db()
+    assert (flat.country_name, flat.age_value) == ("Polska", 26)
+
+    player.delete()
+    assert not PlayerFlat.objects.filter(pk=player.pk).exists()
+
+# Test: sprawdzanie spójności wykrywa zmiany z pominięciem sygnałów, --fix je naprawia
+@pytest.mark.django_db
+def test_check_player_flat_command(player_data):
+    kept = Player.objects.create(name="Kept", **player_data)
+    removed = Player.objects.create(name="Removed", **player_data)
+    call_command('check_player_flat', stdout=StringIO())
+
+    # bulk_create i update() nie wysyłają sygnałów
+    Player.objects.bulk_create([Player(name="Bulk", normalized_name="bulk", **player_data)])
+    Player.objects.filter(pk=kept.pk).update(name="Changed")
+    Player.objects.filter(pk=removed.pk).update(name="Still here")
+    PlayerFlat.objects.filter(pk=removed.pk).delete()
+
+    out = StringIO()
+    with pytest.raises(CommandError):
+        call_command('check_player_flat', stdout=out)
+    assert "brakujące: 2" in out.getvalue()
+    assert "nieaktualne: 1" in out.getvalue()
+
+    call_command('check_player_flat', '--fix', stdout=StringIO())
+    call_command('check_player_flat', stdout=StringIO())
+    assert PlayerFlat.objects.get(pk=kept.pk).name == "Changed"
+
+# Test: przebudowa od zera odtwarza kopię i unieważnia katalog w pamięci
+@pytest.mark.django_db
+def test_rebuild_player_flat_command(player_data):
+    player = Player.objects.create(name="Player", **player_data)
+    catalog = get_player_catalog()
+    PlayerFlat.objects.all().delete()
+
+    out = StringIO()
+    call_command('rebuild_player_flat', stdout=out)
+    assert "Zapisano 1 piłkarzy" in out.getvalue()
+    assert PlayerFlat.objects.get(pk=player.pk).name == "Player"
+    assert get_player_catalog() is not catalog
+
+@pytest.mark.django_db
+def test_players_invalid_cursor(auth_client):
+    response = auth_client.get('/api/players/?cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert response.data["error"] == "Nieprawidłowy kursor stronicowania!"
 
 # Test: poprawna rejestracja nowego użytkownika — powinno zwrócić 201
 @pytest.mark.django_db
@@ -764,6 +1287,8 @@ def test_user_profile_success(auth_client):
     # Dodajemy zgadywania poprawne dla punktów z wymaganym polem guess_date
     UserGuessLog.objects.create(user=user, guessed_correctly=True, guess_date=date.today())
     UserGuessLogTransfer.objects.create(user=user, guessed_correctly=True, guess_date=date.today())
+    # punkty w profilu pochodzą z tabeli rankingu przeliczanej z logów
+    call_command('rebuild_leaderboard', stdout=StringIO())
 
     response = auth_client.get('/api/profile/')
     assert response.status_code == 200
@@ -774,18 +1299,142 @@ def test_user_profile_success(auth_client):
     assert response.data["total_points"] == 200
     assert response.data["profile_picture"] is None
 
-# Test: poprawne przesłanie zdjęcia profilowego
+def make_image_file(size=(1600, 1200), image_format='JPEG', name='test.jpg', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{image_format.lower()}")
+
+# Test: poprawne przesłanie zdjęcia profilowego - warianty powstają w zadaniu Celery
+@pytest.mark.django_db
+def test_upload_profile_picture_success(auth_client, settings, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        response = auth_client.post('/api/profile/upload-picture/', {'image': make_image_file()}, format='multipart')
+    assert response.status_code == 202
+    assert response.data["success"] == "Zdjęcie profilowe zostało przyjęte do przetworzenia."
+
+    user = UserAccount.objects.get(email="testuser@example.com")
+    assert user.profile_picture is None
+    assert user.profile_picture_pending is None
+    assert user.profile_picture_hash == user.profile_picture_variants['avatar']['jpeg']
+    for name, side in PROFILE_PICTURE_VARIANTS.items():
+        for extension, pil_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            with open_blob(user.profile_picture_variants[name][extension]) as blob:
+                data = blob.read()
+            with Image.open(BytesIO(data)) as image:
+                assert image.format == pil_format
+                assert image.size == (side, side)
+    with open_blob(user.profile_picture_variants['thumbnail']['webp']) as blob:
+        assert len(blob.read()) < 5 * 1024
+    # plik tymczasowy sprzątany po przetworzeniu
+    assert os.listdir(settings.PROFILE_PICTURE_UPLOAD_DIR) == []
+
+    data = auth_client.get('/api/profile/').data
+    assert data["profile_picture_processing"] is False
+    assert data["profile_picture_variants"]["thumbnail"]["webp"] == (
+        f"/api/profile/picture/{user.profile_picture_variants['thumbnail']['webp']}/"
+    )
+
+# Test: niedostępny broker Celery - znacznik przetwarzania zdjęty, plik tymczasowy usunięty
+@pytest.mark.django_db(transaction=True)
+def test_upload_profile_picture_when_queue_is_down(auth_client, settings):
+    with patch('api.services.user_profile_service.process_profile_picture.delay', side_effect=OSError("broker")):
+        response = auth_client.post('/api/profile/upload-picture/', {'image': make_image_file()}, format='multipart')
+    assert response.status_code == 503
+
+    user = UserAccount.objects.get(email="testuser@example.com")
+    assert user.profile_picture_pending is None
+    assert user.profile_picture_hash is None
+    assert os.listdir(settings.PROFILE_PICTURE_UPLOAD_DIR) == []
+    assert auth_client.get('/api/profile/').data["profile_picture_processing"] is False
+
+# Test: PNG z przezroczystością też daje warianty JPEG/WebP
 @pytest.mark.django_db
-def test_upload_profile_picture_success(auth_client):
-    image_content = b'testimagecontent'
-    image_file = SimpleUploadedFile("test.jpg", image_content, content_type="image/jpeg")
+def test_upload_profile_picture_png_with_alpha(auth_client, django_capture_on_commit_callbacks):
+    image_file = make_image_file(size=(300, 500), image_format='PNG', name='test.png', mode='RGBA')
+    with django_capture_on_commit_callbacks(execute=True):
+        response = auth_client.post('/api/profile/upload-picture/', {'image': image_file}, format='multipart')
+    assert response.status_code == 202
+    user = UserAccount.objects.get(email="testuser@example.com")
+    assert set(user.profile_picture_variants) == set(PROFILE_PICTURE_VARIANTS)
+
+# Test: dopóki worker nie skończy, profil zgłasza przetwarzanie i nie zmienia zdjęcia
+@pytest.mark.django_db
+def test_upload_profile_picture_is_processed_after_response(auth_client, settings, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        response = auth_client.post('/api/profile/upload-picture/', {'image': make_image_file()}, format='multipart')
+    assert response.status_code == 202
+    assert len(callbacks) == 1
+
+    data = auth_client.get('/api/profile/').data
+    assert data["profile_picture_processing"] is True
+    assert data["profile_picture"] is None
+    assert len(os.listdir(settings.PROFILE_PICTURE_UPLOAD_DIR)) == 1
 
+    callbacks[0]()
+    assert auth_client.get('/api/profile/').data["profile_picture_processing"] is False
+
+# Test: wynik starszego uploadu nie nadpisuje nowszego
+@pytest.mark.django_db
+def test_profile_picture_stale_upload_is_not_published(user, settings):
+    old_path = stage_upload(make_image_file(size=(100, 100)))
+    old_token = request_profile_picture_processing(user)
+    new_token = request_profile_picture_processing(user)
+
+    assert process_profile_picture(user.pk, old_path, old_token) is False
+    user.refresh_from_db()
+    assert user.profile_picture_pending == new_token
+    assert user.profile_picture_variants is None
+    assert not os.path.exists(old_path)
+
+# Test: plik, który nie jest obrazkiem, odrzucamy od razu
+@pytest.mark.django_db
+def test_upload_profile_picture_rejects_non_image(auth_client, settings):
+    image_file = SimpleUploadedFile("test.jpg", b'not an image', content_type="image/jpeg")
     response = auth_client.post('/api/profile/upload-picture/', {'image': image_file}, format='multipart')
+    assert response.status_code == 400
+    assert response.data["error"] == "Nieprawidłowy plik obrazu!"
+    assert os.listdir(settings.PROFILE_PICTURE_UPLOAD_DIR) == []
+
+# Test: za duży plik - 413
+@pytest.mark.django_db
+def test_upload_profile_picture_too_large(auth_client, settings):
+    settings.PROFILE_PICTURE_MAX_UPLOAD_SIZE = 1024
+    response = auth_client.post('/api/profile/upload-picture/', {'image': make_image_file()}, format='multipart')
+    assert response.status_code == 413
+    assert UserAccount.objects.get(email="testuser@example.com").profile_picture_pending is None
+
+# Test: zdjęcie serwowane pod adresem zależnym od treści, z nagłówkami cache
+@pytest.mark.django_db
+def test_profile_picture_served_from_blob_store(user):
+    image_content = make_image_file(size=(10, 10)).read()
+    digest = put_blob(image_content)
+    user.profile_picture_hash = digest
+    user.save()
+    url = get_user_profile(user)["profile_picture"]
+    assert url == f'/api/profile/picture/{digest}/'
+    assert digest == hashlib.sha256(image_content).hexdigest()
+
+    client = APIClient()
+    response = client.get(url)
     assert response.status_code == 200
-    assert response.data["success"] == "Zdjęcie profilowe zostało zapisane."
+    assert b''.join(response.streaming_content) == image_content
+    assert response['Content-Type'] == 'image/jpeg'
+    assert 'immutable' in response['Cache-Control']
+    etag = response['ETag']
 
-    user = UserAccount.objects.get(email="testuser@example.com")
-    assert bytes(user.profile_picture) == image_content
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    assert client.get('/api/profile/picture/' + '0' * 64 + '/').status_code == 404
+    assert client.get('/api/profile/picture/not-a-hash/').status_code == 404
+
+# Test: ten sam obrazek zapisany dwa razy trafia do magazynu tylko raz
+def test_put_blob_deduplicates_content():
+    first = put_blob(b'same bytes')
+    second = put_blob(SimpleUploadedFile("a.png", b'same bytes'))
+    assert first == second
+    storage = get_blob_storage()
+    assert storage.listdir(f'{first[:2]}/{first[2:4]}')[1] == [first]
 
 # Test: próba przesłania bez pliku — powinno zwrócić 400
 @pytest.mark.django_db
@@ -1050,4 +1699,713 @@ def test_get_player_names_without_query(auth_client, player_data):
     assert response.status_code == 200
     assert 'players' in response.data
     assert isinstance(response.data['players'], list)
-    assert len(response.data['players']) <= 10
\ No newline at end of file
+    assert len(response.data['players']) <= 10
+
+@pytest.mark.django_db
+def test_correct_guess_updates_user_score(user_auth_client, user, assign_target_player, target_player):
+    user_auth_client.post(reverse('check_guess'), data={'player_name': target_player.name})
+
+    assert UserScore.objects.get(user=user).points_guess == 100
+
+    response = user_auth_client.get('/api/profile/')
+    assert response.data["total_points"] == 100
+
+@pytest.mark.django_db
+def test_record_correct_guess_accumulates(user):
+    record_correct_guess(user, GAME_GUESS)
+    record_correct_guess(user, GAME_GUESS)
+    record_correct_guess(user, GAME_TRANSFER)
+
+    score = UserScore.objects.get(user=user)
+    assert (score.points_guess, score.points_transfer, score.total_points) == (200, 100, 300)
+
+@pytest.mark.django_db
+def test_user_profile_serializer_returns_correct_guess_counts(user):
+    from api.serializers import UserProfileSerializer
+
+    record_correct_guess(user, GAME_GUESS)
+    record_correct_guess(user, GAME_GUESS)
+    record_correct_guess(user, GAME_TRANSFER)
+
+    data = UserProfileSerializer(UserAccount.objects.get(pk=user.pk)).data
+    assert (data['points_guess'], data['points_transfer']) == (2, 1)
+
+@pytest.mark.django_db
+def test_leaderboard_and_my_rank(user_auth_client, user):
+    others = [
+        UserAccount.objects.create_user(email=f"gracz{i}@example.com", login=f"gracz{i}", password="haslo123")
+        for i in range(3)
+    ]
+    UserScore.objects.create(user=others[0], points_guess=500, total_points=500)
+    UserScore.objects.create(user=others[1], points_guess=300, total_points=300)
+    UserScore.objects.create(user=others[2], points_transfer=300, total_points=300)
+    UserScore.objects.create(user=user, points_guess=100, total_points=100)
+
+    response = user_auth_client.get('/api/leaderboard/', {'limit': 3})
+    assert response.status_code == 200
+    assert [(row['login'], row['rank']) for row in response.data] == [("gracz0", 1), ("gracz1", 2), ("gracz2", 2)]
+
+    response = user_auth_client.get('/api/leaderboard/me/')
+    assert response.status_code == 200
+    assert response.data == {'login': user.login, 'total_points': 100, 'rank': 4}
+
+def generated_games(prefix):
+    # logi gier wygenerowanych użytkowników niezależne od id w bazie
+    return sorted(
+        (model.__name__, user_login[len(prefix):], guess_date, guess_number, guessed_correctly)
+        for model in (UserGuessLog, UserGuessLogTransfer)
+        for user_login, guess_date, guess_number, guessed_correctly in model.objects.filter(
+            user__login__startswith=prefix
+        ).values_list('user__login', 'guess_date', 'guess_number', 'guessed_correctly')
+    )
+
+@pytest.mark.django_db
+def test_generate_dataset_populates_tables():
+    out = StringIO()
+    call_command('generate_dataset', users=30, players=40, days=20, seed=3, batch_size=7, stdout=out)
+
+    assert Player.objects.count() == 40
+    assert PlayerFlat.objects.count() == 40
+    assert UserAccount.objects.filter(login__startswith='gen').count() == 30
+    assert TransferQuestionOfTheDay.objects.count() == 20
+    assert UserGuessLog.objects.exists() and UserGuessLogTransfer.objects.exists()
+    assert all(1 <= log.guess_number <= 5 for log in UserGuessLog.objects.all())
+    # przydział jest zapisany na każdy dzień gry w grę dzienną
+    assert set(UserPlayerAssignment.objects.values_list('user_id', 'assignment_date')) == set(
+        UserGuessLog.objects.values_list('user_id', 'guess_date')
+    )
+    assert UserScore.objects.filter(total_points__gt=0).exists()
+    assert "Gotowe" in out.getvalue()
+
+@pytest.mark.django_db
+def test_generate_dataset_is_deterministic():
+    call_command('generate_dataset', users=25, players=30, days=15, seed=5, prefix='a', batch_size=4, stdout=StringIO())
+    call_command('generate_dataset', users=25, players=30, days=15, seed=5, prefix='b', batch_size=10, stdout=StringIO())
+    call_command('generate_dataset', users=25, players=30, days=15, seed=6, prefix='c', stdout=StringIO())
+
+    assert generated_games('a') == generated_games('b')
+    assert generated_games('a') != generated_games('c')
+
+@pytest.mark.django_db
+def test_generate_dataset_rejects_existing_prefix(user):
+    with pytest.raises(CommandError):
+        call_command('generate_dataset', users=1, players=1, days=1, prefix=user.login[:3], stdout=StringIO())
+
+def write_csv(path, header, rows):
+    import csv
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+@pytest.fixture
+def catalog_csv(tmp_path):
+    players = write_csv(tmp_path / 'players.csv', ['name', 'country', 'league', 'club', 'position', 'age', 'shirt_number'], [
+        ['Robert Lewandowski', 'Polska', 'La Liga', 'FC Barcelona', 'Napastnik', 36, 9],
+        ['Wojciech Szczęsny', 'Polska', 'La Liga', 'FC Barcelona', 'Bramkarz', 34, 25],
+        ['Piotr Zieliński', 'Polska', 'Serie A', 'Inter', 'Pomocnik', 30, 7],
+    ])
+    transfers = write_csv(tmp_path / 'transfers.csv', ['player', 'from_club', 'to_club', 'transfer_amount', 'date'], [
+        ['Robert Lewandowski', 'Bayern Monachium', 'FC Barcelona', '45.00', '2022-07-19'],
+        ['piotr zielinski', 'SSC Napoli', 'Inter', '0.00', '2024-07-01'],
+    ])
+    return players, transfers
+
+@pytest.mark.django_db
+def test_import_catalog_creates_players_lookups_and_transfers(catalog_csv):
+    Country.objects.create(name='Polska')
+    out = StringIO()
+    call_command('import_catalog', *catalog_csv, chunk_size=2, stdout=out)
+
+    assert Country.objects.filter(name='Polska').count() == 1
+    assert set(Club.objects.values_list('name', flat=True)) == {'FC Barcelona', 'Inter', 'Bayern Monachium', 'SSC Napoli'}
+    lewandowski = Player.objects.get(name='Robert Lewandowski')
+    assert lewandowski.normalized_name == 'robert lewandowski'
+    assert PlayerFlat.objects.get(pk=lewandowski.pk).club_name == 'FC Barcelona'
+    assert PlayerFlat.objects.count() == 3
+    assert Transfer.objects.get(player__name='Piotr Zieliński').from_club.name == 'SSC Napoli'
+    assert "piłkarze: 3 wierszy" in out.getvalue()
+    assert "wierszy/s" in out.getvalue()
+
+@pytest.mark.django_db
+def test_import_catalog_upsert_updates_existing_rows(catalog_csv, tmp_path):
+    call_command('import_catalog', *catalog_csv, stdout=StringIO())
+    players = write_csv(tmp_path / 'update.csv', ['name', 'country', 'league', 'club', 'position', 'age', 'shirt_number'], [
+        ['Robert Lewandowski', 'Polska', 'La Liga', 'FC Barcelona', 'Napastnik', 37, 9],
+    ])
+    transfers = write_csv(tmp_path / 'update_transfers.csv', ['player', 'from_club', 'to_club', 'transfer_amount', 'date'], [
+        ['Robert Lewandowski', 'Bayern Monachium', 'FC Barcelona', '50.00', '2022-07-19'],
+    ])
+
+    # bez --upsert istniejące wiersze zostają bez zmian, a transfery się nie dublują
+    call_command('import_catalog', players, transfers, stdout=StringIO())
+    assert Player.objects.get(name='Robert Lewandowski').age.value == 36
+    assert Transfer.objects.get(player__name='Robert Lewandowski').transfer_amount == Decimal('45.00')
+
+    call_command('import_catalog', players, transfers, upsert=True, stdout=StringIO())
+    assert Player.objects.get(name='Robert Lewandowski').age.value == 37
+    assert PlayerFlat.objects.get(name='Robert Lewandowski').age_value == 37
+    assert Transfer.objects.get(player__name='Robert Lewandowski').transfer_amount == Decimal('50.00')
+    assert Player.objects.count() == 3
+
+@pytest.mark.django_db
+def test_import_catalog_reports_invalid_rows(catalog_csv, tmp_path):
+    missing_column = write_csv(tmp_path / 'bad.csv', ['name', 'country'], [['Jan Kowalski', 'Polska']])
+    with pytest.raises(CommandError, match="Brak kolumn"):
+        call_command('import_catalog', missing_column, stdout=StringIO())
+
+    call_command('import_catalog', catalog_csv[0], stdout=StringIO())
+    unknown_player = write_csv(tmp_path / 'bad_transfers.csv', ['player', 'from_club', 'to_club', 'transfer_amount', 'date'], [
+        ['Jan Kowalski', 'Inter', 'FC Barcelona', '1.00', '2024-01-01'],
+    ])
+    with pytest.raises(CommandError, match="Linia 2: nie znaleziono piłkarza"):
+        call_command('import_catalog', catalog_csv[0], unknown_player, stdout=StringIO())
+
+# scraper Prometheusa: osobny klient (bez JWT) z tokenem metryk
+def scrape_metrics(settings):
+    settings.METRICS_TOKEN = 'sekret'
+    return APIClient().get('/api/metrics', HTTP_AUTHORIZATION='Bearer sekret')
+
+def metric_value(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+@pytest.mark.django_db
+def test_metrics_record_route_latency_queries_and_size(auth_client, target_player, settings):
+    assert auth_client.get('/api/players/').status_code == 200
+    auth_client.get('/api/players/')
+    auth_client.get(f'/api/players/{target_player.id}/')
+
+    response = scrape_metrics(settings)
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode()
+    labels = 'route="api/players/",method="GET",status="200"'
+    assert metric_value(text, f'http_request_duration_seconds_count{{{labels}}}') == 2
+    assert metric_value(text, f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}') == 2
+    assert metric_value(text, f'http_request_db_queries_sum{{{labels}}}') >= 2
+    assert metric_value(text, f'http_response_size_bytes_sum{{{labels}}}') > 0
+    # trasa to wzorzec z urls.py, a nie konkretne id
+    assert 'route="api/players/<int:id>/"' in text
+    assert '# TYPE http_request_duration_seconds histogram' in text
+
+@pytest.mark.django_db
+def test_metrics_are_summed_across_processes(client, metrics_dir):
+    import json
+    import multiprocessing
+    from api.services.metrics_service import TOTALS_FILE, MetricsRegistry, get_metrics_registry
+
+    registry = get_metrics_registry()
+    registry.observe_request('api/example/', 'GET', 200, 0.2, 3, 0.01, 10)
+
+    def worker():
+        # proces potomny dziedziczy rejestr po fork(), ale liczy od zera
+        child = get_metrics_registry()
+        child.observe_request('api/example/', 'GET', 200, 0.3, 1, 0.01, 10)
+        child.flush(force=True)
+
+    process = multiprocessing.get_context('fork').Process(target=worker)
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert len(list(metrics_dir.glob('*.json'))) == 2
+
+    labels = 'route="api/example/",method="GET",status="200"'
+    for _ in range(2):
+        # plik zakończonego procesu jest scalany do sumy i usuwany - bez liczenia go dwa razy
+        text = registry.render()
+        assert metric_value(text, f'http_request_duration_seconds_count{{{labels}}}') == 2
+        assert metric_value(text, f'http_request_db_queries_sum{{{labels}}}') == 4
+        assert metric_value(text, f'http_request_duration_seconds_bucket{{{labels},le="0.25"}}') == 1
+        assert sorted(path.name for path in metrics_dir.glob('*.json')) == sorted([registry.path.name, TOTALS_FILE])
+
+    # proces o tym samym pid (pid użyty ponownie) pisze do własnego pliku, nie nadpisuje cudzego
+    recycled = MetricsRegistry(metrics_dir)
+    recycled.observe_request('api/example/', 'GET', 200, 0.1, 1, 0.01, 10)
+    assert recycled.pid == registry.pid and recycled.path != registry.path
+    assert metric_value(registry.render(), f'http_request_duration_seconds_count{{{labels}}}') == 3
+
+    # przerwane scalanie (suma zapisana, plik nieusunięty) nie dolicza pliku drugi raz
+    totals = json.loads((metrics_dir / TOTALS_FILE).read_text())
+    totals['merged'].append(recycled.path.name)
+    (metrics_dir / TOTALS_FILE).write_text(json.dumps(totals))
+    assert metric_value(registry.render(), f'http_request_duration_seconds_count{{{labels}}}') == 2
+
+@pytest.mark.django_db
+def test_metrics_require_token(client, settings):
+    # bez skonfigurowanego tokenu metryki nie są dostępne dla nikogo
+    assert settings.METRICS_TOKEN is None
+    assert client.get('/api/metrics').status_code == 403
+    assert client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer None').status_code == 403
+
+    settings.METRICS_TOKEN = 'sekret'
+    assert client.get('/api/metrics').status_code == 403
+    assert client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer sekret').status_code == 200
+
+def test_sql_fingerprint_normalizes_literals_and_lists():
+    from api.services.slow_query_service import fingerprint
+
+    first = fingerprint('SELECT "api_player"."id" FROM "api_player" WHERE "api_player"."id" IN (%s, %s, %s) AND name = \'Jan\'')
+    second = fingerprint('SELECT  "api_player"."id" FROM "api_player"\nWHERE "api_player"."id" IN (%s) AND name = \'Piotr\'')
+    assert first == second
+    assert first[1] == 'SELECT "api_player"."id" FROM "api_player" WHERE "api_player"."id" IN (?+) AND name = ?'
+    assert fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)')[1] == 'INSERT INTO t (a, b) VALUES (?+), ...'
+
+# middleware jest ładowany przy pierwszym żądaniu klienta, więc ustawienia muszą być przed logowaniem
+@pytest.fixture
+def slow_query_capture(settings):
+    settings.SLOW_QUERY_ENABLED = True
+    # każde zapytanie jest "wolne", żeby w teście powstały plany
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+
+@pytest.mark.django_db
+def test_slow_queries_report_callers_and_explain(slow_query_capture, settings, user, user_auth_client, assign_target_player, target_player):
+    import json
+
+    assert user_auth_client.post('/api/guess/', {'player_name': 'Nieznany'}, format='json').status_code == 404
+    assert user_auth_client.post('/api/guess/', {'player_name': target_player.name}, format='json').status_code == 200
+    assert user_auth_client.get('/api/profile/').status_code == 200
+
+    assert user_auth_client.get('/api/admin/slow-queries/').status_code == 403
+    user.is_superuser = True
+    user.save(update_fields=['is_superuser'])
+    response = user_auth_client.get('/api/admin/slow-queries/', {'limit': 200})
+    assert response.status_code == 200
+
+    callers = {caller['name'] for entry in response.data for caller in entry['callers']}
+    assert 'daily_game_service.handle_player_guess' in callers
+    assert 'leaderboard_service.get_user_score' in callers
+    entry = response.data[0]
+    assert {'fingerprint', 'sql', 'count', 'total_ms', 'avg_ms', 'p95_ms', 'max_ms', 'plan'} <= set(entry)
+    assert any(entry['plan'] for entry in response.data if entry['sql'].startswith('SELECT'))
+
+    log = settings.SLOW_QUERY_DIR / 'slow_queries.log'
+    events = [json.loads(line) for line in log.read_text(encoding='utf-8').splitlines()]
+    assert events and all({'fingerprint', 'caller', 'duration_ms', 'sql'} <= set(event) for event in events)
+
+# AsyncClient w Django 4.2 gubi nagłówki z konstruktora - podajemy je przy każdym żądaniu
+@pytest.fixture
+def async_client():
+    from django.test import AsyncClient
+    return AsyncClient()
+
+def run_async(awaitable):
+    from asgiref.sync import async_to_sync
+
+    async def wait():
+        return await awaitable
+    return async_to_sync(wait)()
+
+# Test: pod ASGI endpoint gry odpowiada tak jak pod WSGI, a middleware metryk działa w łańcuchu async
+@pytest.mark.django_db
+def test_game_status_under_asgi(user_auth_client, async_client, user, assign_target_player, settings):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+    response = run_async(async_client.get('/api/game-status/', headers=headers))
+    assert response.status_code == 200
+    assert response.json() == user_auth_client.get('/api/game-status/').json()
+
+    metrics = scrape_metrics(settings).content.decode()
+    labels = 'route="api/game-status/",method="GET",status="200"'
+    assert metric_value(metrics, f'http_request_duration_seconds_count{{{labels}}}') == 2
+
+@pytest.mark.django_db
+def test_jwt_auth_serves_user_from_cache(user_auth_client, user):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    assert user_auth_client.get('/api/settings').status_code == 200
+    with CaptureQueriesContext(connection) as queries:
+        response = user_auth_client.get('/api/settings')
+    assert response.data['user']['login'] == user.login
+    assert not [query for query in queries if 'api_useraccount' in query['sql']]
+
+    # zapis konta unieważnia wpis - uprawnienia admina widać od następnego żądania
+    assert user_auth_client.get('/api/admin/slow-queries/').status_code == 403
+    user.is_superuser = True
+    user.save()
+    assert user_auth_client.get('/api/admin/slow-queries/').status_code == 200
+
+    # profil doczytuje brakujące pola jednym zapytaniem
+    with CaptureQueriesContext(connection) as queries:
+        assert user_auth_client.get('/api/profile/').status_code == 200
+    assert len([query for query in queries if 'api_useraccount' in query['sql']]) == 1
+
+    user.delete()
+    assert user_auth_client.get('/api/settings').status_code == 401
+
+@pytest.mark.django_db
+def test_user_cache_evicts_least_recently_used_and_expired(user, auth_client, django_assert_num_queries):
+    from api.services.user_cache_service import UserCache
+
+    admin = UserAccount.objects.get(login='testuser')
+    other = UserAccount.objects.create_user(email='other@example.com', login='other', password='x')
+    users = UserCache(max_size=2, ttl=60)
+    with django_assert_num_queries(3):
+        users.get(user.pk)
+        users.get(admin.pk)
+        users.get(user.pk)
+        # 'admin' był najdawniej używany
+        users.get(other.pk)
+    with django_assert_num_queries(0):
+        assert users.get(user.pk).login == user.login
+    with django_assert_num_queries(1):
+        assert users.get(admin.pk).is_superuser is True
+    with django_assert_num_queries(2):
+        expired = UserCache(max_size=2, ttl=0)
+        expired.get(user.pk)
+        expired.get(user.pk)
+
+@pytest.mark.django_db
+def test_user_cache_sees_changes_made_by_other_processes(user, django_assert_num_queries):
+    from api.services.user_cache_service import UserCache
+
+    # osobna instancja = pamięć innego workera; sygnał unieważnia tylko wpisy tego procesu
+    other_worker = UserCache(max_size=10, ttl=60)
+    assert other_worker.get(user.pk).is_staff is False
+    with django_assert_num_queries(0):
+        other_worker.get(user.pk)
+
+    user.is_staff = True
+    user.save()
+    with django_assert_num_queries(1):
+        assert other_worker.get(user.pk).is_staff is True
+    with django_assert_num_queries(0):
+        assert other_worker.get(user.pk).is_staff is True
+
+    user.delete()
+    assert other_worker.get(user.pk) is None
+
+
+@pytest.mark.django_db
+def test_user_account_defers_profile_picture_bytes(auth_client):
+    import re
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework import serializers
+    from rest_framework.renderers import JSONRenderer
+
+    # konto ze starym obrazkiem w przestarzałej kolumnie BinaryField
+    legacy_picture = os.urandom(256 * 1024)
+    user = UserAccount.objects.create_user(
+        email="legacy@example.com", login="legacy", password="legacypass", profile_picture=legacy_picture
+    )
+    picture_column = re.compile(r'"profile_picture"(?!_)')
+
+    # przed: pełny wiersz i serializer z fields='__all__' (bajty jako base64 w odpowiedzi)
+    class AllFieldsSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = UserAccount
+            fields = '__all__'
+
+    full_user = UserAccount.objects.with_profile_picture().get(pk=user.pk)
+    assert bytes(full_user.profile_picture) == legacy_picture
+    bytes_before = len(JSONRenderer().render(AllFieldsSerializer(full_user).data))
+
+    # po: szczegóły użytkownika w panelu admina
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(f'/api/users/{user.pk}/')
+    assert response.status_code == 200
+    bytes_after = len(response.content)
+    assert 'profile_picture' not in response.data
+    assert 'password' not in response.data
+    assert not any(picture_column.search(query['sql']) for query in queries.captured_queries)
+
+    assert bytes_before > len(legacy_picture)
+    assert bytes_after < 2048
+
+    # logowanie (EmailBackend), lista użytkowników i odwołania przez klucz obcy też pomijają kolumnę
+    with CaptureQueriesContext(connection) as queries:
+        assert APIClient().post('/api/login/', {"email": user.email, "password": "legacypass"}, format='json').status_code == 200
+        assert auth_client.get('/api/users/').status_code == 200
+        log = UserGuessLog.objects.create(user=user, guess_date=date.today())
+        assert UserGuessLog.objects.get(pk=log.pk).user.login == "legacy"
+    assert not any(picture_column.search(query['sql']) for query in queries.captured_queries)
+
+    # zapis odroczonego obiektu nie nadpisuje kolumny
+    lean_user = UserAccount.objects.get(pk=user.pk)
+    lean_user.enabled = True
+    lean_user.save()
+    assert bytes(UserAccount.objects.with_profile_picture().get(pk=user.pk).profile_picture) == legacy_picture
+
+
+@pytest.mark.django_db
+def test_get_all_users_paginates_and_searches_by_prefix(auth_client, client):
+    for login in ("alicja", "Alfred", "bartek", "malina"):
+        UserAccount.objects.create_user(email=f"{login.lower()}@example.com", login=login, password="haslo123")
+
+    response = auth_client.get('/api/users/', {'page_size': 2})
+    assert response.status_code == 200
+    assert response.data['count'] == 5
+    assert response.data['count_is_approximate'] is False
+    assert [user['login'] for user in response.data['results']] == ["Alfred", "alicja"]
+    assert response.data['previous'] is None
+
+    # kolejne strony kursorem (login ostatniego wiersza), bez OFFSET
+    logins = []
+    url = response.data['next']
+    while url:
+        page = auth_client.get(url).data
+        assert page['count'] == 5
+        logins += [user['login'] for user in page['results']]
+        url = page['next']
+    assert logins == ["bartek", "malina", "testuser"]
+    assert [user['login'] for user in auth_client.get(page['previous']).data['results']] == ["bartek", "malina"]
+
+    # prefiks loginu lub e-maila, bez rozróżniania wielkości liter
+    response = auth_client.get('/api/users/', {'search': 'AL'})
+    assert [user['login'] for user in response.data['results']] == ["Alfred", "alicja"]
+    response = auth_client.get('/api/users/', {'search': 'mal'})
+    assert [user['login'] for user in response.data['results']] == ["malina"]
+    response = auth_client.get('/api/users/', {'search': 'lina'})
+    assert response.data['results'] == []
+
+    assert auth_client.get('/api/users/', {'cursor': 'zepsuty'}).status_code == 400
+
+    # zwykły użytkownik nie widzi listy
+    UserAccount.objects.create_user(email="zwykly@example.com", login="zwykly", password="haslo123")
+    token = client.post('/api/login/', {"email": "zwykly@example.com", "password": "haslo123"}, format='json').data['access']
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+    assert client.get('/api/users/').status_code == 403
+
+
+@pytest.mark.django_db
+def test_approximate_count_paginator_skips_count_for_large_tables():
+    from django.core.paginator import EmptyPage
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from api.services.user_service import ApproximateCountPaginator
+
+    for i in range(3):
+        UserAccount.objects.create_user(email=f"approx{i}@example.com", login=f"approx{i}", password="haslo123")
+    users = UserAccount.objects.order_by('login')
+
+    # mały wynik (albo brak szacunku, jak na SQLite): dokładny COUNT(*)
+    paginator = ApproximateCountPaginator(users, 2)
+    assert paginator.count == 3
+    assert paginator.count_is_approximate is False
+
+    # duży wynik: liczba ze statystyk PostgreSQL, bez COUNT(*); ostatnia strona nie jest obcinana
+    with patch('api.services.user_service.estimate_row_count', return_value=1_000_000):
+        paginator = ApproximateCountPaginator(users, 2)
+        with CaptureQueriesContext(connection) as queries:
+            assert paginator.count == 1_000_000
+            page = paginator.page(2)
+            assert [user.login for user in page] == ["approx2"]
+    assert paginator.count_is_approximate is True
+    assert paginator.num_pages == 500_000
+    assert not any('COUNT(' in query['sql'].upper() for query in queries.captured_queries)
+
+    # zaniżony szacunek: strony za szacowanym końcem nadal się otwierają, pusta strona to 404
+    with patch('api.services.user_service.estimate_row_count', return_value=1):
+        paginator = ApproximateCountPaginator(users, 1)
+        paginator.exact_count_limit = 1
+        assert paginator.num_pages == 1
+        assert [user.login for user in paginator.page(3)] == ["approx2"]
+    with patch('api.services.user_service.estimate_row_count', return_value=1_000_000):
+        paginator = ApproximateCountPaginator(users, 1)
+        with pytest.raises(EmptyPage):
+            paginator.page(4)
+        with pytest.raises(EmptyPage):
+            paginator.page(0)
+
+
+@pytest.mark.django_db
+def test_export_streams_users_and_guesses(auth_client, user, settings):
+    import csv
+    import io
+    import json
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    settings.EXPORT_CHUNK_SIZE = 2
+    for i in range(3):
+        UserAccount.objects.create_user(email=f"export{i}@example.com", login=f"export{i}", password="haslo123")
+    UserGuessLog.objects.create(user=user, guess_date=date(2024, 5, 1), guess_number=3, guessed_correctly=True)
+
+    response = auth_client.get('/api/admin/export/users/csv/')
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'].startswith('text/csv')
+    assert response['Content-Disposition'] == 'attachment; filename="users.csv"'
+
+    # nagłówek wychodzi, zanim eksport wykona jakiekolwiek zapytanie
+    content = iter(response.streaming_content)
+    with CaptureQueriesContext(connection) as queries:
+        header = next(content)
+    assert header.decode() == "id,login,email,enabled,is_staff,is_superuser,created_at,last_login\r\n"
+    assert len(queries.captured_queries) == 0
+
+    # wiersze przychodzą porcjami po EXPORT_CHUNK_SIZE
+    chunks = list(content)
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+    expected = UserAccount.objects.count()
+    assert len(rows) == expected
+    assert len(chunks) == (expected + 1) // 2
+    assert [row[1] for row in rows[-3:]] == ["export0", "export1", "export2"]
+    assert all('haslo' not in row and 'pbkdf2' not in ','.join(row) for row in rows)
+
+    response = auth_client.get('/api/admin/export/guesses/ndjson/')
+    assert response['Content-Type'].startswith('application/x-ndjson')
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{
+        "id": UserGuessLog.objects.get().pk, "user_id": user.pk, "guess_date": "2024-05-01",
+        "guess_number": 3, "guessed_correctly": True,
+    }]
+    assert b''.join(auth_client.get('/api/admin/export/transfer-guesses/ndjson/').streaming_content) == b''
+
+    assert auth_client.get('/api/admin/export/passwords/csv/').status_code == 404
+    assert auth_client.get('/api/admin/export/users/xml/').status_code == 404
+
+
+
+@pytest.mark.django_db
+def test_export_streams_chunks_under_asgi(auth_client, async_client, settings):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    settings.EXPORT_CHUNK_SIZE = 2
+    for i in range(3):
+        UserAccount.objects.create_user(email=f"export{i}@example.com", login=f"export{i}", password="haslo123")
+    admin = UserAccount.objects.get(email="testuser@example.com")
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(admin)}'}
+
+    async def download():
+        response = await async_client.get('/api/admin/export/users/csv/', headers=headers)
+        # iterator async: serwer ASGI wysyła porcje na bieżąco zamiast czytać cały eksport do listy
+        assert response.is_async
+        return response, [chunk async for chunk in response.streaming_content]
+
+    response, chunks = run_async(download())
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == 'attachment; filename="users.csv"'
+    # nagłówek + porcje po EXPORT_CHUNK_SIZE wierszy, tak samo jak pod WSGI
+    assert len(chunks) == 1 + (UserAccount.objects.count() + 1) // 2
+    assert b''.join(chunks) == b''.join(auth_client.get('/api/admin/export/users/csv/').streaming_content)
+
+@pytest.mark.django_db
+def test_schedule_daily_puzzles_precreates_questions_and_warms_cache(auth_client, user, transfer, settings):
+    from datetime import timedelta
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from api.services.transfer_game_service import start_game_for_user
+    from api.tasks import schedule_daily_puzzles
+
+    settings.DAILY_PUZZLE_DAYS_AHEAD = 3
+    today = date.today()
+    TransferQuestionOfTheDay.objects.create(transfer=transfer, question_date=today + timedelta(days=1))
+
+    status = schedule_daily_puzzles()
+    assert status['created'] == [(today + timedelta(days=offset)).isoformat() for offset in (0, 2, 3)]
+    assert status['warmed'] == 4
+    assert set(TransferQuestionOfTheDay.objects.values_list('question_date', flat=True)) == {
+        today + timedelta(days=offset) for offset in range(4)
+    }
+    # kolejny przebieg niczego nie zmienia
+    assert schedule_daily_puzzles()['created'] == []
+
+    # start gry po "północy": pytanie i transfer z cache, zapytanie tylko o wpis gracza
+    with CaptureQueriesContext(connection) as queries:
+        state = start_game_for_user(user)
+    assert state['transfer_details']['to_club'] == transfer.to_club.name
+    assert not any('transfer' in query['sql'] and 'userguesslogtransfer' not in query['sql'] for query in queries.captured_queries)
+
+    response = auth_client.get('/api/admin/daily-schedule/')
+    assert response.status_code == 200
+    assert response.data['missing'] == 0
+    assert response.data['last_run']['days_ahead'] == 3
+    assert [day['date'] for day in response.data['days']] == [(today + timedelta(days=offset)).isoformat() for offset in range(4)]
+    assert all(day['cached'] and day['transfer']['id'] == transfer.pk for day in response.data['days'])
+
+    # zmiana pytania w panelu admina usuwa wpis z cache
+    TransferQuestionOfTheDay.objects.get(question_date=today + timedelta(days=2)).delete()
+    response = auth_client.get('/api/admin/daily-schedule/', {'days': 2})
+    assert response.data['missing'] == 1
+    assert [day['cached'] for day in response.data['days']] == [True, True, False]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_start_transfer_game_concurrent_first_requests_share_question(user, transfer):
+    from api.services.transfer_game_service import start_game_for_user
+
+    results = hammer(lambda: start_game_for_user(user)["transfer_details"], threads=8)
+
+    assert len(results) == 8
+    assert TransferQuestionOfTheDay.objects.get(question_date=date.today()).transfer == transfer
+
+
+@pytest.mark.django_db
+def test_disambiguated_player_can_be_saved_and_guessed_by_alias(player_data):
+    from importlib import import_module
+    from django.apps import apps
+
+    first = Player.objects.create(name="Jan Kowalski", **player_data)
+    # drugi piłkarz o tej samej nazwie - stan po migracji 0005 (klucz z sufiksem id)
+    second = Player.objects.create(name="Jan Kowalski II", **{**player_data, 'club': Club.objects.create(name="Legia")})
+    Player.objects.filter(pk=second.pk).update(name="Jan Kowalski", normalized_name=f"jan kowalski #{second.pk}")
+
+    import_module('api.migrations.0014_disambiguated_player_aliases').create_aliases(apps, None)
+    assert resolve_player_id("Jan Kowalski") == first.pk
+    assert resolve_player_id("jan kowalski (legia)") == second.pk
+
+    # zwykły zapis (np. w panelu admina) zachowuje klucz z sufiksem
+    second = Player.objects.get(pk=second.pk)
+    second.age = Age.objects.create(value=30)
+    second.save()
+    assert Player.objects.get(pk=second.pk).normalized_name == f"jan kowalski #{second.pk}"
+
+    # zmiana nazwy daje zwykły klucz
+    second.name = "Janusz Kowalski"
+    second.save(update_fields=['name'])
+    assert Player.objects.get(pk=second.pk).normalized_name == "janusz kowalski"
+
+
+@pytest.mark.django_db
+def test_import_catalog_rejects_different_players_with_same_name(catalog_csv, tmp_path):
+    out = StringIO()
+    call_command('import_catalog', catalog_csv[0], stdout=StringIO())
+    call_command('import_catalog', catalog_csv[0], stdout=out)
+    assert "już istniejące (pominięte): 3" in out.getvalue()
+
+    players = write_csv(tmp_path / 'same_name.csv', ['name', 'country', 'league', 'club', 'position', 'age', 'shirt_number'], [
+        ['Jan Nowak', 'Polska', 'Ekstraklasa', 'Legia', 'Obrońca', 25, 4],
+        ['Jan Nowak', 'Polska', 'Ekstraklasa', 'Legia', 'Obrońca', 25, 4],
+        ['Jan Nowák', 'Polska', 'Ekstraklasa', 'Lech', 'Napastnik', 31, 9],
+    ])
+    with pytest.raises(CommandError, match="Linia 4: piłkarz 'Jan Nowák' ma tę samą nazwę co w linii 2"):
+        call_command('import_catalog', players, chunk_size=1, stdout=StringIO())
+    assert Player.objects.filter(normalized_name='jan nowak').count() == 1
+
+
+@pytest.mark.django_db
+def test_admin_rejects_player_name_folding_to_existing_one(client, player_data):
+    client.force_login(UserAccount.objects.create_superuser("admin@a.pl", "admin", "pass"))
+    existing = Player.objects.create(name="Jan Nowak", **player_data)
+    form = {field: obj.pk for field, obj in player_data.items()}
+
+    response = client.post('/admin/api/player/add/', {**form, 'name': "Jan Nowák"})
+    assert response.status_code == 200
+    assert "Piłkarz o tej nazwie już istnieje" in response.context['adminform'].form.errors['name'][0]
+    assert Player.objects.count() == 1
+
+    # zmiana nazwy innego piłkarza na zajętą też kończy się błędem formularza
+    other = Player.objects.create(name="Adam Nowak", **player_data)
+    response = client.post(f'/admin/api/player/{other.pk}/change/', {**form, 'name': "JAN NOWAK"})
+    assert response.status_code == 200
+    assert 'name' in response.context['adminform'].form.errors
+    assert Player.objects.get(pk=other.pk).name == "Adam Nowak"
+
+    # piłkarz z kluczem " #id" (migracja 0005) zapisuje się bez zmiany nazwy
+    Player.objects.filter(pk=other.pk).update(name="Jan Nowak", normalized_name=f"jan nowak #{other.pk}")
+    response = client.post(f'/admin/api/player/{other.pk}/change/', {**form, 'name': "Jan Nowak"})
+    assert response.status_code == 302
+    assert Player.objects.get(pk=other.pk).normalized_name == f"jan nowak #{other.pk}"
+
+    PlayerAlias.objects.create(player=existing, alias="Nowaczek")
+    response = client.post('/admin/api/playeralias/add/', {'player': other.pk, 'alias': "nowaczek"})
+    assert response.status_code == 200
+    assert 'alias' in response.context['adminform'].form.errors
+    assert PlayerAlias.objects.count() == 1
@@ -0,0 +1,295 @@
+import json
+import random
+from importlib import import_module
+from datetime import date, timedelta
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import (
+    Age, Club, Country, League, Player, PlayerFlat, Position, ShirtNumber, Transfer,
+    TransferQuestionOfTheDay, UserAccount, UserGuessLog, UserGuessLogTransfer,
+    UserPlayerAssignment, UserScore,
+)
+from api.services.catalog_service import bump_catalog_version
+from api.services.daily_game_service import get_daily_game_status, get_today_player_id
+from api.services.guess_log_service import get_guess_state
+from api.services.leaderboard_service import get_top_scores, get_user_rank, rebuild_user_scores
+from api.services.player_flat_service import build_flat, source_rows
+from api.services.player_resolver_service import resolve_player_id
+from api.services.player_service import fetch_all_players, fetch_player_by_id
+from api.services.transfer_game_service import start_game_for_user
+from api.services.user_service import estimate_row_count, paginate_users_service
+
+# indeksy tworzone w migracji RunPython (testy działają bez migracji)
+user_search_indexes = import_module('api.migrations.0013_useraccount_search_indexes')
+
+# Testy regresji planów zapytań: baza z objętością zbliżoną do produkcyjnej,
+# a dla każdej funkcji serwisu EXPLAIN każdego SELECT-a ma czytać gorące tabele
+# po indeksie, nie pełnym skanem. Tylko PostgreSQL (SQLite ma inny planer).
+# Pełne przejścia z założenia (katalog w pamięci, facety, indeks nazw) nie są tu sprawdzane.
+
+USERS = 2000
+DAYS = 30
+PLAYERS = 3000
+LOGIN_PREFIX = 'plan_'
+
+
+def seed():
+    rng = random.Random(15)
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in range(DAYS)]
+
+    countries = Country.objects.bulk_create([Country(name=f"Plan Kraj {i}") for i in range(40)])
+    leagues = League.objects.bulk_create([League(name=f"Plan Liga {i}") for i in range(20)])
+    clubs = Club.objects.bulk_create([Club(name=f"Plan Klub {i}") for i in range(200)])
+    positions = Position.objects.bulk_create([Position(name=f"Plan Pozycja {i}") for i in range(4)])
+    ages = Age.objects.bulk_create([Age(value=value) for value in range(17, 41)])
+    numbers = ShirtNumber.objects.bulk_create([ShirtNumber(number=number) for number in range(1, 100)])
+
+    # bulk_create pomija save(), więc normalized_name ustawiamy sami
+    players = Player.objects.bulk_create([
+        Player(
+            name=f"Plan Player {i:05d}", normalized_name=f"plan player {i:05d}",
+            country=rng.choice(countries), league=rng.choice(leagues), club=rng.choice(clubs),
+            position=rng.choice(positions), age=rng.choice(ages), shirt_number=rng.choice(numbers),
+        )
+        for i in range(PLAYERS)
+    ], batch_size=5000)
+    player_ids = [player.pk for player in players]
+    PlayerFlat.objects.bulk_create(
+        [build_flat(row) for row in source_rows(Player.objects.filter(pk__in=player_ids))], batch_size=5000
+    )
+
+    transfers = Transfer.objects.bulk_create([
+        Transfer(
+            player_id=player_id, from_club=rng.choice(clubs), to_club=rng.choice(clubs),
+            transfer_amount=Decimal(rng.randint(1, 200)), date=today,
+        )
+        for player_id in player_ids
+    ], batch_size=5000)
+    # pytania dnia z około trzech lat gry
+    TransferQuestionOfTheDay.objects.bulk_create([
+        TransferQuestionOfTheDay(transfer=rng.choice(transfers), question_date=today - timedelta(days=offset))
+        for offset in range(3 * 365)
+    ])
+
+    users = UserAccount.objects.bulk_create([
+        UserAccount(email=f"{LOGIN_PREFIX}{i}@example.com", login=f"{LOGIN_PREFIX}{i}", password='!')
+        for i in range(USERS)
+    ], batch_size=5000)
+
+    # ~25% dni zakończonych trafieniem, reszta to przegrane lub przerwane gry
+    for model in (UserGuessLog, UserGuessLogTransfer):
+        model.objects.bulk_create([
+            model(
+                user=user, guess_date=day, guess_number=rng.randint(1, 5),
+                guessed_correctly=rng.random() < 0.25,
+            )
+            for user in users for day in days
+        ], batch_size=5000)
+    UserPlayerAssignment.objects.bulk_create([
+        UserPlayerAssignment(user=user, assignment_date=day, player_id=rng.choice(player_ids))
+        for user in users for day in days
+    ], batch_size=5000)
+
+    UserScore.objects.bulk_create([
+        UserScore(user=user, points_guess=points, total_points=points)
+        for user, points in ((user, rng.randint(0, 300) * 100) for user in users)
+    ], batch_size=5000)
+
+    # do posprzątania: kaskady usuwają logi, przydziały, punkty, piłkarzy, transfery i pytania dnia
+    return [(UserAccount, users), *((model, objs) for model, objs in (
+        (Country, countries), (League, leagues), (Club, clubs), (Position, positions),
+        (Age, ages), (ShirtNumber, numbers),
+    ))]
+
+
+def cleanup(seeded):
+    for model, objs in seeded:
+        model.objects.filter(pk__in=[obj.pk for obj in objs]).delete()
+
+
+@pytest.fixture(scope='module')
+def seeded_db(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        if connection.vendor != 'postgresql':
+            pytest.skip("plany zapytań sprawdzamy tylko na PostgreSQL")
+        seeded = seed()
+        # katalog piłkarzy zbuforowany przez wcześniejsze testy nie zna nowych piłkarzy
+        bump_catalog_version()
+        with connection.schema_editor(atomic=False) as editor:
+            user_search_indexes.create_search_indexes(None, editor)
+        # aktualne statystyki i mapa widoczności (skany samego indeksu), jak po autovacuum
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM ANALYZE")
+        try:
+            yield
+        finally:
+            cleanup(seeded)
+            with connection.schema_editor(atomic=False) as editor:
+                user_search_indexes.drop_search_indexes(None, editor)
+
+
+@pytest.fixture
+def plan_user(seeded_db, db):
+    return UserAccount.objects.filter(login__startswith=LOGIN_PREFIX).order_by('id')[USERS // 2]
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain_selects(queries):
+    # EXPLAIN dla każdego SELECT-a wykonanego przez funkcję; zwraca listę węzłów planu
+    nodes = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes.extend(plan_nodes(plan[0]['Plan']))
+    return nodes
+
+
+def assert_index_scans(call, tables, indexes=()):
+    # każda z gorących tabel czytana indeksem; opcjonalnie konkretnym (nowym) indeksem
+    with CaptureQueriesContext(connection) as ctx:
+        call()
+    nodes = explain_selects(ctx.captured_queries)
+    scans = [node for node in nodes if node.get('Relation Name') in tables]
+    plan = [(node['Node Type'], node.get('Relation Name'), node.get('Index Name')) for node in nodes]
+
+    assert {node['Relation Name'] for node in scans} == set(tables), plan
+    for node in scans:
+        assert 'Index' in node['Node Type'], plan
+    used = {node.get('Index Name') for node in nodes}
+    for index in indexes:
+        assert index in used, plan
+
+
+def players_request(**params):
+    return Request(APIRequestFactory().get('/api/players/', params))
+
+
+def test_today_assignment_uses_day_user_index(plan_user, settings):
+    settings.DAILY_TARGET_PERSIST_ASSIGNMENTS = True
+    assert_index_scans(
+        lambda: get_today_player_id(plan_user),
+        ['api_userplayerassignment'],
+        ['api_assignment_day_user_idx'],
+    )
+
+
+def test_daily_game_status_uses_indexes(plan_user, settings):
+    settings.DAILY_TARGET_PERSIST_ASSIGNMENTS = True
+    assert_index_scans(
+        lambda: get_daily_game_status(plan_user),
+        ['api_userguesslog', 'api_userplayerassignment'],
+    )
+
+
+@pytest.mark.parametrize('model', [UserGuessLog, UserGuessLogTransfer])
+def test_guess_state_uses_unique_user_day_index(plan_user, model):
+    assert_index_scans(lambda: get_guess_state(model, plan_user, date.today()), [model._meta.db_table])
+
+
+def test_start_transfer_game_uses_indexes(plan_user):
+    assert_index_scans(
+        lambda: start_game_for_user(plan_user),
+        ['api_transferquestionoftheday', 'api_userguesslogtransfer', 'api_transfer'],
+    )
+
+
+def test_rebuild_user_scores_reads_partial_correct_guess_indexes(seeded_db, db):
+    assert_index_scans(
+        rebuild_user_scores,
+        ['api_userguesslog', 'api_userguesslogtransfer'],
+        ['api_guesslog_correct_idx', 'api_guesslogtr_correct_idx'],
+    )
+
+
+def test_user_rank_uses_ranking_index(seeded_db, db):
+    top_user = UserAccount.objects.filter(login__startswith=LOGIN_PREFIX).order_by('-score__total_points').first()
+    assert_index_scans(lambda: get_user_rank(top_user), ['api_userscore'], ['api_userscore_ranking_idx'])
+
+
+def test_top_scores_use_ranking_index(seeded_db, db):
+    assert_index_scans(
+        lambda: get_top_scores(10),
+        ['api_userscore', 'api_useraccount'],
+        ['api_userscore_ranking_idx'],
+    )
+
+
+def test_resolve_player_uses_normalized_name_index(seeded_db, db):
+    assert_index_scans(lambda: resolve_player_id('Plan Player 01234'), ['api_player'])
+
+
+def test_fetch_player_uses_primary_key(seeded_db, db):
+    player_id = PlayerFlat.objects.filter(name='Plan Player 01234').values_list('pk', flat=True).get()
+    assert_index_scans(lambda: fetch_player_by_id(player_id), ['api_playerflat'])
+
+
+@pytest.mark.parametrize('sort, index', [
+    ('name', 'api_playerflat_name_idx'),
+    ('-name', 'api_playerflat_name_idx'),
+    ('age__value', 'api_playerflat_age_idx'),
+])
+def test_player_pages_use_sort_index(seeded_db, db, sort, index):
+    first = fetch_all_players(players_request(sort=sort))
+    cursor = parse_qs(urlparse(first.data['next']).query)['cursor'][0]
+
+    assert_index_scans(lambda: fetch_all_players(players_request(sort=sort)), ['api_playerflat'], [index])
+    assert_index_scans(
+        lambda: fetch_all_players(players_request(sort=sort, cursor=cursor)), ['api_playerflat'], [index]
+    )
+
+
+@pytest.mark.parametrize('search', ['PLAN_123', 'plan_123@'])
+def test_user_search_uses_prefix_indexes(seeded_db, db, search):
+    request = Request(APIRequestFactory().get('/api/users/', {'search': search}))
+    with CaptureQueriesContext(connection) as ctx:
+        paginator, page = paginate_users_service(request)
+        paginator.get_paginated_response(page)
+    nodes = explain_selects(ctx.captured_queries)
+    plan = [(node['Node Type'], node.get('Relation Name'), node.get('Index Name')) for node in nodes]
+
+    # login OR email: BitmapOr obu indeksów wyrażeniowych (strona i COUNT), bez pełnego skanu
+    assert not any(node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == 'api_useraccount' for node in nodes), plan
+    used = {node.get('Index Name') for node in nodes}
+    assert {'api_useraccount_login_upper_like', 'api_useraccount_email_upper_like'} <= used, plan
+
+
+def test_user_pages_seek_by_login(seeded_db, db):
+    paginator, page = paginate_users_service(Request(APIRequestFactory().get('/api/users/', {'page_size': 5})))
+    cursor = parse_qs(urlparse(paginator.next).query)['cursor'][0]
+    request = Request(APIRequestFactory().get('/api/users/', {'page_size': 5, 'cursor': cursor}))
+
+    # następna strona zaczyna się warunkiem na indeksie loginu, bez OFFSET (COUNT(*) małej tabeli pomijamy)
+    with CaptureQueriesContext(connection) as ctx:
+        paginate_users_service(request)
+    pages = [query for query in ctx.captured_queries if query['sql'].startswith('SELECT "api_useraccount"."id"')]
+    assert len(pages) == 1 and 'OFFSET' not in pages[0]['sql'].upper()
+    nodes = explain_selects(pages)
+    plan = [(node['Node Type'], node.get('Relation Name'), node.get('Index Name')) for node in nodes]
+    assert ('Index Scan', 'api_useraccount', 'api_useraccount_login_key') in plan, plan
+
+
+def test_user_count_estimate_reads_table_statistics(seeded_db, db):
+    with CaptureQueriesContext(connection) as ctx:
+        estimate = estimate_row_count(UserAccount.objects.all())
+    assert estimate == UserAccount.objects.count()
+    assert 'reltuples' in ctx.captured_queries[0]['sql']
+    assert not any('COUNT(' in query['sql'].upper() for query in ctx.captured_queries)
@@ -1,6 +1,8 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from rest_framework.decorators import api_view, authentication_classes, permission_classes 
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.authentication import CachedJWTAuthentication
 from rest_framework import status
 from rest_framework.response import Response
 
@@ -11,6 +13,12 @@ from api.serializers import UserAccountSerializer
 from ..exceptions import UserNotFoundException
 from api.permissions import IsAdminUserCustom
 from api.services.admin_panel_service import get_user_by_id, delete_user_by_id  # import serwisów
+from api.services.slow_query_service import get_slow_query_log
+from api.services.export_service import EXPORT_DATASETS, EXPORT_FORMATS, stream_export
+from api.services.daily_rollover_service import get_daily_schedule
+
+MAX_SLOW_QUERY_LIMIT = 200
+MAX_SCHEDULE_DAYS = 60
 
 
 user_id_param = openapi.Parameter(
@@ -40,7 +48,7 @@ user_id_param = openapi.Parameter(
     }
 )
 @api_view(['GET', 'DELETE'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated, IsAdminUserCustom])
 def user_detail(request, id):
     if request.method == 'GET':
@@ -54,3 +62,82 @@ def user_detail(request, id):
             'success': True,
             'message': 'Użytkownik został usunięty.'
         }, status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Raport zapytań SQL (wymaga SLOW_QUERY_ENABLED): odciski zapytań posortowane po łącznym czasie, "
+        "z liczbą wykonań, czasem średnim, p95 i maksymalnym, wywołującymi funkcjami serwisów "
+        "i planem EXPLAIN najwolniejszego wykonania. Tylko dla administratora."
+    ),
+    manual_parameters=[
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Liczba odcisków (domyślnie 50)", type=openapi.TYPE_INTEGER)
+    ],
+    responses={
+        200: openapi.Response(description="Raport zapytań"),
+        403: openapi.Response(description="Brak uprawnień administratora."),
+    }
+)
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUserCustom])
+def slow_queries(request):
+    try:
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        limit = 50
+    limit = min(max(limit, 1), MAX_SLOW_QUERY_LIMIT)
+    return Response(get_slow_query_log().report(limit), status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Strumieniowy eksport całej tabeli posortowanej po ID: users (bez hasła i zdjęć), guesses "
+        "(UserGuessLog) lub transfer-guesses (UserGuessLogTransfer), jako NDJSON (obiekt JSON w linii) "
+        "lub CSV z nagłówkiem. Tylko dla administratora."
+    ),
+    manual_parameters=[
+        openapi.Parameter('dataset', openapi.IN_PATH, description="Eksport", type=openapi.TYPE_STRING, enum=list(EXPORT_DATASETS)),
+        openapi.Parameter('file_format', openapi.IN_PATH, description="Format", type=openapi.TYPE_STRING, enum=list(EXPORT_FORMATS)),
+    ],
+    responses={
+        200: openapi.Response(description="Plik NDJSON lub CSV wysyłany porcjami"),
+        403: openapi.Response(description="Brak uprawnień administratora"),
+        404: openapi.Response(description="Nieznany eksport lub format"),
+    }
+)
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUserCustom])
+def export_data(request, dataset, file_format):
+    # serwer ASGI dostaje iterator async (porcje bez buforowania całego eksportu), WSGI - zwykły
+    return stream_export(dataset, file_format, asynchronous=isinstance(request._request, ASGIRequest))
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Nadchodzące pytania dnia gry transferowej (od dziś) przygotowane przez harmonogram Celery beat: "
+        "transfer każdego dnia lub null, czy pytanie jest już w cache, liczba brakujących dni "
+        "i wynik ostatniego przebiegu harmonogramu. Tylko dla administratora."
+    ),
+    manual_parameters=[
+        openapi.Parameter('days', openapi.IN_QUERY, description="Liczba dni naprzód (domyślnie DAILY_PUZZLE_DAYS_AHEAD)", type=openapi.TYPE_INTEGER)
+    ],
+    responses={
+        200: openapi.Response(description="Harmonogram pytań dnia"),
+        403: openapi.Response(description="Brak uprawnień administratora"),
+    }
+)
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUserCustom])
+def daily_schedule(request):
+    try:
+        days = int(request.GET.get('days', settings.DAILY_PUZZLE_DAYS_AHEAD))
+    except ValueError:
+        days = settings.DAILY_PUZZLE_DAYS_AHEAD
+    days = min(max(days, 0), MAX_SCHEDULE_DAYS)
+    return Response(get_daily_schedule(days), status=status.HTTP_200_OK)
@@ -1,7 +1,7 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.authentication import CachedJWTAuthentication
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from api.serializers import PlayerNameSerializer
@@ -26,11 +26,11 @@ from api.services.daily_game_service import (
         200: openapi.Response(description="Poprawne zgłoszenie zgadywania"),
         400: openapi.Response(description="Brak nazwy piłkarza"),
         403: openapi.Response(description="Brak prób lub już odgadnięto"),
-        404: openapi.Response(description="Nie znaleziono piłkarza"),
+        404: openapi.Response(description="Nie znaleziono piłkarza (w polu suggestions lista podobnych nazwisk)"),
     }
 )
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def check_guess(request):
     player_name = request.data.get('player_name', '').strip()
@@ -46,7 +46,7 @@ def check_guess(request):
     }
 )
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_game_status(request):
     data = get_daily_game_status(request.user)
@@ -67,7 +67,7 @@ def get_game_status(request):
     responses={200: openapi.Response(description="Lista pasujących piłkarzy")}
 )
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_player_names(request):
     query = request.GET.get('query', '').strip()
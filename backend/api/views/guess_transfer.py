@@ -1,7 +1,7 @@
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from ..authentication import CachedJWTAuthentication
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
@@ -35,7 +35,7 @@ start_game_response_schema = openapi.Schema(
     }
 )
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def start_transfer_game(request):
     response_data = start_game_for_user(request.user)
@@ -76,7 +76,7 @@ guess_transfer_player_response = openapi.Schema(
     }
 )
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def guess_transfer_player(request):
     player_name = request.data.get("player_name", "").strip()
@@ -0,0 +1,77 @@
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from ..authentication import CachedJWTAuthentication
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from ..services.leaderboard_service import get_top_scores, get_user_rank
+
+MAX_LEADERBOARD_LIMIT = 100
+
+leaderboard_entry_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "rank": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "login": openapi.Schema(type=openapi.TYPE_STRING),
+        "points_guess": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "points_transfer": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "total_points": openapi.Schema(type=openapi.TYPE_INTEGER),
+    }
+)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Zwraca ranking najlepszych graczy (domyślnie 10, maksymalnie 100).",
+    manual_parameters=[
+        openapi.Parameter(
+            'limit',
+            openapi.IN_QUERY,
+            description="Liczba pozycji w rankingu",
+            type=openapi.TYPE_INTEGER
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description="Ranking graczy",
+            schema=openapi.Schema(type=openapi.TYPE_ARRAY, items=leaderboard_entry_schema)
+        ),
+        401: openapi.Response(description="Brak autoryzacji"),
+    }
+)
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_leaderboard(request):
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    limit = min(max(limit, 1), MAX_LEADERBOARD_LIMIT)
+    return Response(get_top_scores(limit))
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Zwraca pozycję zalogowanego użytkownika w rankingu.",
+    responses={
+        200: openapi.Response(
+            description="Pozycja w rankingu",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "login": openapi.Schema(type=openapi.TYPE_STRING),
+                    "total_points": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "rank": openapi.Schema(type=openapi.TYPE_INTEGER),
+                }
+            )
+        ),
+        401: openapi.Response(description="Brak autoryzacji"),
+    }
+)
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_my_rank(request):
+    return Response(get_user_rank(request.user))
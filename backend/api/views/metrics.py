@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from ..services.metrics_service import get_metrics_registry
+
+
+# Zwykły widok Django (bez DRF i JWT): scraper Prometheusa uwierzytelnia się
+# tokenem z ustawienia METRICS_TOKEN w nagłówku "Authorization: Bearer ...".
+# Bez ustawionego tokenu endpoint odmawia każdemu (metryki ujawniają trasy i ruch).
+@require_GET
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if not token or not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return JsonResponse({"error": "Brak dostępu do metryk.", "status": 403}, status=403)
+    return HttpResponse(get_metrics_registry().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,7 +2,7 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from ..authentication import CachedJWTAuthentication
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -10,19 +10,12 @@ from drf_yasg import openapi
 from ..serializers import PlayerSerializer
 from ..exceptions import PlayerNotFoundException
 from ..services.player_service import (
+    VALID_PLAYER_SORTS,
     fetch_all_players,
     fetch_player_by_id,
     fetch_unique_filters,
 )
 
-from rest_framework.pagination import PageNumberPagination
-
-
-class PlayerPagination(PageNumberPagination):
-    page_size = 3  # max 3 piłkarzy na stronę
-    page_size_query_param = 'page_size'
-    max_page_size = 10
-
 
 player_schema = openapi.Schema(
     type=openapi.TYPE_OBJECT,
@@ -41,13 +34,27 @@ player_schema = openapi.Schema(
 
 @swagger_auto_schema(
     method='get',
-    operation_description="Pobierz listę wszystkich piłkarzy.",
+    operation_description="Pobierz listę piłkarzy stronicowaną kursorem. Adresy kolejnych stron są w polach `next` i `previous`.",
+    manual_parameters=[
+        openapi.Parameter('country', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+        openapi.Parameter('league', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+        openapi.Parameter('position', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+        openapi.Parameter('sort', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                          enum=VALID_PLAYER_SORTS),
+        openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False),
+        openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                          description="Nieprzezroczysty kursor z pola next/previous"),
+    ],
     responses={
         200: openapi.Response(
-            description="Lista piłkarzy",
+            description="Strona piłkarzy",
             schema=openapi.Schema(
-                type=openapi.TYPE_ARRAY,
-                items=player_schema
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "next": openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                    "previous": openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                    "results": openapi.Schema(type=openapi.TYPE_ARRAY, items=player_schema),
+                }
             )
         ),
         204: openapi.Response(
@@ -57,12 +64,13 @@ player_schema = openapi.Schema(
                 properties={"detail": openapi.Schema(type=openapi.TYPE_STRING)}
             )
         ),
+        400: openapi.Response(description="Nieprawidłowy kursor"),
         401: openapi.Response(description="Brak autoryzacji"),
         500: openapi.Response(description="Błąd serwera")
     }
 )
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_all_players(request):
     return fetch_all_players(request)
@@ -95,7 +103,7 @@ def get_all_players(request):
         401: openapi.Response(description="Brak autoryzacji"),
     }
 )
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 @api_view(['GET'])
 def get_player(request, id):
@@ -104,7 +112,13 @@ def get_player(request, id):
 
 @swagger_auto_schema(
     method='get',
-    operation_description="Pobierz unikalne wartości filtrów (kraje, ligi, pozycje) dla piłkarzy.",
+    operation_description="Pobierz unikalne wartości filtrów (kraje, ligi, pozycje) dla piłkarzy wraz z liczbą piłkarzy. "
+                          "Liczby w każdym facecie uwzględniają filtry pozostałych facetów.",
+    manual_parameters=[
+        openapi.Parameter('country', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+        openapi.Parameter('league', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+        openapi.Parameter('position', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+    ],
     responses={
         200: openapi.Response(
             description="Unikalne wartości filtrów",
@@ -123,6 +137,10 @@ def get_player(request, id):
                         type=openapi.TYPE_ARRAY,
                         items=openapi.Items(type=openapi.TYPE_STRING)
                     ),
+                    'counts': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        description="{countries|leagues|positions: {wartość: liczba piłkarzy}}"
+                    ),
                 }
             )
         ),
@@ -130,7 +148,7 @@ def get_player(request, id):
     }
 )
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_unique_filters(request):
-    return fetch_unique_filters()
+    return fetch_unique_filters(request.GET)
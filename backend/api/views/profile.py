@@ -1,18 +1,23 @@
 from rest_framework.decorators import api_view, authentication_classes, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from ..authentication import CachedJWTAuthentication
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
+from django.http import FileResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
 
+from ..exceptions import BlobNotFoundException
+from ..services.blob_store_service import get_blob_modified_time, guess_content_type, open_blob
 from ..services.user_profile_service import get_user_profile, save_profile_picture
 
 
 @swagger_auto_schema(
     method='get',
-    operation_description="Zwraca profil zalogowanego użytkownika, w tym login, email, datę utworzenia konta, liczbę punktów za zgadywanie oraz zdjęcie profilowe (jeśli istnieje) zakodowane w base64.",
+    operation_description="Zwraca profil zalogowanego użytkownika, w tym login, email, datę utworzenia konta, liczbę punktów za zgadywanie oraz adres zdjęcia profilowego (jeśli istnieje).",
     responses={
         200: openapi.Response(
             description="Dane profilu użytkownika",
@@ -25,7 +30,9 @@ from ..services.user_profile_service import get_user_profile, save_profile_pictu
                     "points_guess": openapi.Schema(type=openapi.TYPE_INTEGER),
                     "points_transfer": openapi.Schema(type=openapi.TYPE_INTEGER),
                     "total_points": openapi.Schema(type=openapi.TYPE_INTEGER),
-                    "profile_picture": openapi.Schema(type=openapi.TYPE_STRING, description="Base64 lub null", nullable=True),
+                    "profile_picture": openapi.Schema(type=openapi.TYPE_STRING, description="Ścieżka do /api/profile/picture/<hash>/ lub null", nullable=True),
+                    "profile_picture_variants": openapi.Schema(type=openapi.TYPE_OBJECT, description="Ścieżki wariantów: {avatar|thumbnail: {webp|jpeg: ścieżka}} lub null", nullable=True),
+                    "profile_picture_processing": openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Czy nowe zdjęcie jest jeszcze przetwarzane"),
                 }
             )
         ),
@@ -33,7 +40,7 @@ from ..services.user_profile_service import get_user_profile, save_profile_pictu
     }
 )
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
     return Response(get_user_profile(request.user))
@@ -41,7 +48,7 @@ def user_profile(request):
 
 @swagger_auto_schema(
     method='post',
-    operation_description="Prześlij zdjęcie profilowe użytkownika (multipart/form-data). Pole `image` jest wymagane.",
+    operation_description="Prześlij zdjęcie profilowe użytkownika (multipart/form-data). Pole `image` jest wymagane. Obrazek jest skalowany asynchronicznie - do czasu zakończenia profil zwraca `profile_picture_processing: true`.",
     manual_parameters=[
         openapi.Parameter(
             name="image",
@@ -52,8 +59,8 @@ def user_profile(request):
         )
     ],
     responses={
-        200: openapi.Response(
-            description="Zdjęcie zapisane",
+        202: openapi.Response(
+            description="Zdjęcie przyjęte do przetworzenia",
             schema=openapi.Schema(
                 type=openapi.TYPE_OBJECT,
                 properties={
@@ -62,7 +69,7 @@ def user_profile(request):
             )
         ),
         400: openapi.Response(
-            description="Brak pliku w żądaniu",
+            description="Brak pliku w żądaniu lub plik nie jest obrazem",
             schema=openapi.Schema(
                 type=openapi.TYPE_OBJECT,
                 properties={
@@ -71,13 +78,38 @@ def user_profile(request):
             )
         ),
         401: openapi.Response(description="Brak autoryzacji"),
+        413: openapi.Response(description="Plik jest za duży"),
+        503: openapi.Response(description="Kolejka przetwarzania obrazków jest niedostępna"),
     }
 )
 @api_view(['POST'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
 def upload_profile_picture(request):
     image_file = request.FILES.get("image")
     result = save_profile_picture(request.user, image_file)
-    return Response(result, status=status.HTTP_200_OK)
+    return Response(result, status=status.HTTP_202_ACCEPTED)
+
+
+# Zdjęcia są adresowane skrótem SHA-256 treści - pod danym adresem nigdy nie pojawi się
+# inny plik, więc odpowiedź jest niezmienna i może być cache'owana przez przeglądarkę/CDN.
+# Widok jest publiczny (tag <img> nie wyśle nagłówka Authorization), a skrótu nie da się zgadnąć.
+@require_GET
+@condition(
+    etag_func=lambda request, digest: digest,
+    last_modified_func=lambda request, digest: get_blob_modified_time(digest),
+)
+def profile_picture(request, digest):
+    try:
+        blob = open_blob(digest)
+    except BlobNotFoundException:
+        return JsonResponse(
+            {"error": BlobNotFoundException.default_detail, "status": BlobNotFoundException.status_code},
+            status=BlobNotFoundException.status_code,
+        )
+    content_type = guess_content_type(blob.read(12))
+    blob.seek(0)
+    response = FileResponse(blob, content_type=content_type)
+    patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
@@ -2,14 +2,14 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.authentication import CachedJWTAuthentication
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from api.serializers import UserAccountSerializer
 from api.permissions import IsAdminUserCustom
 from api.services.user_service import (
-    get_all_users_service,
+    paginate_users_service,
     get_user_by_id_service,
     register_user_service,
     login_user_service
@@ -18,23 +18,42 @@ from api.services.user_service import (
 
 @swagger_auto_schema(
     method='get',
-    operation_description="Pobierz listę wszystkich użytkowników",
+    operation_description=(
+        "Strona listy użytkowników posortowanej po loginie (stronicowanie kursorem: linki next/previous), "
+        "z wyszukiwaniem po początku loginu lub e-maila. "
+        "Dla dużych wyników count jest szacunkiem PostgreSQL (count_is_approximate=true). Tylko dla administratora."
+    ),
+    manual_parameters=[
+        openapi.Parameter('search', openapi.IN_QUERY, description="Początek loginu lub e-maila (bez rozróżniania wielkości liter)", type=openapi.TYPE_STRING),
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="Kursor strony z pól next/previous poprzedniej odpowiedzi", type=openapi.TYPE_STRING),
+        openapi.Parameter('page_size', openapi.IN_QUERY, description="Rozmiar strony (domyślnie 50, maks. 200)", type=openapi.TYPE_INTEGER),
+    ],
     responses={
         200: openapi.Response(
-            description="Lista użytkowników",
-            schema=UserAccountSerializer(many=True)
+            description="Strona użytkowników",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "count": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "count_is_approximate": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                    "next": openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                    "previous": openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                    "results": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                }
+            )
         ),
-        204: "Brak użytkowników",
+        403: "Brak uprawnień administratora",
+        400: "Nieprawidłowy kursor",
         500: "Błąd serwera"
     }
 )
-@authentication_classes([JWTAuthentication])  # Uwierzytelnianie JWT
-@permission_classes([IsAuthenticated, IsAdminUserCustom])  # Tylko zalogowani admini mają dostęp
 @api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])  # Uwierzytelnianie JWT
+@permission_classes([IsAuthenticated, IsAdminUserCustom])  # Tylko zalogowani admini mają dostęp
 def get_all_users(request):
-    users = get_all_users_service()
-    serializer = UserAccountSerializer(users, many=True)  # Serializacja listy użytkowników
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    paginator, page = paginate_users_service(request)
+    serializer = UserAccountSerializer(page, many=True)  # Serializacja strony użytkowników
+    return paginator.get_paginated_response(serializer.data)
 
 
 @swagger_auto_schema(
@@ -48,9 +67,9 @@ def get_all_users(request):
         404: "Użytkownik nie znaleziony"
     }
 )
-@authentication_classes([JWTAuthentication])
-@permission_classes([IsAuthenticated, IsAdminUserCustom])
 @api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUserCustom])
 def get_user(request, id):
     user = get_user_by_id_service(id)
     serializer = UserAccountSerializer(user)  # Serializujemy pojedynczego użytkownika
@@ -19,8 +19,8 @@ from django.contrib import admin
 from django.urls import path # import funkcji `path` do definiowania tras URL
 
 from api.views.guess_transfer import guess_transfer_player, start_transfer_game
-from api.views.admin_panel import user_detail
-from api.views.profile import upload_profile_picture, user_profile  
+from api.views.admin_panel import daily_schedule, export_data, slow_queries, user_detail
+from api.views.profile import profile_picture, upload_profile_picture, user_profile
 
 from api.views.settings import delete_account, get_settings, update_account
 from api.views.guess_player import check_guess, get_player_names, get_game_status
@@ -29,6 +29,8 @@ from api.views.guess_player import check_guess, get_player_names, get_game_statu
 from api.views.users import get_all_users, get_user, register_user, login_user 
 from api.views.players import get_all_players, get_player, get_unique_filters
 from api.views.roles import get_roles
+from api.views.leaderboard import get_leaderboard, get_my_rank
+from api.views.metrics import metrics
 from api.views.example import ExampleView
 
 # from api.views import ExampleView, get_roles, get_user, get_all_users, get_player, get_all_players, login_user, register_user
@@ -85,13 +87,30 @@ urlpatterns = [
 
     path('api/users/<int:id>/', user_detail, name='user_detail'),
 
+    # raport zapytań SQL (odciski, p95, EXPLAIN) dla administratora
+    path('api/admin/slow-queries/', slow_queries, name='slow_queries'),
+
+    # strumieniowe eksporty NDJSON / CSV (users, guesses, transfer-guesses) dla administratora
+    path('api/admin/export/<str:dataset>/<str:file_format>/', export_data, name='export_data'),
+
+    # pytania dnia przygotowane z wyprzedzeniem przez Celery beat
+    path('api/admin/daily-schedule/', daily_schedule, name='daily_schedule'),
+
     path('api/transfer/start', start_transfer_game, name='start_transfer_game'),
     path('api/transfer/guess', guess_transfer_player, name='guess_transfer_player'),
 
     path('api/profile/upload-picture/', upload_profile_picture,name='upload_profile_picture'),
+    path('api/profile/picture/<str:digest>/', profile_picture, name='profile_picture'),
 
     path('api/filters/', get_unique_filters, name='get_unique_filters'),
 
+    # ranking graczy i pozycja zalogowanego użytkownika
+    path('api/leaderboard/', get_leaderboard, name='get_leaderboard'),
+    path('api/leaderboard/me/', get_my_rank, name='get_my_rank'),
+
+    # metryki żądań w formacie Prometheusa (zbierane przez api.middleware.MetricsMiddleware)
+    path('api/metrics', metrics, name='metrics'),
+
 ]
 
 # Konfiguracja dokumentacji Swagger / ReDoc
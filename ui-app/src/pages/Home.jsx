@@ -30,9 +30,8 @@ const Home = () => {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
 
-    // stany do paginacji
+    // stany do paginacji (kursor - API zwraca gotowe adresy next/previous, bez liczby stron)
     const [page, setPage] = useState(1);
-    const [count, setCount] = useState(0);
     const [next, setNext] = useState(null);
     const [previous, setPrevious] = useState(null);
 
@@ -44,6 +43,8 @@ const Home = () => {
     const [availableCountries, setAvailableCountries] = useState([]);
     const [availableLeagues, setAvailableLeagues] = useState([]);
     const [availablePositions, setAvailablePositions] = useState([]);
+    // liczby piłkarzy przy każdej wartości filtra (z uwzględnieniem pozostałych filtrów)
+    const [facetCounts, setFacetCounts] = useState({ countries: {}, leagues: {}, positions: {} });
 
 
     const [sessionExpired, setSessionExpired] = useState(false);
@@ -52,31 +53,33 @@ const Home = () => {
 
     const fetchFilters = async () => {
         try {
-            const data = await fetchWithRefresh("http://127.0.0.1:8000/api/filters/");
+            const params = new URLSearchParams({ country, league, position });
+            const data = await fetchWithRefresh(`http://127.0.0.1:8000/api/filters/?${params.toString()}`);
             setAvailableCountries([...data.countries].sort());
             setAvailableLeagues([...data.leagues].sort());
             setAvailablePositions([...data.positions].sort());
+            setFacetCounts(data.counts ?? { countries: {}, leagues: {}, positions: {} });
         } catch (err) {
             console.error("Błąd podczas pobierania filtrów:", err);
         }
     };
 
     // Funkcja pobierająca dane piłkarzy z API
-    const fetchData = async (pageNumber = 1) => {
+    // pageUrl = adres z pola next/previous; bez niego pobieramy pierwszą stronę z filtrami
+    const fetchData = async (pageNumber = 1, pageUrl = null) => {
         if (sessionExpired) return;
 
         setLoading(true);
         setError(null);
         try {
             const params = new URLSearchParams({
-                page: pageNumber.toString(),
                 country,
                 league,
                 position,
                 sort,
             });
 
-            const url = `http://127.0.0.1:8000/api/players/?${params.toString()}`;
+            const url = pageUrl ?? `http://127.0.0.1:8000/api/players/?${params.toString()}`;
             const data = await fetchWithRefresh(url);
             if (!data) {
                 setError("Sesja wygasła...");
@@ -84,7 +87,6 @@ const Home = () => {
                 return;
             }
             setPlayers(data.results);
-            setCount(data.count);
             setNext(data.next);
             setPrevious(data.previous);
             setPage(pageNumber);
@@ -112,6 +114,12 @@ const Home = () => {
             fetchData(1);
         }
     }, [country, league, position, sort]);
+
+    // liczby w filtrach zależą od wybranych filtrów
+    useEffect(() => {
+        if (sessionExpired || !isLoggedIn()) return;
+        fetchFilters();
+    }, [country, league, position]);
     // Hook uruchamiany po załadowaniu komponentu
     useEffect(() => {
         if (sessionExpired) return;
@@ -124,7 +132,6 @@ const Home = () => {
         }
 
         fetchData(1);
-        fetchFilters();
     }, [navigate, sessionExpired]);
 
     // Jeżeli trwa ładowanie – pokaż komponent ładowania
@@ -264,7 +271,7 @@ const Home = () => {
                                     >
                                         <MenuItem value="">Wszystkie kraje</MenuItem>
                                         {availableCountries.map((c) => (
-                                            <MenuItem key={c} value={c}>{c}</MenuItem>
+                                            <MenuItem key={c} value={c}>{c} ({facetCounts.countries[c] ?? 0})</MenuItem>
                                         ))}
                                     </TextField>
 
@@ -282,7 +289,7 @@ const Home = () => {
                                     >
                                         <MenuItem value="">Wszystkie ligi</MenuItem>
                                         {availableLeagues.map((l) => (
-                                            <MenuItem key={l} value={l}>{l}</MenuItem>
+                                            <MenuItem key={l} value={l}>{l} ({facetCounts.leagues[l] ?? 0})</MenuItem>
                                         ))}
                                     </TextField>
 
@@ -300,7 +307,7 @@ const Home = () => {
                                     >
                                         <MenuItem value="">Wszystkie pozycje</MenuItem>
                                         {availablePositions.map((p) => (
-                                            <MenuItem key={p} value={p}>{p}</MenuItem>
+                                            <MenuItem key={p} value={p}>{p} ({facetCounts.positions[p] ?? 0})</MenuItem>
                                         ))}
                                     </TextField>
 
@@ -387,20 +394,20 @@ const Home = () => {
                             <Box sx={{ display: "flex", justifyContent: "center", marginTop: 2 }}>
                                 <Button
                                     variant="outlined"
-                                    onClick={() => fetchData(page - 1)}
+                                    onClick={() => fetchData(page - 1, previous)}
                                     disabled={!previous}
                                     sx={{ marginRight: 1 }}
                                 >
                                     Poprzednia
                                 </Button>
-                                {count > 0 && (
+                                {players.length > 0 && (
                                     <Typography sx={{ alignSelf: "center", mx: 1, color: "black" }}>
-                                        Strona {page} z {Math.ceil(count / 3)}
+                                        Strona {page}
                                     </Typography>
                                 )}
                                 <Button
                                     variant="outlined"
-                                    onClick={() => fetchData(page + 1)}
+                                    onClick={() => fetchData(page + 1, next)}
                                     disabled={!next}
                                     sx={{ marginLeft: 1 }}
                                 >
@@ -31,6 +31,7 @@ const Profile = () => {
         try {
             const data = await fetchWithRefresh("http://127.0.0.1:8000/api/profile/");
             setProfile(data);
+            return data;
         } catch (err) {
             setError(err.message);
         } finally {
@@ -38,6 +39,15 @@ const Profile = () => {
         }
     };
 
+    // zdjęcie jest skalowane w tle - odpytujemy profil, aż warianty będą gotowe
+    const waitForProfilePicture = async (attempts = 15) => {
+        for (let i = 0; i < attempts; i++) {
+            const data = await fetchProfile();
+            if (!data?.profile_picture_processing) return;
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+        }
+    };
+
     useEffect(() => {
         fetchProfile();
     }, []);
@@ -57,7 +67,7 @@ const Profile = () => {
             });
 
             if (data?.success) {
-                await fetchProfile();
+                await waitForProfilePicture();
             } else {
                 console.error(data);
                 alert("Błąd przy przesyłaniu zdjęcia.");
@@ -223,9 +233,11 @@ const Profile = () => {
                         <Avatar
                             sx={{ width: 100, height: 100, mb: 2, mt: 1 }}
                             src={
-                                profile.profile_picture
-                                    ? `data:image/jpeg;base64,${profile.profile_picture}`
-                                    : undefined
+                                profile.profile_picture_variants?.thumbnail?.webp
+                                    ? `http://127.0.0.1:8000${profile.profile_picture_variants.thumbnail.webp}`
+                                    : profile.profile_picture
+                                        ? `http://127.0.0.1:8000${profile.profile_picture}`
+                                        : undefined
                             }
                             alt={profile.login}
                         />